@@ -0,0 +1,372 @@
+# === CONTRÔLE D'ADMISSION ET VOIES PRIORITAIRES ===
+"""
+Ordonnanceur placé devant le scoring : une autorisation carte (/predict) ne
+doit pas attendre derrière un gros lot (/predict/batch).
+
+Le scoring est lié au CPU : un lot (/predict/batch) est scoré dans la boucle
+asyncio du worker, morceau par morceau ; une autorisation (/predict) est
+scorée dans un thread (asyncio.to_thread) borné par son budget, la boucle
+restant libre pour admettre les requêtes suivantes. Chaque requête passe par
+une voie (lane) :
+
+    voie          priorité   endpoint          concurrence   file   budget
+    interactive   0          /predict          64            256    100 ms
+    bulk          1          /predict/batch    1             8      aucun
+
+- admission : une voie admet au plus max_concurrency requêtes à la fois ; les
+  suivantes attendent dans une file bornée (max_queue), au-delà LaneFull ;
+- découpage : un lot est traité par morceaux dimensionnés pour durer slice_ms.
+  Le coût d'un morceau est modélisé comme coût fixe + coût par ligne
+  (moindres carrés sur les derniers morceaux, tailles alternées pour garder
+  les deux termes identifiables) ; si le coût fixe dépasse la moitié de
+  slice_ms, le morceau dure 2 × coût fixe pour que le surcoût reste amorti.
+  Entre deux morceaux, checkpoint() rend la main à la boucle et attend que
+  les voies plus prioritaires soient vides : une autorisation attend au plus
+  un morceau. Les requêtes sont comptées dès
+  leur entrée dans l'application (middleware ASGI LaneTracker), avant même la
+  lecture du corps ;
+- échéances : chaque requête a un budget de latence (en-tête
+  X-Latency-Budget-Ms, sinon budget par défaut de la voie ; X-Request-Start,
+  posé par le répartiteur de charge, décompte le temps déjà écoulé). Si le
+  temps restant ne couvre pas l'attente estimée plus le temps de service
+  moyen, DeadlineExceeded est levée tout de suite et l'API renvoie une
+  décision de repli plutôt qu'une réponse hors délai. Une fois admise, une
+  requête /predict est scorée dans un thread borné par le temps restant
+  (remaining_ms) : au-delà, décision de repli ; un lot vérifie l'échéance
+  avant chaque morceau ;
+- métriques par voie : admises, terminées, refusées (file pleine), replis sur
+  échéance, préemptions, morceaux, en cours / en file, latences p50/p95/p99.
+
+Configuration : LANE_<VOIE>_CONCURRENCY, LANE_<VOIE>_QUEUE,
+LANE_<VOIE>_BUDGET_MS (0 = pas de budget) et BULK_SLICE_MS.
+"""
+from bisect import bisect_right
+from collections import deque
+from typing import Dict, Any, Optional, List
+import asyncio
+import math
+import os
+import time
+
+from decision_stream import LATENCY_EDGES_MS, _latency_percentile
+
+# Pause entre deux morceaux : laisse la boucle lire les nouvelles requêtes (quelques itérations)
+YIELD_S = 0.0005
+
+# Temps écoulé plausible depuis X-Request-Start (au-delà : en-tête ignoré)
+MAX_ELAPSED_MS = 60_000.0
+
+# Oubli des anciens morceaux dans l'ajustement du coût (poids × 0,9 par morceau)
+FIT_DECAY = 0.9
+
+# Voies par défaut : (nom, priorité, concurrence, file, budget en ms)
+DEFAULT_LANES = [
+    ('interactive', 0, 64, 256, 100.0),
+    ('bulk', 1, 1, 8, None),
+]
+
+
+class LaneFull(Exception):
+    """File d'attente de la voie pleine (surcharge)"""
+
+
+class DeadlineExceeded(Exception):
+    """Le budget de latence de la requête ne peut plus être tenu"""
+
+
+def _ewma(previous: Optional[float], value: float, alpha: float = 0.2) -> float:
+    return value if previous is None else previous + alpha * (value - previous)
+
+
+class Lane:
+    """Voie de priorité : concurrence et file bornées, temps de service et métriques"""
+
+    def __init__(self, name: str, priority: int, max_concurrency: int, max_queue: int,
+                 budget_ms: Optional[float] = None):
+        self.name = name
+        self.priority = priority
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.budget_ms = budget_ms
+        self.active = 0
+        self.in_flight = 0                        # requêtes entrées dans l'application (LaneTracker)
+        self.waiters: deque = deque()
+        self.service_ms: Optional[float] = None   # moyenne mobile par requête
+        self.fixed_ms = 0.0                       # coût fixe d'un morceau de lot
+        self.row_ms: Optional[float] = None       # coût marginal par ligne
+        self._fit = [0.0] * 5                     # poids, Σx, Σy, Σx², Σxy (x = lignes, y = ms)
+        self.admitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.deadline_fallbacks = 0
+        self.preemptions = 0
+        self.chunks = 0
+        self.wait_hist = [0] * (len(LATENCY_EDGES_MS) + 1)
+        self.latency_hist = [0] * (len(LATENCY_EDGES_MS) + 1)
+
+    @property
+    def busy(self) -> bool:
+        return self.in_flight > 0 or self.active > 0 or bool(self.waiters)
+
+    @classmethod
+    def from_env(cls, name: str, priority: int, max_concurrency: int, max_queue: int,
+                 budget_ms: Optional[float]) -> 'Lane':
+        prefix = f"LANE_{name.upper()}_"
+        budget = float(os.environ.get(prefix + 'BUDGET_MS', budget_ms or 0))
+        return cls(name, priority,
+                   int(os.environ.get(prefix + 'CONCURRENCY', max_concurrency)),
+                   int(os.environ.get(prefix + 'QUEUE', max_queue)),
+                   budget or None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'priority': self.priority,
+            'max_concurrency': self.max_concurrency,
+            'max_queue': self.max_queue,
+            'budget_ms': self.budget_ms,
+            'in_flight': self.in_flight,
+            'active': self.active,
+            'queued': len(self.waiters),
+            'admitted': self.admitted,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'deadline_fallbacks': self.deadline_fallbacks,
+            'preemptions': self.preemptions,
+            'chunks': self.chunks,
+            'service_ms': round(self.service_ms, 3) if self.service_ms is not None else None,
+            'chunk_fixed_ms': round(self.fixed_ms, 3),
+            'row_ms': round(self.row_ms, 4) if self.row_ms is not None else None,
+            'wait_ms': {q: _latency_percentile(self.wait_hist, p) for q, p in (('p50', 0.5), ('p99', 0.99))},
+            'latency_ms': {q: _latency_percentile(self.latency_hist, p)
+                           for q, p in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))}
+        }
+
+
+class Ticket:
+    """Droit d'exécution accordé à une requête dans une voie"""
+    __slots__ = ('lane', 'arrived', 'started', 'deadline')
+
+    def __init__(self, lane: Lane, deadline: Optional[float]):
+        self.lane = lane
+        self.arrived = time.monotonic()
+        self.started = self.arrived
+        self.deadline = deadline
+
+    def remaining_ms(self) -> Optional[float]:
+        return None if self.deadline is None else (self.deadline - time.monotonic()) * 1000
+
+    def expired(self, needed_ms: float = 0.0) -> bool:
+        """Vrai si le temps restant ne couvre plus needed_ms"""
+        remaining = self.remaining_ms()
+        return remaining is not None and remaining < needed_ms
+
+
+class AdmissionController:
+    """Voies prioritaires, découpage des lots en tranches de temps et échéances"""
+
+    def __init__(self, lanes: List[Lane], slice_ms: float = 20.0):
+        self.lanes = {lane.name: lane for lane in lanes}
+        self.slice_ms = slice_ms
+        self._preempted: List[asyncio.Future] = []
+
+    @classmethod
+    def from_env(cls) -> 'AdmissionController':
+        return cls([Lane.from_env(*spec) for spec in DEFAULT_LANES],
+                   slice_ms=float(os.environ.get('BULK_SLICE_MS', 20.0)))
+
+    # --- admission ---
+
+    async def admit(self, lane_name: str, budget_ms: Optional[float] = None, elapsed_ms: float = 0.0,
+                    expected_ms: Optional[float] = None) -> Ticket:
+        """
+        Attend une place dans la voie
+
+        LaneFull si la file est pleine ; DeadlineExceeded si l'attente estimée
+        plus expected_ms (par défaut le temps de service moyen de la voie)
+        dépasse le budget restant.
+        """
+        lane = self.lanes[lane_name]
+        budget = budget_ms if budget_ms is not None else lane.budget_ms
+        ticket = Ticket(lane, None if budget is None else time.monotonic() + (budget - elapsed_ms) / 1000)
+        service = expected_ms if expected_ms is not None else (lane.service_ms or 0.0)
+
+        if lane.active < lane.max_concurrency and not lane.waiters:
+            self._check_deadline(ticket, service)
+            lane.active += 1
+        else:
+            if len(lane.waiters) >= lane.max_queue:
+                lane.rejected += 1
+                raise LaneFull(f"Voie {lane.name} saturée ({lane.active} en cours, {len(lane.waiters)} en file)")
+            rounds = len(lane.waiters) // lane.max_concurrency + 1
+            self._check_deadline(ticket, rounds * (lane.service_ms or 0.0) + service)
+
+            # La place est transmise par release() : active reste inchangé
+            future = asyncio.get_running_loop().create_future()
+            lane.waiters.append(future)
+            remaining = ticket.remaining_ms()
+            try:
+                await asyncio.wait({future}, timeout=None if remaining is None else max(remaining - service, 0) / 1000)
+            except asyncio.CancelledError:
+                # Requête annulée (client parti) : sa place, même déjà transmise, ne doit pas être perdue
+                if future.done():
+                    self._hand_over(lane)
+                else:
+                    future.cancel()
+                    lane.waiters.remove(future)
+                raise
+            if not future.done():
+                future.cancel()
+                lane.waiters.remove(future)
+                lane.deadline_fallbacks += 1
+                self.wake_preempted()
+                raise DeadlineExceeded(f"Budget de latence épuisé en file ({lane.name})")
+
+        ticket.started = time.monotonic()
+        lane.admitted += 1
+        lane.wait_hist[bisect_right(LATENCY_EDGES_MS, (ticket.started - ticket.arrived) * 1000)] += 1
+        return ticket
+
+    def _check_deadline(self, ticket: Ticket, needed_ms: float):
+        if ticket.expired(needed_ms):
+            ticket.lane.deadline_fallbacks += 1
+            raise DeadlineExceeded(
+                f"Budget restant {ticket.remaining_ms():.1f} ms < {needed_ms:.1f} ms estimées ({ticket.lane.name})"
+            )
+
+    def release(self, ticket: Ticket):
+        """Libère la place (transmise au premier en file) et réveille les voies moins prioritaires"""
+        lane = ticket.lane
+        now = time.monotonic()
+        lane.completed += 1
+        lane.service_ms = _ewma(lane.service_ms, (now - ticket.started) * 1000)
+        lane.latency_hist[bisect_right(LATENCY_EDGES_MS, (now - ticket.arrived) * 1000)] += 1
+        self._hand_over(lane)
+
+    def _hand_over(self, lane: Lane):
+        """Transmet une place au premier en file encore en attente, sinon la rend à la voie"""
+        while lane.waiters:
+            future = lane.waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                break
+        else:
+            lane.active -= 1
+        self.wake_preempted()
+
+    def wake_preempted(self):
+        """Réveille les lots en pause pour qu'ils réévaluent les voies prioritaires"""
+        preempted, self._preempted = self._preempted, []
+        for future in preempted:
+            if not future.done():
+                future.set_result(None)
+
+    # --- découpage des lots ---
+
+    def chunk_rows(self, lane_name: str, initial: int = 64, max_rows: int = 5000) -> int:
+        """Lignes par morceau pour qu'un morceau dure environ slice_ms (au moins 2 × coût fixe)"""
+        lane = self.lanes[lane_name]
+        if lane.row_ms is None:
+            return initial
+        target_ms = max(self.slice_ms, 2 * lane.fixed_ms)
+        rows = (target_ms - lane.fixed_ms) / lane.row_ms
+        # Tailles alternées (± 25 %) : sans variation, coût fixe et coût par ligne sont indiscernables
+        rows *= 0.75 if lane.chunks % 2 else 1.25
+        return int(max(1, min(max_rows, rows)))
+
+    def chunk_ms(self, lane_name: str, rows: int) -> float:
+        """Durée estimée d'un morceau de rows lignes"""
+        lane = self.lanes[lane_name]
+        return lane.fixed_ms + rows * (lane.row_ms or 0.0)
+
+    def record_chunk(self, ticket: Ticket, rows: int, elapsed_s: float):
+        """Ajuste coût fixe et coût par ligne (moindres carrés pondérés) sur la durée du morceau"""
+        lane = ticket.lane
+        lane.chunks += 1
+        if not rows:
+            return
+        x, y = float(rows), elapsed_s * 1000
+        lane._fit = [v * FIT_DECAY + d for v, d in zip(lane._fit, (1.0, x, y, x * x, x * y))]
+        w, sx, sy, sxx, sxy = lane._fit
+        variance = w * sxx - sx * sx
+        slope = (w * sxy - sx * sy) / variance if variance > 1e-6 * w * sxx else 0.0
+        if slope > 0:
+            lane.row_ms = slope
+            lane.fixed_ms = max((sy - slope * sx) / w, 0.0)
+        else:
+            # Un seul point ou mesures bruitées : tout le coût est attribué aux lignes
+            lane.row_ms = sy / sx
+            lane.fixed_ms = 0.0
+
+    async def checkpoint(self, ticket: Ticket):
+        """Entre deux morceaux : rend la main et attend que les voies plus prioritaires soient vides"""
+        await asyncio.sleep(YIELD_S)
+        lane = ticket.lane
+        preempted = False
+        while any(other.priority < lane.priority and other.busy for other in self.lanes.values()):
+            preempted = True
+            future = asyncio.get_running_loop().create_future()
+            self._preempted.append(future)
+            await future
+        lane.preemptions += preempted
+
+    def record_fallback(self, lane_name: str, count: int = 1):
+        self.lanes[lane_name].deadline_fallbacks += count
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'slice_ms': self.slice_ms,
+            'lanes': {name: lane.stats() for name, lane in self.lanes.items()}
+        }
+
+
+class LaneTracker:
+    """Middleware ASGI : compte les requêtes de chaque voie dès leur entrée dans l'application"""
+
+    def __init__(self, app, controller: AdmissionController, routes: Dict[str, str]):
+        self.app = app
+        self.controller = controller
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        lane_name = self.routes.get(scope.get('path')) if scope['type'] == 'http' else None
+        if lane_name is None:
+            return await self.app(scope, receive, send)
+        lane = self.controller.lanes[lane_name]
+        lane.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lane.in_flight -= 1
+            self.controller.wake_preempted()
+
+
+def _header_float(headers, name: str) -> Optional[float]:
+    """Valeur numérique finie d'un en-tête (None si absente ou invalide)"""
+    try:
+        value = float(headers.get(name, '').strip().removeprefix('t='))
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+def request_budget(headers) -> Dict[str, float]:
+    """
+    Budget de latence (X-Latency-Budget-Ms) et temps déjà écoulé (X-Request-Start) d'une requête
+
+    Les valeurs invalides ou invraisemblables sont ignorées (budget par défaut
+    de la voie, aucun temps écoulé) : un en-tête mal formé ne fait jamais
+    échouer la requête.
+    """
+    budget = {}
+    budget_ms = _header_float(headers, 'x-latency-budget-ms')
+    if budget_ms is not None and budget_ms > 0:
+        budget['budget_ms'] = budget_ms
+    start = _header_float(headers, 'x-request-start')
+    if start is not None:
+        # Formats usuels des répartiteurs : "t=<µs>" (nginx), millisecondes ou secondes (epoch)
+        start_ms = start / 1000 if start > 1e14 else start if start > 1e11 else start * 1000
+        elapsed_ms = time.time() * 1000 - start_ms
+        # Horloges désynchronisées ou unité inattendue : décompte ignoré
+        if 0.0 <= elapsed_ms <= MAX_ELAPSED_MS:
+            budget['elapsed_ms'] = elapsed_ms
+    return budget
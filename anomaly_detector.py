@@ -0,0 +1,196 @@
+# === DÉTECTEUR D'ANOMALIES NON SUPERVISÉ (ISOLATION FOREST) ===
+"""
+Second score, non supervisé, calculé à côté du modèle de fraude.
+
+Le modèle supervisé ne reconnaît que les schémas de fraude présents dans les
+étiquettes ; une Isolation Forest entraînée sur le même vecteur de features
+(prepare_features) signale les transactions atypiques, qu'elles ressemblent
+ou non à une fraude connue. Le score est renvoyé dans `anomaly_score` et une
+raison est ajoutée au-delà du seuil ; il ne modifie pas `is_fraud`.
+
+L'entraînement utilise scikit-learn (IsolationForest) ; l'inférence passe par
+une version "compilée" de la forêt : tous les arbres sont aplatis dans des
+tableaux NumPy (T arbres x N noeuds) et parcourus ensemble, un niveau de
+profondeur par opération vectorisée, au lieu d'un appel Python par arbre.
+Les scores sont identiques à IsolationForest.score_samples (au signe près).
+Le parcours compilé est le plus rapide jusqu'à quelques centaines de lignes ;
+au-delà de BULK_ROWS (scoring par lot), la forêt scikit-learn conservée dans
+l'objet prend le relais.
+
+    python anomaly_detector.py    # entraînement + validation + benchmark de latence
+
+Le notebook d'entraînement (train_ml_model.ipynb) appelle train_anomaly_detector
+sur le même X_train que le modèle supervisé.
+"""
+from typing import Dict, Any, List, Optional
+import time
+
+import numpy as np
+
+ANOMALY_MODEL_FILE = 'anomaly_detector.pkl'
+
+# Taille de lot à partir de laquelle scikit-learn (Cython, arbre par arbre) est plus rapide
+BULK_ROWS = 512
+
+
+def _average_path_length(n) -> np.ndarray:
+    """Longueur moyenne d'un chemin infructueux dans un BST de n éléments (c(n))"""
+    n = np.asarray(n, dtype=np.float64)
+    result = np.zeros_like(n)
+    result[n == 2] = 1.0
+    large = n > 2
+    result[large] = 2.0 * (np.log(n[large] - 1.0) + np.euler_gamma) - 2.0 * (n[large] - 1.0) / n[large]
+    return result
+
+
+class CompiledIsolationForest:
+    """Isolation Forest aplatie en tableaux NumPy, évaluée arbre par niveau"""
+
+    def __init__(self, forest, feature_names: List[str], contamination: float = 0.01,
+                 training_scores: Optional[np.ndarray] = None):
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        n_trees = len(trees)
+        max_nodes = max(tree.node_count for tree in trees)
+
+        self.forest = forest
+        self.feature_names = list(feature_names)
+        self.n_trees = n_trees
+        self.max_depth = max(tree.max_depth for tree in trees)
+        self.max_samples = forest.max_samples_
+
+        # Les feuilles pointent sur elles-mêmes : le parcours à profondeur fixe y reste
+        self.feature = np.zeros((n_trees, max_nodes), dtype=np.intp)
+        self.threshold = np.full((n_trees, max_nodes), np.inf)
+        self.children = np.zeros((n_trees, max_nodes, 2), dtype=np.intp)
+        self.path_length = np.zeros((n_trees, max_nodes))
+
+        for t, (tree, features) in enumerate(zip(trees, forest.estimators_features_)):
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left == -1
+            self.feature[t, nodes] = np.where(leaf, 0, np.asarray(features)[tree.feature.clip(min=0)])
+            self.threshold[t, nodes] = np.where(leaf, np.inf, tree.threshold)
+            self.children[t, nodes, 0] = np.where(leaf, nodes, tree.children_left)
+            self.children[t, nodes, 1] = np.where(leaf, nodes, tree.children_right)
+            self.path_length[t, nodes] = _node_depths(tree) + _average_path_length(tree.n_node_samples)
+
+        # Vues aplaties : noeud global = arbre * max_nodes + noeud (accès par np.take)
+        self._root = np.arange(n_trees) * max_nodes
+        self._feature_flat = self.feature.ravel()
+        self._threshold_flat = self.threshold.ravel()
+        self._children_flat = (self.children + self._root[:, None, None]).ravel()
+        self._path_length_flat = self.path_length.ravel()
+        self._normalizer = n_trees * _average_path_length([self.max_samples])[0]
+
+        self.contamination = contamination
+        self.threshold_score = (float(np.quantile(training_scores, 1 - contamination))
+                                if training_scores is not None else 0.5)
+
+    def score(self, X) -> np.ndarray:
+        """Score d'anomalie dans ]0, 1[ (plus élevé = plus atypique ; ~0,5 = normal)"""
+        if hasattr(X, 'to_numpy'):
+            X = X[self.feature_names].to_numpy()
+        # Mêmes comparaisons que scikit-learn : features en float32, seuils en float64
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+        if len(X) >= BULK_ROWS:
+            return -self.forest.score_samples(X)
+
+        node = np.tile(self._root, (len(X), 1))
+        for _ in range(self.max_depth):
+            values = np.take_along_axis(X, self._feature_flat.take(node), axis=1)
+            go_right = values > self._threshold_flat.take(node)
+            node = self._children_flat.take(2 * node + go_right)
+        depths = self._path_length_flat.take(node).sum(axis=1)
+        return 2.0 ** (-depths / self._normalizer)
+
+    def is_anomaly(self, scores: np.ndarray) -> np.ndarray:
+        return np.asarray(scores) > self.threshold_score
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'n_trees': self.n_trees,
+            'max_samples': int(self.max_samples),
+            'max_depth': int(self.max_depth),
+            'contamination': self.contamination,
+            'threshold_score': round(self.threshold_score, 4)
+        }
+
+
+def _node_depths(tree) -> np.ndarray:
+    depths = np.zeros(tree.node_count)
+    for node in range(tree.node_count):
+        for child in (tree.children_left[node], tree.children_right[node]):
+            if child != -1:
+                depths[child] = depths[node] + 1
+    return depths
+
+
+def train_anomaly_detector(X, n_estimators: int = 100, max_samples: int = 256,
+                           contamination: float = 0.01, random_state: int = 42):
+    """Entraîne une IsolationForest sur X et renvoie (forêt scikit-learn, version compilée)"""
+    from sklearn.ensemble import IsolationForest
+
+    forest = IsolationForest(n_estimators=n_estimators, max_samples=max_samples,
+                             random_state=random_state, n_jobs=1)
+    # Entraînement sur le tableau NumPy : la forêt est ensuite appelée sans noms de colonnes
+    values = X.to_numpy(dtype=np.float32)
+    forest.fit(values)
+    return forest, CompiledIsolationForest(forest, list(X.columns), contamination,
+                                           training_scores=-forest.score_samples(values))
+
+
+# === ENTRAÎNEMENT, VALIDATION ET BENCHMARK ===
+if __name__ == "__main__":
+    import joblib
+    from sklearn.metrics import roc_auc_score
+    from sklearn.model_selection import train_test_split
+
+    from data_access import load_transactions
+    from api_fraud_detection import prepare_features_batch, prepare_features, model, Transaction
+    # Classe importée depuis le module (et non __main__) pour que le pickle soit rechargeable par l'API
+    from anomaly_detector import train_anomaly_detector, BULK_ROWS
+
+    print("📂 Chargement et préparation du dataset...")
+    df = load_transactions()
+    X = prepare_features_batch(df)
+    y = df['fraude'].to_numpy()
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    print("🌲 Entraînement de l'Isolation Forest...")
+    forest, detector = train_anomaly_detector(X_train)
+    joblib.dump(detector, ANOMALY_MODEL_FILE)
+    print(f"   ✅ Détecteur sauvegardé: {ANOMALY_MODEL_FILE} {detector.info()}")
+
+    # Validation : scores du parcours compilé identiques à scikit-learn
+    compiled = np.concatenate([detector.score(X_test.iloc[i:i + BULK_ROWS - 1])
+                               for i in range(0, len(X_test), BULK_ROWS - 1)])
+    reference = -forest.score_samples(X_test.to_numpy(dtype=np.float32))
+    print(f"\n🔍 Écart max avec scikit-learn: {np.abs(compiled - reference).max():.2e}")
+
+    # Complémentarité avec le modèle supervisé
+    proba = model.predict_proba(X_test)[:, 1]
+    missed = (y_test == 1) & (proba <= 0.5)
+    flagged = detector.is_anomaly(compiled)
+    print(f"   ROC-AUC du score d'anomalie (fraude): {roc_auc_score(y_test, compiled):.4f}")
+    print(f"   Anomalies signalées: {flagged.mean():.2%} des transactions de test")
+    print(f"   Fraudes manquées par le modèle: {missed.sum()} dont {(missed & flagged).sum()} signalées "
+          f"comme anomalies")
+
+    # Latence : une transaction (chemin /predict) et un lot
+    def bench(fn, repeat):
+        fn()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - start) / repeat * 1000
+
+    transaction = Transaction(**df.iloc[0][['montant_dzd', 'heure_jour', 'type_transaction',
+                                            'categorie_marchand', 'canal_paiement', 'wilaya_client',
+                                            'revenu_client', 'anciennete_client_jours']].to_dict())
+    print("\n⏱️ Latence")
+    print(f"   prepare_features + predict_proba (référence /predict): "
+          f"{bench(lambda: model.predict_proba(prepare_features(transaction)), 200):.3f} ms")
+    values = X_test.to_numpy(dtype=np.float32)
+    for n_rows in (1, 64, len(values)):
+        rows = values[:n_rows]
+        print(f"   {n_rows:>5} transaction(s) - scikit-learn: {bench(lambda: forest.score_samples(rows), 50):.3f} ms"
+              f" | détecteur: {bench(lambda: detector.score(rows), 50):.3f} ms")
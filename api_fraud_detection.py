@@ -1,14 +1,30 @@
 # === ÉTAPE 3.1: IMPORTATIONS ===
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse, Response
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 from typing import Optional, List, Dict, Any
 import pandas as pd
 import numpy as np
 import joblib
 from datetime import datetime
 import json
+import hashlib
+import os
+import time
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
+from drift_monitor import DriftMonitor, REFERENCE_FILE as DRIFT_REFERENCE_FILE
+from audit_log import AuditSink, new_decision_id, AUDIT_DIR
+from decision_stream import DecisionStreamAggregator, format_sse
+from similarity_index import build_from_dataset as build_similarity_index, summarize_neighbours
+from anomaly_detector import ANOMALY_MODEL_FILE
+from feedback_store import FeedbackIngestor, FEEDBACK_DIR, load_feedback
+from risk_aggregates import load_or_bootstrap as load_risk_aggregates, DIMENSIONS as RISK_DIMENSIONS, AGGREGATES_FILE
+from rule_engine import RuleEngine, RULES_FILE
+from quantized_model import load_quantized_model, QUANTIZED_MODEL_FILE
+from admission_control import AdmissionController, LaneTracker, LaneFull, DeadlineExceeded, request_budget
+from fallback_model import load_fallback_model, TierUsage, FALLBACK_MODEL_FILE
+import asyncio
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -35,6 +51,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Voies prioritaires : /predict (interactive) passe avant les morceaux de /predict/batch (bulk)
+admission = AdmissionController.from_env()
+app.add_middleware(LaneTracker, controller=admission,
+                   routes={"/predict": "interactive", "/predict/batch": "bulk", "/feedback": "bulk"})
+
 # === ÉTAPE 3.3: CHARGEMENT DES MODÈLES ===
 print("📂 Chargement des modèles et encodeurs...")
 
@@ -57,9 +78,103 @@ try:
         metrics = json.load(f)
     print("   ✅ Métriques chargées")
     
+    # Version du modèle : empreinte du fichier, tracée dans le journal d'audit
+    with open('fraud_detection_model.pkl', 'rb') as f:
+        model_version = hashlib.sha256(f.read()).hexdigest()[:12]
+    
 except Exception as e:
+    # L'API démarre quand même : les décisions passent par le modèle de repli (mode dégradé)
+    model = encoder = model_version = None
+    features_info, metrics = {}, {}
     print(f"❌ Erreur lors du chargement: {e}")
-    raise RuntimeError(f"Impossible de charger les modèles: {e}")
+    print("   ⚠️ Modèle principal indisponible : décisions en mode dégradé")
+
+# Moniteur de dérive (optionnel : l'API fonctionne sans référence)
+try:
+    drift_monitor = DriftMonitor.from_file(DRIFT_REFERENCE_FILE)
+    print("   ✅ Référence de dérive chargée")
+except Exception as e:
+    drift_monitor = None
+    print(f"   ⚠️ Surveillance de dérive désactivée: {e}")
+
+# Détecteur d'anomalies non supervisé (optionnel : entraîné par python anomaly_detector.py)
+try:
+    anomaly_detector = joblib.load(ANOMALY_MODEL_FILE)
+    print("   ✅ Détecteur d'anomalies chargé")
+except Exception as e:
+    anomaly_detector = None
+    print(f"   ⚠️ Score d'anomalie désactivé: {e}")
+
+# Scoring de masse en précision réduite (optionnel : SCORING_PRECISION=quantized,
+# modèle construit et validé par python quantized_model.py)
+SCORING_PRECISION = os.environ.get('SCORING_PRECISION', 'float64')
+quantized_model = None
+if SCORING_PRECISION == 'quantized' and model is not None:
+    try:
+        quantized_model = load_quantized_model(QUANTIZED_MODEL_FILE, model_version)
+        print("   ✅ Scoring de masse quantifié (features uint8)")
+    except Exception as e:
+        print(f"   ⚠️ Scoring quantifié désactivé, retour au float64: {e}")
+
+# Taux de fraude par marchand / catégorie / wilaya (optionnel : reconstruits depuis le dataset si absents)
+try:
+    risk_aggregates = load_risk_aggregates(AGGREGATES_FILE)
+    print(f"   ✅ Agrégats de risque chargés ({risk_aggregates.total} transactions étiquetées)")
+except Exception as e:
+    risk_aggregates = None
+    print(f"   ⚠️ Agrégats de risque désactivés: {e}")
+
+# Règles métier déclaratives (optionnel : rechargées à chaud quand le fichier change)
+try:
+    rule_engine = RuleEngine(os.environ.get('RULES_FILE', RULES_FILE),
+                             check_interval_s=float(os.environ.get('RULES_CHECK_INTERVAL_S', 2.0)))
+    print(f"   ✅ Règles métier chargées ({len(rule_engine.rules)} règles)")
+except Exception as e:
+    rule_engine = None
+    print(f"   ⚠️ Règles métier désactivées: {e}")
+
+# Modèle de repli distillé (optionnel : python fallback_model.py), utilisé quand le modèle
+# principal est absent, en erreur, surchargé ou hors budget de latence
+try:
+    fallback_model = load_fallback_model(os.environ.get('FALLBACK_MODEL_FILE', FALLBACK_MODEL_FILE))
+    if model_version is not None and fallback_model.model_version != model_version:
+        print(f"   ⚠️ Modèle de repli distillé depuis le modèle {fallback_model.model_version}, "
+              f"modèle chargé {model_version}")
+    print(f"   ✅ Modèle de repli chargé (arbre distillé, profondeur {fallback_model.depth})")
+except Exception as e:
+    fallback_model = None
+    print(f"   ⚠️ Modèle de repli désactivé, mode dégradé limité aux règles métier: {e}")
+
+# Décisions par niveau de scoring (modele / distille / regles)
+tier_usage = TierUsage()
+
+# Journal d'audit des décisions (écriture asynchrone par lots)
+# Les décisions sont déposées depuis la boucle asyncio : la politique "block" la gèlerait
+# à chaque ralentissement du disque, elle est donc refusée ici
+AUDIT_OVERFLOW_POLICY = os.environ.get('AUDIT_OVERFLOW_POLICY', 'drop_oldest')
+if AUDIT_OVERFLOW_POLICY == 'block':
+    print("   ⚠️ AUDIT_OVERFLOW_POLICY=block refusée pour l'API (bloquerait la boucle), drop_oldest utilisée")
+    AUDIT_OVERFLOW_POLICY = 'drop_oldest'
+audit_sink = AuditSink(
+    directory=os.environ.get('AUDIT_LOG_DIR', AUDIT_DIR),
+    feature_names=features_info.get('all_features'),
+    max_buffer=int(os.environ.get('AUDIT_MAX_BUFFER', 100_000)),
+    overflow=AUDIT_OVERFLOW_POLICY
+)
+
+# Verdicts des analystes : jointure avec l'audit, base d'entraînement, précision / rappel en ligne
+# (désactivés sans le modèle principal : le schéma de la base dépend de ses features)
+feedback = None
+if features_info:
+    feedback = FeedbackIngestor(
+        feature_names=features_info['all_features'],
+        directory=os.environ.get('FEEDBACK_STORE_DIR', FEEDBACK_DIR),
+        audit_dir=audit_sink.directory,
+        risk_aggregates=risk_aggregates
+    )
+
+# Agrégats des décisions pour la surveillance en direct (5 dernières minutes)
+decision_stream = DecisionStreamAggregator(horizon_s=300)
 
 # === ÉTAPE 3.4: DÉFINITION DES MODÈLES PYDANTIC ===
 
@@ -73,6 +188,7 @@ class Transaction(BaseModel):
     wilaya_client: str = Field(..., description="Wilaya du client")
     revenu_client: float = Field(..., gt=0, description="Revenu mensuel du client")
     anciennete_client_jours: int = Field(..., ge=0, description="Ancienneté du compte en jours")
+    marchand_id: Optional[str] = Field(None, description="Identifiant du marchand (agrégats de risque)")
     
     # Features calculées (optionnelles - peuvent être calculées automatiquement)
     montant_anormal_score: Optional[float] = None
@@ -143,6 +259,10 @@ class FraudCheckResponse(BaseModel):
     recommendation: str
     features_used: Dict[str, Any]
     model_confidence: float
+    anomaly_score: Optional[float] = None
+    rules_fired: List[str] = []
+    scoring_tier: str = "modele"
+    degraded: bool = False
     
     class Config:
         schema_extra = {
@@ -158,7 +278,11 @@ class FraudCheckResponse(BaseModel):
                     "montant_dzd": 8500.0,
                     "heure_inhabituelle": 0
                 },
-                "model_confidence": 0.88
+                "model_confidence": 0.88,
+                "anomaly_score": 0.41,
+                "rules_fired": [],
+                "scoring_tier": "modele",
+                "degraded": False
             }
         }
 
@@ -168,6 +292,28 @@ class BatchFraudCheckResponse(BaseModel):
     summary: Dict[str, Any]
     processing_time_ms: float
 
+class Verdict(BaseModel):
+    """Verdict d'un analyste sur une décision"""
+    transaction_id: str = Field(..., description="Identifiant renvoyé par /predict")
+    fraude: bool = Field(..., description="Fraude confirmée (true) ou transaction légitime / faux positif (false)")
+    raison_fraude: Optional[str] = Field(None, description="Motif de fraude confirmé")
+    analyste: Optional[str] = None
+
+class FeedbackBatch(BaseModel):
+    """Lot de verdicts (jusqu'à plusieurs centaines de milliers)"""
+    verdicts: List[Verdict]
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "verdicts": [
+                    {"transaction_id": "TXN_1760871234567_1a2b3c4d_000042", "fraude": True,
+                     "raison_fraude": "MONTANT_INHABITUEL", "analyste": "a.benali"},
+                    {"transaction_id": "TXN_1760871234890_1a2b3c4d_000043", "fraude": False}
+                ]
+            }
+        }
+
 class HealthCheck(BaseModel):
     """Réponse de santé de l'API"""
     status: str
@@ -265,7 +411,110 @@ def prepare_features(transaction: Transaction) -> pd.DataFrame:
     
     return final_df
 
-def analyze_fraud_reasons(transaction: Transaction, fraud_probability: float) -> List[str]:
+def add_derived_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Copie du DataFrame complétée des features calculées (version vectorisée de calculate_features)"""
+    df = df.copy()
+    revenu = df['revenu_client'].clip(lower=1)
+    
+    # Features calculées absentes ou manquantes : même logique que calculate_features
+    montant_moyen = (df['revenu_client'] * 0.1).clip(lower=1)
+    derived = {
+        'montant_anormal_score': (df['montant_dzd'] - df['revenu_client'] * 0.1).abs() / montant_moyen,
+        'heure_inhabituelle': df['heure_jour'].between(1, 5).astype(int),
+        'localisation_etrangere': pd.Series(0, index=df.index),
+        'categorie_risquee': df['categorie_marchand'].isin(['VOYAGE', 'ELECTRONIQUE', 'IMMOBILIER']).astype(int),
+        'ratio_montant_revenu': df['montant_dzd'] / revenu
+    }
+    for col, values in derived.items():
+        df[col] = df[col].fillna(values) if col in df.columns else values
+    return df
+
+def prepare_features_batch(df: pd.DataFrame) -> pd.DataFrame:
+    """Prépare les features pour un DataFrame de transactions (version vectorisée)"""
+    df = add_derived_features(df)
+    
+    numerical_features = features_info['numerical_features']
+    binary_features = features_info['binary_features']
+    categorical_features = features_info['categorical_features']
+    
+    categorical_encoded = encoder.transform(df[categorical_features])
+    categorical_encoded_df = pd.DataFrame(
+        categorical_encoded,
+        columns=encoder.get_feature_names_out(categorical_features)
+    )
+    
+    final_df = pd.concat([df[numerical_features + binary_features].reset_index(drop=True),
+                          categorical_encoded_df], axis=1)
+    
+    return final_df.reindex(columns=features_info['all_features'], fill_value=0)
+
+# Index des transactions historiques (optionnel : l'API fonctionne sans le dataset)
+try:
+    similarity_index = build_similarity_index(prepare_features_batch, features_info)
+    print(f"   ✅ Index des cas similaires construit ({similarity_index.size} transactions)")
+except Exception as e:
+    similarity_index = None
+    print(f"   ⚠️ Recherche de cas similaires désactivée: {e}")
+
+def score_anomalies(features: np.ndarray) -> List[Optional[float]]:
+    """Scores d'anomalie d'un lot de vecteurs de features (None si le détecteur est absent)"""
+    if anomaly_detector is None:
+        return [None] * len(features)
+    return anomaly_detector.score(features).tolist()
+
+def get_risk_features(transaction: Transaction) -> Dict[str, float]:
+    """Taux de fraude lissés et volumes du marchand, de la catégorie et de la wilaya (O(1))"""
+    if risk_aggregates is None:
+        return {}
+    return risk_aggregates.features(vars(transaction))
+
+def evaluate_rules(transactions: List[Transaction], probabilities: List[float],
+                   anomaly_scores: List[Optional[float]], risk_features: List[Dict[str, float]]):
+    """Règles métier d'un lot de transactions, évaluées en un seul passage (None si désactivées)"""
+    if rule_engine is None:
+        return None
+    records = [
+        {**vars(transaction), **risk, "fraud_probability": float(probability),
+         "anomaly_score": np.nan if anomaly is None else anomaly}
+        for transaction, probability, anomaly, risk in zip(transactions, probabilities, anomaly_scores, risk_features)
+    ]
+    columns = {name: [record[name] for record in records] for name in records[0]}
+    return rule_engine.evaluate(columns, n_rows=len(records))
+
+def rules_tier_probabilities(rules, n_rows: int) -> np.ndarray:
+    """Probabilité du niveau regles : score des règles déclenchées (0.0 sans règles), même seuil > 0.5"""
+    if rules is None:
+        return np.zeros(n_rows)
+    return np.asarray(rules.score, dtype=float)
+
+def apply_rules(result: Dict[str, Any], rules, i: int) -> Dict[str, Any]:
+    """
+    Combine les règles déclenchées pour la ligne i avec la décision du modèle
+    
+    BLOQUER impose la fraude, REVISER une vérification manuelle ; toutes les
+    règles déclenchées sont ajoutées aux raisons.
+    """
+    if rules is None:
+        return result
+    fired = rules.fired_rules(i)
+    result["rules_fired"] = [rule.id for rule in fired]
+    if not fired:
+        return result
+    
+    deciding = rules.rules[rules.deciding[i]]
+    result["reasons"] = [r for r in result["reasons"] if r != "Transaction normale"] + [
+        f"Règle métier {rule.id}: {rule.description}" for rule in fired
+    ]
+    if deciding.action == "BLOQUER":
+        result.update(is_fraud=True, risk_level="HIGH", risk_score=max(result["risk_score"], 0.9),
+                      recommendation=f"BLOQUER - Règle métier {deciding.id}")
+    elif deciding.action == "REVISER" and not result["is_fraud"]:
+        result["recommendation"] = f"VÉRIFIER - Règle métier {deciding.id}"
+    return result
+
+def analyze_fraud_reasons(transaction: Transaction, fraud_probability: float,
+                          anomaly_score: Optional[float] = None,
+                          risk_features: Optional[Dict[str, float]] = None) -> List[str]:
     """Analyse les raisons potentielles de fraude"""
     reasons = []
     
@@ -291,6 +540,14 @@ def analyze_fraud_reasons(transaction: Transaction, fraud_probability: float) ->
     if transaction.anciennete_client_jours < 90:
         reasons.append("Compte client récent")
     
+    if anomaly_score is not None and anomaly_detector.is_anomaly(anomaly_score):
+        reasons.append(f"Transaction atypique (score d'anomalie: {anomaly_score:.2f})")
+    
+    # Marchand dont le taux de fraude observé dépasse le double du taux global
+    if (risk_features and risk_features['volume_marchand'] >= 20
+            and risk_features['taux_fraude_marchand'] > 2 * risk_aggregates.global_rate):
+        reasons.append(f"Marchand à taux de fraude élevé ({risk_features['taux_fraude_marchand']:.1%})")
+    
     if not reasons and fraud_probability < 0.3:
         reasons.append("Transaction normale")
     
@@ -324,8 +581,373 @@ def get_risk_level(fraud_probability: float) -> tuple:
     else:
         return "VERY_LOW", 0.1
 
+# Champs bruts obligatoires d'une transaction (les features calculées sont optionnelles)
+RAW_FIELDS = [
+    'montant_dzd', 'heure_jour', 'type_transaction', 'categorie_marchand',
+    'canal_paiement', 'wilaya_client', 'revenu_client', 'anciennete_client_jours'
+]
+NUMERIC_RAW_FIELDS = ['montant_dzd', 'heure_jour', 'revenu_client', 'anciennete_client_jours']
+
+def validate_batch(df: pd.DataFrame) -> pd.Series:
+    """Motif de rejet par ligne (chaîne vide si la ligne est valide), mêmes règles que Transaction"""
+    errors = pd.Series('', index=df.index)
+    checks = [
+        (df[RAW_FIELDS].isna().any(axis=1), "valeur manquante"),
+        (~(df['montant_dzd'] > 0), "montant_dzd doit être > 0"),
+        (~df['heure_jour'].between(0, 23), "heure_jour hors de [0, 23]"),
+        (~(df['revenu_client'] > 0), "revenu_client doit être > 0"),
+        (~(df['anciennete_client_jours'] >= 0), "anciennete_client_jours doit être >= 0"),
+    ]
+    if encoder is not None:
+        for col, categories in zip(features_info['categorical_features'], encoder.categories_):
+            checks.append((~df[col].isin(categories), f"{col} inconnue"))
+    
+    for mask, message in reversed(checks):
+        errors[mask] = message
+    return errors
+
+def unknown_categories(transaction: Transaction) -> List[str]:
+    """Catégories inconnues de l'encodeur (erreur de saisie : 400, jamais de mode dégradé)"""
+    if encoder is None:
+        return []
+    return [
+        f"{col} inconnue: {getattr(transaction, col)}"
+        for col, categories in zip(features_info['categorical_features'], encoder.categories_)
+        if getattr(transaction, col) not in categories
+    ]
+
+def score_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Score vectorisé d'un DataFrame de transactions (même pipeline que /predict)"""
+    missing = [c for c in RAW_FIELDS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes: {missing}")
+    
+    # Colonnes numériques d'un CSV : une cellule non numérique rejette sa ligne, pas tout le lot
+    df = df.reset_index(drop=True)
+    numeric = df[NUMERIC_RAW_FIELDS].apply(pd.to_numeric, errors='coerce')
+    not_numeric = (numeric.isna() & df[NUMERIC_RAW_FIELDS].notna()).any(axis=1)
+    df = df.assign(**numeric)
+    errors = validate_batch(df)
+    errors[not_numeric] = "valeur non numérique"
+    valid = (errors == '').to_numpy()
+    
+    proba = np.full(len(df), np.nan)
+    anomaly = np.full(len(df), np.nan)
+    tier = "modele" if model is not None else "distille" if fallback_model is not None else "regles"
+    if valid.any():
+        start = time.perf_counter()
+        if tier == "distille":
+            # Mode dégradé : arbre distillé (sans arbre, règles métier seules)
+            proba[valid] = fallback_model.predict_frame(add_derived_features(df[valid]))
+        elif tier == "modele":
+            if quantized_model is not None:
+                # Features float32 construites depuis les colonnes brutes, puis bins uint8 :
+                # mêmes décisions que le chemin float64
+                features = quantized_model.float_features(add_derived_features(df[valid]))
+                proba[valid] = quantized_model.predict_proba(quantized_model.bin_features(features))
+            else:
+                features = prepare_features_batch(df[valid])
+                proba[valid] = model.predict_proba(features)[:, 1]
+            if anomaly_detector is not None:
+                anomaly[valid] = anomaly_detector.score(features)
+        tier_usage.record(tier, int(valid.sum()), time.perf_counter() - start,
+                          None if tier == "modele" else "modele_indisponible")
+    
+    # Règles métier : tout le lot en un passage, même combinaison que apply_rules
+    rules = None
+    rows = np.flatnonzero(valid)
+    if rule_engine is not None and valid.any():
+        frame = add_derived_features(df[valid]).assign(fraud_probability=proba[valid], anomaly_score=anomaly[valid])
+        if risk_aggregates is not None:
+            frame = frame.join(risk_aggregates.features_batch(frame))
+        rules = rule_engine.evaluate(frame)
+    if tier == "regles":
+        proba[rows] = rules_tier_probabilities(rules, len(rows))
+    
+    is_fraud = proba > 0.5
+    risk_level = np.select([proba >= 0.7, proba >= 0.4, proba >= 0.2], ["HIGH", "MEDIUM", "LOW"], "VERY_LOW")
+    risk_score = np.select([proba >= 0.7, proba >= 0.4, proba >= 0.2], [0.9, 0.6, 0.3], 0.1)
+    recommendation = np.select(
+        [is_fraud & (proba > 0.8), is_fraud & (proba > 0.6), is_fraud,
+         risk_level == "HIGH", risk_level == "MEDIUM"],
+        ["BLOQUER - Fraude confirmée", "SUSPENDRE - Nécessite vérification manuelle",
+         "SURVEILLER - Risque modéré", "VÉRIFIER - Risque élevé détecté", "SURVEILLER - Risque moyen"],
+        "APPROUVER - Risque faible"
+    ).astype(object)
+    
+    rules_fired = np.full(len(df), '', dtype=object)
+    if rules is not None:
+        rules_fired[rows] = rules.fired_ids()
+        deciding = np.array([rule.id for rule in rules.rules] + [''], dtype=object)[rules.deciding]
+        block = rules.action == "BLOQUER"
+        review = (rules.action == "REVISER") & ~is_fraud[rows]
+        is_fraud[rows[block]] = True
+        risk_level[rows[block]] = "HIGH"
+        risk_score[rows[block]] = np.maximum(risk_score[rows[block]], 0.9)
+        recommendation[rows[block]] = "BLOQUER - Règle métier " + deciding[block]
+        recommendation[rows[review]] = "VÉRIFIER - Règle métier " + deciding[review]
+    
+    result = pd.DataFrame({
+        "fraud_probability": proba,
+        "is_fraud": is_fraud,
+        "risk_level": risk_level,
+        "risk_score": risk_score,
+        "recommendation": recommendation,
+        "anomaly_score": anomaly,
+        "regles": rules_fired,
+        "scoring_tier": tier,
+        "erreur": errors.to_numpy()
+    })
+    result.loc[~valid, ["risk_level", "recommendation"]] = None
+    result.loc[~valid, "risk_score"] = np.nan
+    return result
+
+def build_audit_record(result: Dict[str, Any], transaction: Transaction, features: np.ndarray,
+                       processing_time_ms: Optional[float], endpoint: str) -> Dict[str, Any]:
+    """
+    Construit l'enregistrement d'audit d'une décision (sérialisé hors du chemin de requête)
+    
+    Version propre à chaque niveau de scoring ("<version>/distille", "<version>/regles") :
+    une décision du mode dégradé n'est jamais attribuée au modèle principal.
+    """
+    tier = result["scoring_tier"]
+    return {
+        "decision_id": result["transaction_id"],
+        "ts_ms": int(time.time() * 1000),
+        "endpoint": endpoint,
+        "model_version": model_version if tier == "modele" else f"{model_version or 'indisponible'}/{tier}",
+        "input": dict(vars(transaction)),
+        "features": features,
+        "fraud_probability": result["fraud_probability"],
+        "is_fraud": result["is_fraud"],
+        "risk_level": result["risk_level"],
+        "recommendation": result["recommendation"],
+        "reasons": result["reasons"],
+        "anomaly_score": result["anomaly_score"],
+        "rules_fired": result["rules_fired"],
+        "scoring_tier": result["scoring_tier"],
+        "processing_time_ms": processing_time_ms
+    }
+
+def score_transactions(transactions: List[Transaction], endpoint: str) -> List[Dict[str, Any]]:
+    """Scoring vectorisé d'un morceau de batch : mêmes décisions que /predict, un appel au modèle"""
+    for transaction in transactions:
+        calculate_features(transaction)
+    start = time.perf_counter()
+    features_df = prepare_features_batch(pd.DataFrame([vars(t) for t in transactions]))
+    features = features_df.to_numpy()
+    if quantized_model is not None:
+        # Scoring de masse quantifié (mêmes décisions que le float64, voir quantized_model.py)
+        probabilities = quantized_model.predict_proba(quantized_model.bin_features(features_df))
+    else:
+        probabilities = model.predict_proba(features_df)[:, 1]
+    tier_usage.record("modele", len(transactions), time.perf_counter() - start)
+    anomaly_scores = score_anomalies(features)
+    batch_risk_features = [get_risk_features(transaction) for transaction in transactions]
+    
+    # Règles métier de tout le morceau en un seul passage
+    rules = evaluate_rules(transactions, probabilities, anomaly_scores, batch_risk_features)
+    
+    results = []
+    for i, (transaction, anomaly_score, fraud_probability, risk_features) in enumerate(zip(
+            transactions, anomaly_scores, probabilities, batch_risk_features)):
+        is_fraud = fraud_probability > 0.5
+        risk_level, risk_score = get_risk_level(fraud_probability)
+        reasons = analyze_fraud_reasons(transaction, fraud_probability, anomaly_score, risk_features)
+        recommendation = get_recommendation(is_fraud, risk_level, fraud_probability)
+        
+        if drift_monitor is not None:
+            drift_monitor.update(vars(transaction), fraud_probability)
+        
+        result = {
+            "transaction_id": new_decision_id(),
+            "is_fraud": bool(is_fraud),
+            "fraud_probability": float(fraud_probability),
+            "risk_level": risk_level,
+            "risk_score": float(risk_score),
+            "reasons": reasons,
+            "recommendation": recommendation,
+            "features_used": {
+                "montant_dzd": float(transaction.montant_dzd),
+                "heure_jour": transaction.heure_jour,
+                "montant_anormal_score": float(transaction.montant_anormal_score or 0),
+                "heure_inhabituelle": transaction.heure_inhabituelle or 0,
+                **risk_features
+            },
+            "model_confidence": float(max(fraud_probability, 1 - fraud_probability)),
+            "anomaly_score": anomaly_score,
+            "rules_fired": [],
+            "scoring_tier": "modele",
+            "degraded": False
+        }
+        results.append(apply_rules(result, rules, i))
+        
+        audit_sink.submit(build_audit_record(result, transaction, features[i], None, endpoint))
+        decision_stream.record(result["is_fraud"], result["risk_level"], transaction.wilaya_client,
+                               transaction.categorie_marchand)
+    return results
+
+# Motifs de passage en mode dégradé (métriques par niveau de scoring)
+DEGRADED_REASONS = {
+    "modele_indisponible": "modèle principal indisponible",
+    "erreur": "erreur du modèle principal",
+    "surcharge": "file d'attente saturée",
+    "echeance": "budget de latence insuffisant"
+}
+
+def fallback_decisions(transactions: List[Transaction], reason: str, endpoint: str,
+                       detail: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Décisions en mode dégradé, sans le modèle principal (degraded = True)
+    
+    Arbre distillé (quelques µs par transaction) puis règles métier, comme
+    pour le modèle principal. Sans arbre, règles métier seules : le score est
+    la somme pondérée des règles déclenchées (comme le dashboard) et une règle
+    BLOQUER impose la fraude.
+    
+    Ce chemin ne doit jamais échouer : un agrégat, l'arbre ou les règles en
+    erreur sont ignorés (motif ajouté aux raisons) ; sans arbre ni règles, le
+    score est neutre (0.0, pas de fraude).
+    """
+    notes = []
+    for transaction in transactions:
+        calculate_features(transaction)
+    try:
+        batch_risk_features = [get_risk_features(transaction) for transaction in transactions]
+    except Exception as e:
+        batch_risk_features = [{} for _ in transactions]
+        notes.append(f"Agrégats de risque indisponibles: {e}")
+    no_anomaly = [None] * len(transactions)
+    
+    start = time.perf_counter()
+    tier, probabilities = "regles", None
+    if fallback_model is not None:
+        try:
+            probabilities = fallback_model.score_many([vars(transaction) for transaction in transactions])
+            tier = "distille"
+        except Exception as e:
+            notes.append(f"Modèle de repli en erreur: {e}")
+    scoring_s = time.perf_counter() - start
+    try:
+        rules = evaluate_rules(transactions, probabilities if tier == "distille" else [np.nan] * len(transactions),
+                               no_anomaly, batch_risk_features)
+    except Exception as e:
+        rules = None
+        notes.append(f"Règles métier indisponibles: {e}")
+    if tier == "regles":
+        probabilities = rules_tier_probabilities(rules, len(transactions))
+        scoring_s = time.perf_counter() - start
+    tier_usage.record(tier, len(transactions), scoring_s, reason)
+    if notes:
+        print(f"⚠️ Mode dégradé partiel: {'; '.join(notes)}")
+    
+    label = DEGRADED_REASONS[reason]
+    degraded_reason = f"Mode dégradé ({label}): {detail}" if detail else f"Mode dégradé: {label}"
+    
+    results = []
+    for i, (transaction, fraud_probability, risk_features) in enumerate(zip(
+            transactions, probabilities, batch_risk_features)):
+        fraud_probability = float(fraud_probability)
+        is_fraud = fraud_probability > 0.5
+        risk_level, risk_score = get_risk_level(fraud_probability)
+        reasons = [degraded_reason] + notes
+        if tier == "distille":
+            reasons += analyze_fraud_reasons(transaction, fraud_probability, None, risk_features)
+        result = {
+            "transaction_id": new_decision_id(),
+            "is_fraud": bool(is_fraud),
+            "fraud_probability": fraud_probability,
+            "risk_level": risk_level,
+            "risk_score": float(risk_score),
+            "reasons": reasons,
+            "recommendation": get_recommendation(is_fraud, risk_level, fraud_probability),
+            "features_used": {
+                "montant_dzd": float(transaction.montant_dzd),
+                "heure_jour": transaction.heure_jour,
+                "montant_anormal_score": float(transaction.montant_anormal_score or 0),
+                "heure_inhabituelle": transaction.heure_inhabituelle or 0,
+                "localisation_etrangere": transaction.localisation_etrangere or 0,
+                "categorie_risquee": transaction.categorie_risquee or 0,
+                "ratio_montant_revenu": float(transaction.ratio_montant_revenu or 0),
+                **risk_features
+            },
+            "model_confidence": max(fraud_probability, 1 - fraud_probability),
+            "anomaly_score": None,
+            "rules_fired": [],
+            "scoring_tier": tier,
+            "degraded": True
+        }
+        results.append(apply_rules(result, rules, i))
+        
+        audit_sink.submit(build_audit_record(result, transaction, None, None, endpoint))
+        decision_stream.record(result["is_fraud"], result["risk_level"], transaction.wilaya_client,
+                               transaction.categorie_marchand)
+    return results
+
+def summarize_batch(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Statistiques d'un batch de décisions"""
+    fraud_count = sum(1 for r in results if r["is_fraud"])
+    return {
+        "total_transactions": len(results),
+        "fraudulent_transactions": fraud_count,
+        "fraud_rate": f"{(fraud_count / len(results)) * 100:.2f}%",
+        "average_fraud_probability": float(np.mean([r["fraud_probability"] for r in results])),
+        "high_risk_count": sum(1 for r in results if r["risk_level"] == "HIGH"),
+        "medium_risk_count": sum(1 for r in results if r["risk_level"] == "MEDIUM"),
+        "low_risk_count": sum(1 for r in results if r["risk_level"] in ["LOW", "VERY_LOW"]),
+        "fallback_count": sum(1 for r in results if r["scoring_tier"] != "modele")
+    }
+
+def encode_json(content: Any) -> bytes:
+    """Sérialisation JSON d'un morceau de réponse (valeurs NumPy converties)"""
+    return json.dumps(content, ensure_ascii=False, default=lambda value: value.item()).encode("utf-8")
+
+# Validation du corps de /predict/batch par morceaux (entre deux morceaux, /predict peut passer)
+_transactions_adapter = TypeAdapter(List[Transaction])
+VALIDATION_CHUNK_ROWS = 2000
+
+BATCH_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": {
+            "title": "BatchTransactions",
+            "type": "object",
+            "required": ["transactions"],
+            "properties": {"transactions": {
+                "type": "array", "items": {"$ref": "#/components/schemas/Transaction"}
+            }},
+            "example": BatchTransactions.Config.schema_extra["example"]
+        }}}
+    }
+}
+
+# Même principe pour les verdicts de /feedback (jusqu'à plusieurs centaines de milliers par lot)
+_verdicts_adapter = TypeAdapter(List[Verdict])
+
+FEEDBACK_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": {
+            "title": "FeedbackBatch",
+            "type": "object",
+            "required": ["verdicts"],
+            "properties": {"verdicts": {"type": "array", "items": Verdict.model_json_schema()}},
+            "example": FeedbackBatch.Config.schema_extra["example"]
+        }}}
+    }
+}
+
 # === ÉTAPE 3.6: ENDPOINTS DE L'API ===
 
+@app.on_event("shutdown")
+def flush_audit_log():
+    """Écrit les décisions encore en mémoire avant l'arrêt"""
+    audit_sink.close()
+    if feedback is not None:
+        feedback.close()
+    if risk_aggregates is not None and risk_aggregates.updates_since_save:
+        risk_aggregates.save(AGGREGATES_FILE)
+
 @app.get("/", tags=["Root"])
 async def root():
     """Endpoint racine"""
@@ -340,8 +962,8 @@ async def root():
 async def health_check():
     """Vérifie la santé de l'API et du modèle"""
     return {
-        "status": "healthy",
-        "model_loaded": True,
+        "status": "healthy" if model is not None else "degraded",
+        "model_loaded": model is not None,
         "model_name": metrics.get("best_model", "Random Forest"),
         "model_metrics": metrics.get("test_metrics", {}),
         "timestamp": datetime.now().isoformat(),
@@ -356,11 +978,34 @@ async def get_model_info():
         "performance_metrics": metrics.get("test_metrics"),
         "training_info": metrics.get("training_info"),
         "features_count": len(features_info.get("all_features", [])),
-        "model_loaded": True
+        "model_version": model_version,
+        "model_loaded": model is not None,
+        "fallback_model": fallback_model.info() if fallback_model is not None else None,
+        "bulk_scoring": {
+            # /predict reste en float64 ; /predict/batch, le rejeu et le dashboard suivent SCORING_PRECISION
+            "paths": {
+                "/predict": "float64",
+                "/predict/batch": "uint8" if quantized_model is not None else "float64",
+                "score_frame": "uint8" if quantized_model is not None else "float64"
+            },
+            **(quantized_model.info() if quantized_model is not None else {"precision": "float64"})
+        },
+        "anomaly_detector": anomaly_detector.info() if anomaly_detector is not None else None,
+        "rules": len(rule_engine.rules) if rule_engine is not None else None,
+        "online_metrics": feedback.metrics().get(model_version) if feedback is not None else None
     }
 
+def score_with_model(transaction: Transaction):
+    """Features, probabilité de fraude, confiance et score d'anomalie du modèle principal (exécuté hors boucle)"""
+    features_df = prepare_features(transaction)
+    proba = model.predict_proba(features_df)[0]
+    
+    # Score d'anomalie (non supervisé, même vecteur de features)
+    anomaly_score = score_anomalies(features_df.to_numpy())[0]
+    return features_df, proba[1], proba.max(), anomaly_score
+
 @app.post("/predict", response_model=FraudCheckResponse, tags=["Prediction"])
-async def predict_fraud(transaction: Transaction):
+async def predict_fraud(transaction: Transaction, request: Request):
     """
     Prédit si une transaction est frauduleuse
     
@@ -372,23 +1017,51 @@ async def predict_fraud(transaction: Transaction):
     - **wilaya_client**: Wilaya du client
     - **revenu_client**: Revenu mensuel du client
     - **anciennete_client_jours**: Ancienneté du compte en jours
+    
+    Budget de latence : en-têtes X-Latency-Budget-Ms et X-Request-Start. Si le
+    modèle principal est absent, en erreur, surchargé ou ne peut pas tenir le
+    budget (à l'admission ou pendant le scoring), la décision vient du modèle
+    de repli (degraded = true). Une
+    catégorie inconnue reste une erreur de saisie (400).
     """
+    invalid = unknown_categories(transaction)
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Erreur lors de la prédiction: {'; '.join(invalid)}")
+    if model is None:
+        return fallback_decisions([transaction], "modele_indisponible", "/predict")[0]
+    try:
+        ticket = await admission.admit("interactive", **request_budget(request.headers))
+    except LaneFull as e:
+        return fallback_decisions([transaction], "surcharge", "/predict", str(e))[0]
+    except DeadlineExceeded as e:
+        return fallback_decisions([transaction], "echeance", "/predict", str(e))[0]
     
     try:
         start_time = datetime.now()
         
-        # Préparer les features
-        features_df = prepare_features(transaction)
-        
-        # Faire la prédiction
-        fraud_probability = model.predict_proba(features_df)[0][1]
+        # Scoring par le modèle principal, borné par le budget restant de la requête
+        remaining = ticket.remaining_ms()
+        try:
+            features_df, fraud_probability, confidence, anomaly_score = await asyncio.wait_for(
+                asyncio.to_thread(score_with_model, transaction),
+                timeout=None if remaining is None else max(remaining, 0.0) / 1000
+            )
+        except asyncio.TimeoutError:
+            # Le calcul en cours se termine dans son thread, sa décision est abandonnée
+            admission.record_fallback("interactive")
+            return fallback_decisions([transaction], "echeance", "/predict",
+                                      f"scoring hors budget ({remaining:.1f} ms)")[0]
         is_fraud = fraud_probability > 0.5  # Seuil à 50%
+        tier_usage.record("modele", 1, (datetime.now() - start_time).total_seconds())
+        
+        # Taux de fraude observés (marchand, catégorie, wilaya)
+        risk_features = get_risk_features(transaction)
         
         # Analyser le risque
         risk_level, risk_score = get_risk_level(fraud_probability)
         
         # Analyser les raisons
-        reasons = analyze_fraud_reasons(transaction, fraud_probability)
+        reasons = analyze_fraud_reasons(transaction, fraud_probability, anomaly_score, risk_features)
         
         # Générer une recommandation
         recommendation = get_recommendation(is_fraud, risk_level, fraud_probability)
@@ -404,13 +1077,18 @@ async def predict_fraud(transaction: Transaction):
             "heure_inhabituelle": transaction.heure_inhabituelle or 0,
             "localisation_etrangere": transaction.localisation_etrangere or 0,
             "categorie_risquee": transaction.categorie_risquee or 0,
-            "ratio_montant_revenu": float(transaction.ratio_montant_revenu or 0)
+            "ratio_montant_revenu": float(transaction.ratio_montant_revenu or 0),
+            **risk_features
         }
         
+        # Alimenter la surveillance de dérive
+        if drift_monitor is not None:
+            drift_monitor.update(vars(transaction), fraud_probability)
+        
         # Générer un ID de transaction
-        transaction_id = f"TXN_{int(datetime.now().timestamp() * 1000)}"
+        transaction_id = new_decision_id()
         
-        return {
+        response = {
             "transaction_id": transaction_id,
             "is_fraud": bool(is_fraud),
             "fraud_probability": float(fraud_probability),
@@ -419,90 +1097,130 @@ async def predict_fraud(transaction: Transaction):
             "reasons": reasons,
             "recommendation": recommendation,
             "features_used": features_used,
-            "model_confidence": float(model.predict_proba(features_df)[0].max())
+            "model_confidence": float(confidence),
+            "anomaly_score": anomaly_score,
+            "rules_fired": [],
+            "scoring_tier": "modele",
+            "degraded": False
         }
         
+        # Règles métier combinées avec la décision du modèle
+        rules = evaluate_rules([transaction], [fraud_probability], [anomaly_score], [risk_features])
+        apply_rules(response, rules, 0)
+        
+        # Journaliser la décision (non bloquant) et alimenter le flux en direct
+        audit_sink.submit(build_audit_record(
+            response, transaction, features_df.to_numpy()[0], processing_time, "/predict"
+        ))
+        decision_stream.record(response["is_fraud"], response["risk_level"], transaction.wilaya_client,
+                               transaction.categorie_marchand, processing_time)
+        
+        return response
+        
     except Exception as e:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Erreur lors de la prédiction: {str(e)}"
-        )
+        # Une autorisation reçoit toujours une décision : repli plutôt qu'une erreur
+        print(f"   ⚠️ Erreur du modèle principal, décision en mode dégradé: {e}")
+        return fallback_decisions([transaction], "erreur", "/predict", str(e))[0]
+    finally:
+        admission.release(ticket)
 
-@app.post("/predict/batch", response_model=BatchFraudCheckResponse, tags=["Prediction"])
-async def predict_batch_fraud(batch: BatchTransactions):
+@app.post("/predict/batch", response_model=BatchFraudCheckResponse, tags=["Prediction"],
+          openapi_extra=BATCH_REQUEST_BODY)
+async def predict_batch_fraud(request: Request):
     """
     Prédit la fraude pour un batch de transactions
+    
+    Le batch est validé puis scoré par morceaux d'environ BULK_SLICE_MS ; entre
+    deux morceaux, les requêtes /predict en attente passent en priorité. Avec
+    un budget de latence (X-Latency-Budget-Ms), les transactions qui ne
+    peuvent plus être scorées à temps, comme celles d'un morceau en erreur,
+    sont scorées par le modèle de repli (degraded = true).
     """
+    start_time = datetime.now()
     try:
-        start_time = datetime.now()
-        results = []
+        ticket = await admission.admit("bulk", expected_ms=0.0, **request_budget(request.headers))
+    except LaneFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=503, detail=f"Budget de latence insuffisant: {e}")
+    
+    try:
+        try:
+            payload = await asyncio.to_thread(json.loads, await request.body())
+            rows = payload["transactions"]
+            if not isinstance(rows, list):
+                raise TypeError("transactions doit être une liste")
+        except (ValueError, KeyError, TypeError) as e:
+            raise HTTPException(status_code=422, detail=f"Corps de requête invalide: {e}")
         
-        for i, transaction in enumerate(batch.transactions):
-            # Préparer les features
-            features_df = prepare_features(transaction)
-            
-            # Faire la prédiction
-            fraud_probability = model.predict_proba(features_df)[0][1]
-            is_fraud = fraud_probability > 0.5
-            
-            # Analyser le risque
-            risk_level, risk_score = get_risk_level(fraud_probability)
-            
-            # Analyser les raisons
-            reasons = analyze_fraud_reasons(transaction, fraud_probability)
-            
-            # Générer une recommandation
-            recommendation = get_recommendation(is_fraud, risk_level, fraud_probability)
-            
-            # Features utilisées
-            features_used = {
-                "montant_dzd": float(transaction.montant_dzd),
-                "heure_jour": transaction.heure_jour,
-                "montant_anormal_score": float(transaction.montant_anormal_score or 0),
-                "heure_inhabituelle": transaction.heure_inhabituelle or 0
-            }
-            
-            results.append({
-                "transaction_id": f"BATCH_TXN_{i+1}",
-                "is_fraud": bool(is_fraud),
-                "fraud_probability": float(fraud_probability),
-                "risk_level": risk_level,
-                "risk_score": float(risk_score),
-                "reasons": reasons,
-                "recommendation": recommendation,
-                "features_used": features_used,
-                "model_confidence": float(model.predict_proba(features_df)[0].max())
-            })
+        # Validation complète avant tout scoring (aucune décision journalisée pour un batch rejeté)
+        transactions = []
+        for offset in range(0, len(rows), VALIDATION_CHUNK_ROWS):
+            try:
+                transactions += _transactions_adapter.validate_python(rows[offset:offset + VALIDATION_CHUNK_ROWS])
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail=[
+                    {**error, "loc": ["body", "transactions", offset + error["loc"][0], *error["loc"][1:]]}
+                    for error in e.errors(include_url=False, include_context=False)
+                ])
+            await admission.checkpoint(ticket)
+        if not transactions:
+            raise HTTPException(status_code=422, detail="Batch vide")
+        invalid = [f"transaction {i}: {error}" for i, transaction in enumerate(transactions)
+                   for error in unknown_categories(transaction)]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Erreur lors du traitement du batch: {'; '.join(invalid[:10])}")
         
-        # Calculer les statistiques du batch
-        fraud_count = sum(1 for r in results if r["is_fraud"])
-        avg_probability = np.mean([r["fraud_probability"] for r in results])
+        # Chaque morceau est sérialisé dès qu'il est scoré : un json.dumps de tout le batch bloquerait /predict
+        results = []
+        encoded = []
+        expired = False
+        position = 0
+        while position < len(transactions):
+            chunk = transactions[position:position + admission.chunk_rows("bulk")]
+            position += len(chunk)
+            
+            expired = expired or ticket.expired(admission.chunk_ms("bulk", len(chunk)))
+            if model is None:
+                chunk_results = fallback_decisions(chunk, "modele_indisponible", "/predict/batch")
+            elif expired:
+                # Budget épuisé : le reste du batch passe en mode dégradé
+                chunk_results = fallback_decisions(chunk, "echeance", "/predict/batch",
+                                                   "budget de latence du batch épuisé")
+                admission.record_fallback("bulk", len(chunk))
+            else:
+                try:
+                    chunk_start = time.perf_counter()
+                    chunk_results = score_transactions(chunk, "/predict/batch")
+                    admission.record_chunk(ticket, len(chunk), time.perf_counter() - chunk_start)
+                except Exception as e:
+                    print(f"   ⚠️ Erreur du modèle principal, morceau en mode dégradé: {e}")
+                    chunk_results = fallback_decisions(chunk, "erreur", "/predict/batch", str(e))
+            results += chunk_results
+            encoded.append(encode_json(chunk_results)[1:-1])
+            await admission.checkpoint(ticket)
         
         processing_time_ms = (datetime.now() - start_time).total_seconds() * 1000
         
-        return {
-            "results": results,
-            "summary": {
-                "total_transactions": len(results),
-                "fraudulent_transactions": fraud_count,
-                "fraud_rate": f"{(fraud_count / len(results)) * 100:.2f}%",
-                "average_fraud_probability": float(avg_probability),
-                "high_risk_count": sum(1 for r in results if r["risk_level"] == "HIGH"),
-                "medium_risk_count": sum(1 for r in results if r["risk_level"] == "MEDIUM"),
-                "low_risk_count": sum(1 for r in results if r["risk_level"] in ["LOW", "VERY_LOW"])
-            },
-            "processing_time_ms": float(processing_time_ms)
-        }
+        tail = encode_json({"summary": summarize_batch(results), "processing_time_ms": float(processing_time_ms)})
+        content = b'{"results": [' + b", ".join(encoded) + b"], " + tail[1:]
+        return Response(content, media_type="application/json")
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=400,
             detail=f"Erreur lors du traitement du batch: {str(e)}"
         )
+    finally:
+        admission.release(ticket)
 
 @app.get("/features/importance", tags=["Model"])
 async def get_features_importance():
     """Retourne l'importance des features du modèle"""
+    if model is None:
+        raise HTTPException(status_code=503, detail="Modèle principal indisponible (mode dégradé)")
     try:
         if hasattr(model, 'feature_importances_'):
             importance_dict = dict(zip(
@@ -536,6 +1254,243 @@ async def get_features_importance():
             detail=f"Erreur lors de la récupération des importances: {str(e)}"
         )
 
+@app.get("/monitoring/drift", tags=["Monitoring"])
+async def get_drift_report(force: bool = False):
+    """Compare les distributions live (entrées et scores) à celles de l'entraînement (PSI/KS), worker courant"""
+    if drift_monitor is None:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Surveillance de dérive indisponible: référence {DRIFT_REFERENCE_FILE} absente"
+        )
+    return drift_monitor.report(force=force)
+
+@app.post("/monitoring/drift/reset", tags=["Monitoring"])
+async def reset_drift_window():
+    """Démarre une nouvelle fenêtre d'observation pour la surveillance de dérive"""
+    if drift_monitor is None:
+        raise HTTPException(status_code=503, detail="Surveillance de dérive indisponible")
+    drift_monitor.reset()
+    return {"message": "Fenêtre de surveillance réinitialisée", "timestamp": datetime.now().isoformat()}
+
+@app.get("/monitoring/live", tags=["Monitoring"])
+async def get_live_snapshot(window: int = 60):
+    """Instantané agrégé des décisions récentes (débit, taux de fraude, risques, latences), worker courant"""
+    return decision_stream.snapshot(window_s=window)
+
+@app.get("/monitoring/stream", tags=["Monitoring"])
+async def stream_decisions(request: Request, interval: float = 1.0, window: int = 60):
+    """
+    Flux Server-Sent Events d'instantanés agrégés
+    
+    Un événement par intervalle, quel que soit le débit de décisions. Avec
+    plusieurs workers (serve.py), seules les décisions du worker qui tient la
+    connexion sont diffusées.
+    """
+    interval = max(interval, 0.2)
+    
+    async def events():
+        while not await request.is_disconnected():
+            yield format_sse(decision_stream.snapshot(window_s=window))
+            await asyncio.sleep(interval)
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+@app.get("/monitoring/lanes", tags=["Monitoring"])
+async def get_lane_stats():
+    """Métriques par voie : admissions, refus, replis sur échéance, préemptions, latences (worker courant)"""
+    return admission.stats()
+
+@app.get("/monitoring/tiers", tags=["Monitoring"])
+async def get_tier_usage():
+    """Décisions par niveau de scoring (modele / distille / regles) et motifs du mode dégradé (worker courant)"""
+    return {
+        "model_loaded": model is not None,
+        "fallback_model": fallback_model.info() if fallback_model is not None else None,
+        **tier_usage.stats()
+    }
+
+@app.get("/monitoring/audit", tags=["Monitoring"])
+async def get_audit_stats():
+    """Statistiques du journal d'audit (décisions écrites, en attente, abandonnées)"""
+    return audit_sink.stats()
+
+@app.post("/transactions/similar", tags=["Investigation"])
+async def find_similar_transactions(transaction: Transaction, k: int = 10):
+    """
+    Transactions historiques les plus proches (espace des features du modèle)
+    
+    Renvoie les k voisins avec leur étiquette `fraude` et leur `raison_fraude`,
+    ainsi que la part de fraudes parmi eux.
+    """
+    if similarity_index is None:
+        raise HTTPException(status_code=503, detail="Recherche de cas similaires indisponible: dataset absent")
+    if not 1 <= k <= 100:
+        raise HTTPException(status_code=400, detail="k doit être compris entre 1 et 100")
+    
+    try:
+        features = prepare_features(transaction).to_numpy()
+        start_time = time.perf_counter()
+        neighbours = similarity_index.neighbours(features, k=k)
+        return {
+            "neighbours": neighbours,
+            "summary": summarize_neighbours(neighbours),
+            "index": similarity_index.info(),
+            "search_time_ms": round((time.perf_counter() - start_time) * 1000, 3)
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Erreur lors de la recherche de cas similaires: {str(e)}"
+        )
+
+@app.post("/feedback", status_code=202, tags=["Feedback"], openapi_extra=FEEDBACK_REQUEST_BODY)
+async def submit_feedback(request: Request):
+    """
+    Verdicts des analystes par identifiant de décision (traitement asynchrone)
+    
+    Les verdicts sont joints aux features du journal d'audit, ajoutés à la base
+    d'entraînement et comptés dans les métriques en ligne de la version du modèle.
+    Comme /predict/batch, le lot passe par la voie bulk : corps décodé hors de
+    la boucle et validé par morceaux, /predict reste prioritaire entre deux.
+    """
+    if feedback is None:
+        raise HTTPException(status_code=503, detail="Ingestion des verdicts indisponible: modèle principal absent")
+    try:
+        ticket = await admission.admit("bulk", expected_ms=0.0, **request_budget(request.headers))
+    except LaneFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=503, detail=f"Budget de latence insuffisant: {e}")
+    
+    try:
+        try:
+            payload = await asyncio.to_thread(json.loads, await request.body())
+            rows = payload["verdicts"]
+            if not isinstance(rows, list):
+                raise TypeError("verdicts doit être une liste")
+        except (ValueError, KeyError, TypeError) as e:
+            raise HTTPException(status_code=422, detail=f"Corps de requête invalide: {e}")
+        
+        verdicts = []
+        for offset in range(0, len(rows), VALIDATION_CHUNK_ROWS):
+            try:
+                chunk = _verdicts_adapter.validate_python(rows[offset:offset + VALIDATION_CHUNK_ROWS])
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail=[
+                    {**error, "loc": ["body", "verdicts", offset + error["loc"][0], *error["loc"][1:]]}
+                    for error in e.errors(include_url=False, include_context=False)
+                ])
+            verdicts += [verdict.model_dump() for verdict in chunk]
+            await admission.checkpoint(ticket)
+        
+        try:
+            accepted = feedback.submit(verdicts)
+        except ValueError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        return {"accepted": accepted, "ingestion": feedback.stats()}
+    finally:
+        admission.release(ticket)
+
+@app.get("/feedback/metrics", tags=["Feedback"])
+async def get_feedback_metrics():
+    """
+    Précision / rappel en ligne par version du modèle (décisions étiquetées par les analystes)
+    
+    Compteurs du worker courant : avec plusieurs workers (serve.py), chacun ne
+    compte que les verdicts qu'il a reçus depuis son démarrage (en plus de la
+    base relue au démarrage).
+    """
+    if feedback is None:
+        raise HTTPException(status_code=503, detail="Ingestion des verdicts indisponible: modèle principal absent")
+    return {
+        "current_model_version": model_version,
+        "by_model_version": feedback.metrics(),
+        "ingestion": feedback.stats()
+    }
+
+@app.get("/aggregates", tags=["Aggregates"])
+async def get_risk_aggregates_info():
+    """Résumé des agrégats de risque (volumes, taux global, cardinalités)"""
+    if risk_aggregates is None:
+        raise HTTPException(status_code=503, detail="Agrégats de risque indisponibles")
+    return risk_aggregates.info()
+
+@app.get("/aggregates/{dimension}", tags=["Aggregates"])
+async def get_top_risk(dimension: str, top: int = 20, min_volume: int = 0):
+    """Marchands, catégories ou wilayas les plus risqués (taux de fraude lissé)"""
+    if risk_aggregates is None:
+        raise HTTPException(status_code=503, detail="Agrégats de risque indisponibles")
+    if dimension not in RISK_DIMENSIONS:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Dimension inconnue: {dimension} (attendu: {list(RISK_DIMENSIONS)})"
+        )
+    return {
+        "dimension": dimension,
+        "taux_global": risk_aggregates.global_rate,
+        "top": risk_aggregates.top(dimension, n=top, min_volume=min_volume)
+    }
+
+def rebuild_aggregates_with_feedback() -> int:
+    """Agrégats recalculés sur le dataset historique + dernier verdict de chaque décision étiquetée"""
+    from data_access import load_transactions
+    
+    columns = list(RISK_DIMENSIONS.values()) + ['fraude']
+    frames = [load_transactions(columns=columns)]
+    directory = feedback.directory if feedback is not None else os.environ.get('FEEDBACK_STORE_DIR', FEEDBACK_DIR)
+    if os.path.isdir(directory):
+        try:
+            frames.append(load_feedback(directory, columns=columns))
+        except Exception as e:
+            print(f"⚠️ Retours analystes non rejoués dans les agrégats: {e}")
+    labelled = pd.concat([frame.astype({c: object for c in RISK_DIMENSIONS.values()}) for frame in frames],
+                         ignore_index=True)
+    risk_aggregates.rebuild(labelled)
+    risk_aggregates.save(AGGREGATES_FILE, overwrite=True)
+    return len(labelled) - len(frames[0])
+
+@app.post("/aggregates/rebuild", tags=["Aggregates"])
+async def rebuild_risk_aggregates():
+    """
+    Reconstruit les agrégats depuis le dataset historique (group-by vectorisé)
+    
+    Les verdicts déjà écrits dans la base des retours analystes (/feedback)
+    sont rejoués après le dataset ; ceux encore en file sont appliqués ensuite
+    au fil de l'eau. Relecture du CSV et group-by dans un thread : la boucle
+    continue de servir /predict pendant la reconstruction.
+    
+    Seul le worker qui traite la requête est reconstruit (fichier réécrit) ;
+    avec serve.py, les autres workers gardent leurs agrégats en mémoire
+    jusqu'à leur redémarrage (SIGHUP).
+    """
+    if risk_aggregates is None:
+        raise HTTPException(status_code=503, detail="Agrégats de risque indisponibles")
+    
+    start_time = time.perf_counter()
+    replayed = await asyncio.to_thread(rebuild_aggregates_with_feedback)
+    return {**risk_aggregates.info(), "feedback_replayed": replayed,
+            "scope": f"worker {os.getpid()} uniquement (autres workers : au prochain redémarrage)",
+            "rebuild_time_ms": round((time.perf_counter() - start_time) * 1000, 1)}
+
+@app.get("/rules", tags=["Rules"])
+async def get_rules():
+    """Règles métier actives, avec le nombre de déclenchements depuis le démarrage"""
+    if rule_engine is None:
+        raise HTTPException(status_code=503, detail="Moteur de règles indisponible")
+    return rule_engine.info()
+
+@app.post("/rules/reload", tags=["Rules"])
+async def reload_rules():
+    """Recharge immédiatement le fichier de règles (refusé si une règle est invalide)"""
+    if rule_engine is None:
+        raise HTTPException(status_code=503, detail="Moteur de règles indisponible")
+    try:
+        rule_engine.reload(force=True, strict=True)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Règles invalides, règles précédentes conservées: {e}")
+    return rule_engine.info()
+
 @app.get("/test/example", tags=["Testing"])
 async def test_example():
     """Retourne des exemples de transactions pour tester l'API"""
@@ -595,3 +1550,7 @@ async def test_example():
     }
 
 # === ÉTAPE 3.7: SCRIPT DE DÉMARRAGE ===
+# Développement : un seul processus. En production, utiliser le lanceur
+# multi-workers (préchargement du modèle + préfork) : python serve.py
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 8000)))
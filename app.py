@@ -1,8 +1,17 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import altair as alt
 from datetime import datetime
+import hashlib
+import io
+import os
 import time
 
+from transaction_history import TransactionHistory
+from decision_stream import DecisionStreamPool
+from rule_engine import RuleEngine, RULES_FILE
+
 # ======================================================
 # CONFIG PAGE
 # ======================================================
@@ -55,9 +64,15 @@ DEFAULTS = {
 for k, v in DEFAULTS.items():
     if k not in st.session_state:
         st.session_state[k] = v
+    else:
+        # Conserve les valeurs du formulaire quand on change de page (base de la simulation what-if)
+        st.session_state[k] = st.session_state[k]
+
+# Historique borné : ajout O(1) et agrégats glissants, quelle que soit la durée de la session
+HISTORY_WINDOW = int(os.environ.get("HISTORY_WINDOW", 500))
 
-if "transactions" not in st.session_state:
-    st.session_state.transactions = []
+if "history" not in st.session_state:
+    st.session_state.history = TransactionHistory(window=HISTORY_WINDOW)
 
 # ======================================================
 # NOUVEAUX CAS PRÉPARÉS (PRESETS)
@@ -108,32 +123,21 @@ def load_preset(preset):
 # ======================================================
 # LOGIQUE D'ANALYSE
 # ======================================================
-def analyze():
-    score = 0.0
-    reasons = []
-    
-    ratio = st.session_state.montant / st.session_state.revenu
+@st.cache_resource
+def get_rule_engine():
+    # Mêmes règles métier que l'API (fraud_rules.json), relues quand le fichier change
+    return RuleEngine(os.environ.get("RULES_FILE", RULES_FILE))
 
-    # 1. Ratio Montant/Revenu
-    if ratio > 5: # Plus de 5 mois de salaire en une fois
-        score += 0.7
-        reasons.append("Montant démesuré par rapport au revenu")
-    elif ratio > 1:
-        score += 0.4
-        reasons.append("Montant supérieur au revenu mensuel")
-
-    # 2. Heure Suspecte
-    if 1 <= st.session_state.heure <= 5:
-        score += 0.3
-        reasons.append("Transaction effectuée au milieu de la nuit")
-
-    # 3. Ancienneté
-    if st.session_state.anciennete < 30:
-        score += 0.2
-        reasons.append("Compte très récent (moins de 30 jours)")
+def analyze():
+    # Score = somme des poids des règles déclenchées (plafonnée à 1) ; une règle BLOQUER impose la fraude.
+    # Les règles portant sur le score du modèle (fraud_probability) ne s'appliquent pas ici.
+    row = {column: [st.session_state[field]] for field, column in FORM_COLUMNS.items()}
+    row["ratio_montant_revenu"] = [st.session_state.montant / st.session_state.revenu]
+    rules = get_rule_engine().evaluate(row, n_rows=1)
 
-    score = min(score, 1.0)
-    return score, score >= 0.5, reasons
+    score = float(rules.score[0])
+    reasons = [rule.description for rule in rules.fired_rules(0)]
+    return score, score >= 0.5 or rules.action[0] == "BLOQUER", reasons
 
 # ======================================================
 # INTERFACE UTILISATEUR
@@ -146,76 +150,423 @@ padding:25px;border-radius:15px;color:white;text-align:center;margin-bottom:20px
 </div>
 """, unsafe_allow_html=True)
 
-col1, col2 = st.columns([5, 7], gap="large")
+# ======================================================
+# PAGE : ANALYSE UNITAIRE
+# ======================================================
+def page_analyse():
+    col1, col2 = st.columns([5, 7], gap="large")
 
-# --- COLONNE GAUCHE : FORMULAIRE & PRESETS ---
-with col1:
-    st.markdown('<div class="card"><div class="card-header">📝 Paramètres de Transaction</div>', unsafe_allow_html=True)
+    # --- COLONNE GAUCHE : FORMULAIRE & PRESETS ---
+    with col1:
+        st.markdown('<div class="card"><div class="card-header">📝 Paramètres de Transaction</div>', unsafe_allow_html=True)
     
-    st.number_input("💰 Montant (DZD)", min_value=0, key="montant")
-    st.selectbox("🕐 Heure de transaction", list(range(24)), key="heure")
-    st.selectbox("📋 Type", ["ACHAT_CARTE","VIREMENT","PAIEMENT_EN_LIGNE","RETRAIT_DAB"], key="type")
-    st.selectbox("🏷️ Catégorie", ["SUPERMARCHE","ELECTRONIQUE","VOYAGE","IMMOBILIER","ESSENCE","RESTAURANT"], key="categorie")
-    st.selectbox("📱 Canal", ["CARTE_PHYSIQUE","INTERNET_BANKING","MOBILE_BANKING","AGENCE"], key="canal")
-    st.selectbox("📍 Wilaya", ["Alger","Oran","Sétif","Constantine","Annaba","Blida"], key="wilaya")
-    st.number_input("💵 Revenu Mensuel", min_value=1, key="revenu")
-    st.number_input("📅 Ancienneté du compte (jours)", min_value=0, key="anciennete")
-
-    if st.button("🔬 ANALYSER LA TRANSACTION", type="primary"):
-        with st.spinner('Analyse IA en cours...'):
-            time.sleep(0.5)
-            score, is_fraud, reasons = analyze()
-            st.session_state.transactions.append({
-                "time": datetime.now().strftime("%H:%M:%S"),
-                "montant": st.session_state.montant,
-                "score": score,
-                "fraud": is_fraud,
-                "reasons": reasons
-            })
-    st.markdown("</div>", unsafe_allow_html=True)
+        st.number_input("💰 Montant (DZD)", min_value=0, key="montant")
+        st.selectbox("🕐 Heure de transaction", list(range(24)), key="heure")
+        st.selectbox("📋 Type", ["ACHAT_CARTE","VIREMENT","PAIEMENT_EN_LIGNE","RETRAIT_DAB"], key="type")
+        st.selectbox("🏷️ Catégorie", ["SUPERMARCHE","ELECTRONIQUE","VOYAGE","IMMOBILIER","ESSENCE","RESTAURANT"], key="categorie")
+        st.selectbox("📱 Canal", ["CARTE_PHYSIQUE","INTERNET_BANKING","MOBILE_BANKING","AGENCE"], key="canal")
+        st.selectbox("📍 Wilaya", ["Alger","Oran","Sétif","Constantine","Annaba","Blida"], key="wilaya")
+        st.number_input("💵 Revenu Mensuel", min_value=1, key="revenu")
+        st.number_input("📅 Ancienneté du compte (jours)", min_value=0, key="anciennete")
 
-    st.markdown('<div class="card"><div class="card-header">🧪 Cas de Test Préparés</div>', unsafe_allow_html=True)
-    cols_preset = st.columns(2)
-    for i, p in enumerate(PRESETS):
-        with cols_preset[i % 2]:
-            st.button(p['name'], on_click=load_preset, args=(p,), key=f"p_{i}")
-    st.markdown("</div>", unsafe_allow_html=True)
+        if st.button("🔬 ANALYSER LA TRANSACTION", type="primary"):
+            with st.spinner('Analyse IA en cours...'):
+                score, is_fraud, reasons = analyze()
+                st.session_state.history.append({
+                    "time": datetime.now().strftime("%H:%M:%S"),
+                    "montant": st.session_state.montant,
+                    "score": score,
+                    "fraud": is_fraud,
+                    "reasons": reasons
+                })
+        st.markdown("</div>", unsafe_allow_html=True)
+
+        st.markdown('<div class="card"><div class="card-header">🧪 Cas de Test Préparés</div>', unsafe_allow_html=True)
+        cols_preset = st.columns(2)
+        for i, p in enumerate(PRESETS):
+            with cols_preset[i % 2]:
+                st.button(p['name'], on_click=load_preset, args=(p,), key=f"p_{i}")
+        st.markdown("</div>", unsafe_allow_html=True)
 
-# --- COLONNE DROITE : RÉSULTATS ---
-with col2:
-    st.markdown('<div class="card"><div class="card-header">📊 Rapport de Risque</div>', unsafe_allow_html=True)
+    # --- COLONNE DROITE : RÉSULTATS ---
+    with col2:
+        st.markdown('<div class="card"><div class="card-header">📊 Rapport de Risque</div>', unsafe_allow_html=True)
 
-    if st.session_state.transactions:
-        last = st.session_state.transactions[-1]
+        history = st.session_state.history
+        if history:
+            last = history.last
+            view = history.view(5)
         
-        # Jauge de score
-        st.write(f"**Niveau de suspicion : {last['score']*100:.0f}%**")
-        st.progress(last['score'])
+            # Jauge de score
+            st.write(f"**Niveau de suspicion : {last['score']*100:.0f}%**")
+            st.progress(last['score'])
         
-        # Statut avec Alerte
-        if last["fraud"]:
-            st.markdown(f"""
-                <div style="background-color:#ff4b4b; padding:20px; border-radius:10px; color:white; text-align:center; margin-top:20px">
-                    <h2 style='margin:0'>🚨 ALERTE FRAUDE</h2>
-                    <p style='margin:0'>Transaction bloquée par le système</p>
-                </div>
-            """, unsafe_allow_html=True)
-            if last['reasons']:
-                st.info("**Motifs de détection :**\n\n" + "\n".join([f"- {r}" for r in last['reasons']]))
-        else:
-            st.markdown(f"""
-                <div style="background-color:#09ab3b; padding:20px; border-radius:10px; color:white; text-align:center; margin-top:20px">
-                    <h2 style='margin:0'>✅ TRANSACTION VALIDE</h2>
-                    <p style='margin:0'>Aucune anomalie critique détectée</p>
-                </div>
-            """, unsafe_allow_html=True)
+            # Statut avec Alerte
+            if last["fraud"]:
+                st.markdown(f"""
+                    <div style="background-color:#ff4b4b; padding:20px; border-radius:10px; color:white; text-align:center; margin-top:20px">
+                        <h2 style='margin:0'>🚨 ALERTE FRAUDE</h2>
+                        <p style='margin:0'>Transaction bloquée par le système</p>
+                    </div>
+                """, unsafe_allow_html=True)
+                if last['reasons']:
+                    st.info("**Motifs de détection :**\n\n" + "\n".join([f"- {r}" for r in last['reasons']]))
+            else:
+                st.markdown(f"""
+                    <div style="background-color:#09ab3b; padding:20px; border-radius:10px; color:white; text-align:center; margin-top:20px">
+                        <h2 style='margin:0'>✅ TRANSACTION VALIDE</h2>
+                        <p style='margin:0'>Aucune anomalie critique détectée</p>
+                    </div>
+                """, unsafe_allow_html=True)
             
-        # Historique rapide
-        st.markdown("### 📋 Historique récent")
-        df_history = pd.DataFrame(st.session_state.transactions).tail(5)
-        st.dataframe(df_history[['time', 'montant', 'score', 'fraud']], use_container_width=True)
+            # Historique rapide
+            st.markdown("### 📋 Historique récent")
+            df_history = pd.DataFrame(view.recent)
+            st.dataframe(df_history[['time', 'montant', 'score', 'fraud']], use_container_width=True)
+            st.caption(f"{view.window_size} dernières analyses conservées · "
+                       f"taux de fraude {view.window_fraud_rate:.1%}")
+
+            if st.toggle("🔎 Cas similaires dans l'historique de la banque", key="show_similar"):
+                similar_cases_panel()
         
+        else:
+            st.info("Veuillez charger un cas de test ou remplir le formulaire pour lancer l'analyse.")
+
+        st.markdown("</div>", unsafe_allow_html=True)
+
+@st.cache_data(show_spinner=False, max_entries=500)
+def similar_cases(base_items, k):
+    # Clé de cache : valeurs du formulaire
+    pipeline = get_scoring_pipeline()
+    if pipeline.similarity_index is None:
+        return None
+    base = dict(base_items)
+    row = pd.DataFrame([{column: base[field] for field, column in FORM_COLUMNS.items()}])
+    neighbours = pipeline.similarity_index.neighbours(pipeline.prepare_features_batch(row).to_numpy(), k=k)
+    return pd.DataFrame(neighbours), pipeline.summarize_neighbours(neighbours)
+
+def similar_cases_panel():
+    base = {field: st.session_state[field] for field in FORM_COLUMNS}
+    result = similar_cases(tuple(sorted(base.items())), 10)
+    if result is None:
+        st.warning("Index des cas similaires indisponible (dataset absent).")
+        return
+    neighbours, summary = result
+    st.caption(f"{summary['fraud_count']} fraudes parmi les {summary['neighbours']} transactions les plus proches")
+    if summary["fraud_reasons"]:
+        st.write("**Raisons de fraude :** " + ", ".join(f"{r} ({n})" for r, n in summary["fraud_reasons"].items()))
+    st.dataframe(
+        neighbours.drop(columns=["position"]).style.apply(
+            lambda row: ["background-color: #fde2e2" if row["fraude"] else ""] * len(row), axis=1),
+        use_container_width=True, hide_index=True
+    )
+
+# ======================================================
+# PAGE : SURVEILLANCE EN DIRECT
+# ======================================================
+API_URL = os.environ.get("FRAUD_API_URL", "http://localhost:8000")
+
+@st.cache_resource
+def get_decision_streams():
+    # Abonnements SSE partagés par toutes les sessions ; ceux qui ne sont plus affichés sont arrêtés
+    return DecisionStreamPool(max_streams=4, idle_s=300)
+
+def get_decision_stream(api_url, window_s):
+    return get_decision_streams().get(api_url, window_s, interval_s=1.0)
+
+@st.fragment(run_every=1.0)
+def live_panel(api_url, window_s):
+    # Seul ce fragment est réexécuté chaque seconde, pas la page entière
+    stream = get_decision_stream(api_url, window_s)
+    snap = stream.latest
+    if snap is None:
+        st.warning(f"En attente du flux de l'API ({stream.url})"
+                   + (f" - {stream.error}" if stream.error else ""))
+        return
+
+    status = "🟢 connecté" if stream.connected else f"🔴 déconnecté ({stream.error})"
+    st.caption(f"{status} · {snap['total_decisions']:,} décisions depuis le démarrage de l'API")
+
+    latency = snap["latency_ms"]
+    m1, m2, m3, m4, m5 = st.columns(5)
+    m1.metric("Débit", f"{snap['throughput_per_s']:.1f} tx/s")
+    m2.metric("Décisions", f"{snap['decisions']:,}")
+    m3.metric("Taux de fraude", f"{snap['fraud_rate']:.2%}")
+    m4.metric("Latence p50", f"{latency['p50']:.1f} ms" if latency["p50"] is not None else "-")
+    m5.metric("Latence p95 / p99",
+              f"{latency['p95']:.1f} / {latency['p99']:.1f} ms" if latency["p95"] is not None else "-")
+
+    series = pd.DataFrame(snap["series"])
+    series.index = pd.to_datetime(series.pop("second"), unit="s")
+    c1, c2 = st.columns(2)
+    with c1:
+        st.markdown("**Débit (décisions/s)**")
+        st.area_chart(series["throughput"], height=220)
+    with c2:
+        st.markdown("**Taux de fraude**")
+        st.line_chart(series["fraud_rate"], height=220)
+
+    c3, c4, c5 = st.columns(3)
+    with c3:
+        st.markdown("**Niveaux de risque**")
+        st.bar_chart(pd.Series(snap["risk_levels"], name="décisions"), height=220)
+    with c4:
+        st.markdown("**Top wilayas**")
+        st.bar_chart(pd.Series(dict(snap["top_wilayas"]), name="décisions"), height=220)
+    with c5:
+        st.markdown("**Top catégories**")
+        st.bar_chart(pd.Series(dict(snap["top_categories"]), name="décisions"), height=220)
+
+def page_surveillance():
+    st.markdown('<div class="card"><div class="card-header">📡 Décisions de l\'API en direct</div>', unsafe_allow_html=True)
+    c1, c2 = st.columns([3, 1])
+    api_url = c1.text_input("🔗 URL de l'API", API_URL, key="live_api_url")
+    window_s = c2.selectbox("⏱️ Fenêtre", [60, 120, 300], format_func=lambda s: f"{s // 60} min", key="live_window")
+    live_panel(api_url, window_s)
+    st.markdown("</div>", unsafe_allow_html=True)
+
+# ======================================================
+# PAGE : SCORING PAR LOT (UPLOAD CSV)
+# ======================================================
+@st.cache_resource(show_spinner="Chargement du modèle...")
+def get_scoring_pipeline():
+    # Même pipeline que l'API (/predict), chargé une seule fois par serveur Streamlit
+    import api_fraud_detection
+    return api_fraud_detection
+
+def get_rules_version():
+    # Horodatage du dernier chargement réussi de fraud_rules.json (vérifie d'abord le fichier)
+    engine = get_scoring_pipeline().rule_engine
+    if engine is None:
+        return None
+    engine.rules
+    return engine.loaded_at
+
+@st.cache_data(show_spinner=False, max_entries=2000)
+def score_chunk(file_hash, chunk_size, rules_version, chunk_index, _chunk):
+    # Clé de cache : (empreinte du fichier, taille des morceaux, version des règles, n° du morceau)
+    scores = get_scoring_pipeline().score_frame(_chunk)
+    return pd.concat([_chunk.reset_index(drop=True), scores], axis=1)
+
+@st.cache_data(show_spinner=False, max_entries=10)
+def results_to_csv(file_hash, chunk_size, rules_version, _results):
+    return _results.to_csv(index=False).encode("utf-8")
+
+def score_uploaded_file(data, file_hash, chunk_size, rules_version):
+    """Lit le fichier par morceaux, score chaque morceau et met à jour la progression"""
+    progress = st.progress(0.0, text="Scoring en cours...")
+    stats_placeholder = st.empty()
+    total_bytes = max(len(data), 1)
+    buffer = io.BytesIO(data)
+    chunks = []
+    rows = valid = frauds = high = 0
+    proba_sum = 0.0
+
+    for i, chunk in enumerate(pd.read_csv(buffer, chunksize=chunk_size)):
+        scored = score_chunk(file_hash, chunk_size, rules_version, i, chunk)
+        chunks.append(scored)
+
+        # Statistiques incrémentales
+        ok = scored["erreur"] == ""
+        rows += len(scored)
+        valid += int(ok.sum())
+        frauds += int(scored["is_fraud"].sum())
+        high += int((scored["risk_level"] == "HIGH").sum())
+        proba_sum += float(scored.loc[ok, "fraud_probability"].sum())
+
+        progress.progress(min(buffer.tell() / total_bytes, 1.0),
+                          text=f"Scoring en cours... {rows:,} lignes")
+        with stats_placeholder.container():
+            s1, s2, s3, s4 = st.columns(4)
+            s1.metric("Lignes traitées", f"{rows:,}")
+            s2.metric("Fraudes détectées", f"{frauds:,}")
+            s3.metric("Risque élevé", f"{high:,}")
+            s4.metric("Probabilité moyenne", f"{proba_sum / valid:.2%}" if valid else "-")
+
+    progress.progress(1.0, text=f"✅ {rows:,} lignes scorées ({rows - valid:,} rejetées)")
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+def page_lot():
+    st.markdown('<div class="card"><div class="card-header">📂 Scoring par lot (fichier CSV)</div>', unsafe_allow_html=True)
+    st.caption("Colonnes requises : montant_dzd, heure_jour, type_transaction, categorie_marchand, "
+               "canal_paiement, wilaya_client, revenu_client, anciennete_client_jours. "
+               "Les autres colonnes sont conservées dans les résultats.")
+
+    c1, c2 = st.columns([3, 1])
+    uploaded = c1.file_uploader("Export CSV des transactions", type=["csv"])
+    chunk_size = c2.selectbox("Lignes par morceau", [1_000, 5_000, 20_000, 50_000], index=1)
+    if uploaded is None:
+        st.markdown("</div>", unsafe_allow_html=True)
+        return
+
+    data = uploaded.getvalue()
+    file_hash = hashlib.sha256(data).hexdigest()
+    # Un rechargement à chaud des règles invalide les résultats déjà calculés
+    rules_version = get_rules_version()
+    key = (file_hash, chunk_size, rules_version)
+
+    # Les résultats restent côté serveur : les reruns (pagination) ne rescorent rien
+    if st.session_state.get("batch_key") != key:
+        try:
+            st.session_state.batch_results = score_uploaded_file(data, file_hash, chunk_size, rules_version)
+            st.session_state.batch_key = key
+        except (ValueError, TypeError) as e:
+            st.error(f"Fichier invalide : {e}")
+            st.markdown("</div>", unsafe_allow_html=True)
+            return
+    results = st.session_state.batch_results
+
+    ok = results["erreur"] == ""
+    s1, s2, s3, s4 = st.columns(4)
+    s1.metric("Transactions", f"{len(results):,}")
+    s2.metric("Fraudes", f"{int(results['is_fraud'].sum()):,}")
+    s3.metric("Taux de fraude", f"{results.loc[ok, 'is_fraud'].mean():.2%}" if ok.any() else "-")
+    s4.metric("Lignes rejetées", f"{int((~ok).sum()):,}")
+
+    # Pagination : seule la page affichée est envoyée au navigateur
+    f1, f2, f3 = st.columns([2, 1, 1])
+    only_frauds = f1.checkbox("Afficher uniquement les fraudes et rejets")
+    view = results[results["is_fraud"] | ~ok] if only_frauds else results
+    page_size = f2.selectbox("Lignes par page", [25, 50, 100, 500], index=1)
+    n_pages = max((len(view) - 1) // page_size + 1, 1)
+    page = f3.number_input("Page", min_value=1, max_value=n_pages, value=1)
+    start = (page - 1) * page_size
+    st.dataframe(view.iloc[start:start + page_size], use_container_width=True)
+    st.caption(f"Page {page} / {n_pages} · {len(view):,} lignes")
+
+    st.download_button(
+        "⬇️ Télécharger les résultats (CSV)",
+        data=results_to_csv(file_hash, chunk_size, rules_version, results),
+        file_name=f"scores_{uploaded.name}",
+        mime="text/csv"
+    )
+    st.markdown("</div>", unsafe_allow_html=True)
+
+# ======================================================
+# PAGE : SIMULATION WHAT-IF
+# ======================================================
+# Champ du formulaire -> (colonne du modèle, libellé, grille de valeurs selon la résolution)
+WHAT_IF_FIELDS = {
+    "montant": ("montant_dzd", "Montant (DZD)", lambda n: np.geomspace(500, 1_000_000, n)),
+    "heure": ("heure_jour", "Heure", lambda n: np.arange(24)),
+    "anciennete": ("anciennete_client_jours", "Ancienneté (jours)",
+                   lambda n: np.unique(np.geomspace(1, 3650, n).astype(int))),
+    "revenu": ("revenu_client", "Revenu mensuel (DZD)", lambda n: np.geomspace(10_000, 500_000, n)),
+}
+LOG_AXES = {"montant", "anciennete", "revenu"}
+
+FORM_COLUMNS = {
+    "montant": "montant_dzd", "heure": "heure_jour", "type": "type_transaction",
+    "categorie": "categorie_marchand", "canal": "canal_paiement", "wilaya": "wilaya_client",
+    "revenu": "revenu_client", "anciennete": "anciennete_client_jours",
+}
+
+def _cell_edges(values, log):
+    # Bornes des cases autour de chaque point de la grille (mark_rect)
+    v = np.log(values) if log else np.asarray(values, dtype=float)
+    mid = (v[1:] + v[:-1]) / 2
+    lo = np.concatenate([[v[0] - (mid[0] - v[0])], mid])
+    hi = np.concatenate([mid, [v[-1] + (v[-1] - mid[-1])]])
+    return (np.exp(lo), np.exp(hi)) if log else (lo, hi)
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def what_if_scores(base_items, x_field, y_field, n_points):
+    """Construit toute la grille en une matrice de features et la score en un seul appel"""
+    # Clé de cache : (transaction de base, axes, résolution)
+    pipeline = get_scoring_pipeline()
+    base = dict(base_items)
+
+    axes = {}
+    for field in filter(None, (x_field, y_field)):
+        column, _, make_grid = WHAT_IF_FIELDS[field]
+        axes[column] = (field, make_grid(n_points))
+
+    mesh = np.meshgrid(*(values for _, values in axes.values()), indexing="ij")
+    grid = pd.DataFrame({column: m.ravel() for column, m in zip(axes, mesh)})
+    for field, column in FORM_COLUMNS.items():
+        if column not in grid:
+            grid[column] = base[field]
+
+    if pipeline.model is not None:
+        grid["fraud_probability"] = pipeline.model.predict_proba(
+            pipeline.prepare_features_batch(grid))[:, 1]
+        grid["scoring_tier"] = "modele"
+    else:
+        # Mode dégradé : même repli que l'API (arbre distillé, sinon règles métier)
+        scores = pipeline.score_frame(grid)
+        grid["fraud_probability"] = scores["fraud_probability"].to_numpy()
+        grid["scoring_tier"] = scores["scoring_tier"].to_numpy()
+
+    for column, (field, values) in axes.items():
+        lo, hi = _cell_edges(values, field in LOG_AXES)
+        position = np.searchsorted(values, grid[column])
+        grid[f"{column}_lo"], grid[f"{column}_hi"] = lo[position], hi[position]
+    return grid
+
+def page_what_if():
+    st.markdown('<div class="card"><div class="card-header">🧭 Simulation what-if</div>', unsafe_allow_html=True)
+    st.caption("Transaction de base : valeurs actuelles du formulaire d'analyse unitaire. "
+               "Toute la grille est scorée par le modèle en un seul appel.")
+
+    base = {field: st.session_state[field] for field in FORM_COLUMNS}
+    st.dataframe(pd.DataFrame([base]), use_container_width=True, hide_index=True)
+
+    labels = {field: spec[1] for field, spec in WHAT_IF_FIELDS.items()}
+    c1, c2, c3 = st.columns(3)
+    x_field = c1.selectbox("Axe 1", list(WHAT_IF_FIELDS), format_func=labels.get, key="wi_x")
+    y_options = [None] + [f for f in WHAT_IF_FIELDS if f != x_field]
+    y_field = c2.selectbox("Axe 2 (optionnel)", y_options, index=1,
+                           format_func=lambda f: "— (courbe 1D)" if f is None else labels[f], key="wi_y")
+    n_points = c3.slider("Résolution", 20, 400, 200, step=20, key="wi_n")
+
+    start = time.perf_counter()
+    grid = what_if_scores(tuple(sorted(base.items())), x_field, y_field, n_points)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if (grid["scoring_tier"] != "modele").any():
+        st.warning(f"⚠️ Modèle principal indisponible : grille scorée en mode dégradé "
+                   f"({grid['scoring_tier'].iloc[0]})")
+
+    x_col = WHAT_IF_FIELDS[x_field][0]
+    x_scale = alt.Scale(type="log") if x_field in LOG_AXES else alt.Scale(zero=False)
+    probability = alt.Tooltip("fraud_probability:Q", title="P(fraude)", format=".1%")
+    if y_field is None:
+        # Dépendance partielle : probabilité en fonction d'un seul champ
+        curve = alt.Chart(grid).mark_line().encode(
+            x=alt.X(f"{x_col}:Q", title=labels[x_field], scale=x_scale),
+            y=alt.Y("fraud_probability:Q", title="Probabilité de fraude", scale=alt.Scale(domain=[0, 1])),
+            tooltip=[x_col, probability]
+        )
+        current = alt.Chart(pd.DataFrame({x_col: [base[x_field]]})).mark_rule(
+            color="#dc2626", strokeDash=[4, 4]).encode(x=f"{x_col}:Q")
+        chart = curve + current
     else:
-        st.info("Veuillez charger un cas de test ou remplir le formulaire pour lancer l'analyse.")
+        y_col = WHAT_IF_FIELDS[y_field][0]
+        y_scale = alt.Scale(type="log") if y_field in LOG_AXES else alt.Scale(zero=False)
+        chart = alt.Chart(grid).mark_rect().encode(
+            x=alt.X(f"{x_col}_lo:Q", title=labels[x_field], scale=x_scale), x2=f"{x_col}_hi",
+            y=alt.Y(f"{y_col}_lo:Q", title=labels[y_field], scale=y_scale), y2=f"{y_col}_hi",
+            color=alt.Color("fraud_probability:Q", title="P(fraude)",
+                            scale=alt.Scale(scheme="redyellowgreen", reverse=True, domain=[0, 1])),
+            tooltip=[x_col, y_col, probability]
+        )
+    st.altair_chart(chart.properties(height=420), use_container_width=True)
 
+    above = (grid["fraud_probability"] > 0.5).mean()
+    st.caption(f"{len(grid):,} combinaisons scorées en {elapsed_ms:.0f} ms (mémoïsé par transaction de base) · "
+               f"{above:.1%} au-dessus du seuil de fraude (0,5)")
     st.markdown("</div>", unsafe_allow_html=True)
+
+# ======================================================
+# NAVIGATION
+# ======================================================
+PAGES = {
+    "🔬 Analyse unitaire": page_analyse,
+    "📡 Surveillance en direct": page_surveillance,
+    "📂 Scoring par lot": page_lot,
+    "🧭 Simulation what-if": page_what_if,
+}
+
+with st.sidebar:
+    mode = st.radio("Mode", list(PAGES), key="mode")
+
+PAGES[mode]()
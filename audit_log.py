@@ -0,0 +1,308 @@
+# === JOURNAL D'AUDIT DES DÉCISIONS ===
+"""
+Journal d'audit append-only de chaque décision de scoring.
+
+Le chemin de requête se contente de déposer la décision dans un tampon mémoire
+borné (AuditSink.submit) ; un thread d'écriture vide le tampon par lots dans
+des fichiers NDJSON compressés (gzip), avec rotation par taille et par âge :
+
+    audit_logs/decisions-20261019T101500-4242.ndjson.gz
+
+Politiques de débordement du tampon (overflow) :
+- drop_oldest : la décision la plus ancienne non écrite est abandonnée ;
+- drop_newest : la nouvelle décision est refusée ;
+- block       : l'appelant attend de la place (threads de travail uniquement ;
+                refusée par l'API, dont les handlers tournent dans la boucle asyncio).
+
+Chaque décision reçoit un identifiant unique et triable dans le temps
+(new_decision_id). Lecture des journaux par plage de temps :
+
+    python audit_log.py --since "2026-10-19 10:00" --until "2026-10-19 11:00" --fraud-only
+"""
+from collections import deque
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Iterator
+import argparse
+import atexit
+import glob
+import gzip
+import itertools
+import json
+import os
+import random
+import threading
+import time
+
+AUDIT_DIR = 'audit_logs'
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+_FILE_PATTERN = 'decisions-*.ndjson.gz'
+_FILE_TIME_FORMAT = '%Y%m%dT%H%M%S'
+
+# === IDENTIFIANTS DE DÉCISION ===
+# Format : TXN_<ms depuis epoch, 13 chiffres>_<noeud 8 hex>_<séquence>
+# Le noeud combine le PID et un aléa : il est régénéré dans chaque worker forké.
+_sequence = itertools.count(1)
+_node = ''
+
+
+def _reset_node():
+    global _node, _sequence
+    _node = f"{os.getpid() & 0xFFFF:04x}{random.getrandbits(16):04x}"
+    _sequence = itertools.count(1)
+
+
+_reset_node()
+os.register_at_fork(after_in_child=_reset_node)
+
+
+def new_decision_id(prefix: str = 'TXN') -> str:
+    """Identifiant de décision sans collision (entre requêtes, threads et workers)"""
+    return f"{prefix}_{int(time.time() * 1000):013d}_{_node}_{next(_sequence):06d}"
+
+
+def decision_timestamp(decision_id: str) -> datetime:
+    """Retrouve l'instant de décision encodé dans l'identifiant"""
+    return datetime.fromtimestamp(int(decision_id.split('_')[1]) / 1000)
+
+
+# === ÉCRITURE ===
+
+class AuditSink:
+    """Tampon borné + thread d'écriture par lots vers des fichiers NDJSON gzip"""
+
+    def __init__(self, directory: str = AUDIT_DIR, feature_names: Optional[List[str]] = None,
+                 max_buffer: int = 100_000, batch_size: int = 2_000,
+                 flush_interval_s: float = 1.0, overflow: str = 'drop_oldest',
+                 rotate_bytes: int = 64 * 1024 * 1024, rotate_interval_s: float = 3600.0):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Politique de débordement inconnue: {overflow} (attendu: {OVERFLOW_POLICIES})")
+
+        self.directory = directory
+        self.feature_names = feature_names
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.overflow = overflow
+        self.rotate_bytes = rotate_bytes
+        self.rotate_interval_s = rotate_interval_s
+
+        self._buffer = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closing = False
+        self._pid = None
+
+        self._file_path = None
+        self._file_opened_at = 0.0
+
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+        atexit.register(self.close)
+
+    # --- chemin de requête ---
+
+    def submit(self, record: Dict[str, Any]) -> bool:
+        """Dépose une décision dans le tampon ; ne touche jamais au disque"""
+        if self._pid != os.getpid():
+            self.start()
+
+        with self._condition:
+            if len(self._buffer) >= self.max_buffer:
+                if self.overflow == 'drop_newest':
+                    self.dropped += 1
+                    return False
+                elif self.overflow == 'drop_oldest':
+                    self._buffer.popleft()
+                    self.dropped += 1
+                else:
+                    while len(self._buffer) >= self.max_buffer and not self._closing:
+                        self._condition.wait(self.flush_interval_s)
+
+            self._buffer.append(record)
+            self.submitted += 1
+            if len(self._buffer) >= self.batch_size:
+                self._condition.notify_all()
+        return True
+
+    # --- cycle de vie ---
+
+    def start(self):
+        """Démarre le thread d'écriture (relancé automatiquement après un fork)"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        if self._pid is not None and self._pid != os.getpid():
+            # Worker forké : les décisions en attente appartiennent au parent
+            self._buffer = deque()
+            self._condition = threading.Condition()
+            self._file_path = None
+        self._pid = os.getpid()
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 10.0):
+        """Vide le tampon puis arrête le thread d'écriture"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'submitted': self.submitted,
+            'written': self.written,
+            'dropped': self.dropped,
+            'pending': len(self._buffer),
+            'write_errors': self.write_errors,
+            'overflow_policy': self.overflow,
+            'current_file': self._file_path
+        }
+
+    # --- thread d'écriture ---
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if len(self._buffer) < self.batch_size and not self._closing:
+                    self._condition.wait(self.flush_interval_s)
+                batch = [self._buffer.popleft() for _ in range(min(len(self._buffer), self.batch_size))]
+                closing = self._closing and not self._buffer
+                self._condition.notify_all()
+
+            if batch:
+                self._write(batch)
+            if closing:
+                return
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        lines = []
+        for record in batch:
+            features = record.get('features')
+            if self.feature_names is not None and features is not None and not isinstance(features, dict):
+                values = features.tolist() if hasattr(features, 'tolist') else list(features)
+                record['features'] = dict(zip(self.feature_names, values))
+            lines.append(json.dumps(record, ensure_ascii=False, default=_json_default))
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+
+        try:
+            path = self._current_file(len(data))
+            # Chaque lot est un membre gzip indépendant : le fichier reste lisible en append
+            with open(path, 'ab') as f:
+                f.write(gzip.compress(data, compresslevel=6))
+            self.written += len(batch)
+        except OSError as e:
+            self.write_errors += 1
+            print(f"⚠️ Journal d'audit: échec d'écriture de {len(batch)} décisions: {e}")
+
+    def _current_file(self, incoming_bytes: int) -> str:
+        now = time.time()
+        # Taille estimée après compression (~4:1 sur du NDJSON)
+        if (self._file_path is None
+                or now - self._file_opened_at >= self.rotate_interval_s
+                or os.path.getsize(self._file_path) + incoming_bytes // 4 > self.rotate_bytes):
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = datetime.fromtimestamp(now).strftime(_FILE_TIME_FORMAT)
+            path = os.path.join(self.directory, f"decisions-{stamp}-{os.getpid()}.ndjson.gz")
+            suffix = itertools.count(1)
+            while os.path.exists(path):
+                path = os.path.join(self.directory, f"decisions-{stamp}-{os.getpid()}-{next(suffix)}.ndjson.gz")
+            self._file_path = path
+            self._file_opened_at = now
+            open(path, 'ab').close()
+        return self._file_path
+
+
+def _json_default(value):
+    # Scalaires et tableaux numpy
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+
+# === LECTURE ===
+
+def _file_opened_at(path: str) -> Optional[datetime]:
+    try:
+        return datetime.strptime(os.path.basename(path).split('-')[1], _FILE_TIME_FORMAT)
+    except (IndexError, ValueError):
+        return None
+
+
+def list_audit_files(directory: str = AUDIT_DIR, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None) -> List[str]:
+    """Fichiers pouvant contenir des décisions dans [start, end] (ouverture / dernière écriture)"""
+    files = []
+    for path in sorted(glob.glob(os.path.join(directory, _FILE_PATTERN))):
+        opened_at = _file_opened_at(path)
+        if end is not None and opened_at is not None and opened_at > end:
+            continue
+        if start is not None and datetime.fromtimestamp(os.path.getmtime(path)) < start:
+            continue
+        files.append(path)
+    return files
+
+
+def read_decisions(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   directory: str = AUDIT_DIR) -> Iterator[Dict[str, Any]]:
+    """Itère sur les décisions journalisées dans [start, end]"""
+    start_ms = start.timestamp() * 1000 if start else None
+    end_ms = end.timestamp() * 1000 if end else None
+
+    for path in list_audit_files(directory, start, end):
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    record = json.loads(line)
+                    ts_ms = record.get('ts_ms')
+                    if start_ms is not None and ts_ms < start_ms:
+                        continue
+                    if end_ms is not None and ts_ms > end_ms:
+                        continue
+                    yield record
+        except (EOFError, gzip.BadGzipFile):
+            # Fichier en cours d'écriture : dernier membre gzip incomplet
+            continue
+
+
+def load_decisions(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   directory: str = AUDIT_DIR):
+    """Charge les décisions dans un DataFrame (features aplaties en colonnes)"""
+    import pandas as pd
+    return pd.json_normalize(list(read_decisions(start, end, directory)))
+
+
+# === OUTIL DE CONSULTATION ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consultation du journal d'audit des décisions")
+    parser.add_argument('--dir', default=AUDIT_DIR, help="Répertoire des journaux")
+    parser.add_argument('--since', type=datetime.fromisoformat, default=None, help="Début (ISO 8601)")
+    parser.add_argument('--until', type=datetime.fromisoformat, default=None, help="Fin (ISO 8601)")
+    parser.add_argument('--fraud-only', action='store_true', help="Seulement les décisions de fraude")
+    parser.add_argument('--limit', type=int, default=None, help="Nombre maximum de décisions")
+    parser.add_argument('--summary', action='store_true', help="Afficher uniquement un résumé")
+    args = parser.parse_args()
+
+    decisions = read_decisions(args.since, args.until, args.dir)
+    if args.fraud_only:
+        decisions = (d for d in decisions if d.get('is_fraud'))
+    if args.limit:
+        decisions = itertools.islice(decisions, args.limit)
+
+    if args.summary:
+        total = fraud = 0
+        versions = {}
+        for d in decisions:
+            total += 1
+            fraud += bool(d.get('is_fraud'))
+            versions[d.get('model_version')] = versions.get(d.get('model_version'), 0) + 1
+        print(f"📋 {total} décisions | {fraud} fraudes | versions du modèle: {versions}")
+    else:
+        for d in decisions:
+            print(json.dumps(d, ensure_ascii=False))
@@ -0,0 +1,202 @@
+# === ACCÈS AUX DONNÉES : SCHÉMA TYPÉ ET CACHE COLONNAIRE ===
+"""
+Chargement typé du dataset de transactions avec cache Parquet partitionné.
+
+Le schéma est défini une seule fois (catégorielles, entiers à largeur fixe,
+horodatage parsé ; les features numériques du modèle restent en float64 pour
+que les valeurs soient identiques à celles du CSV). Au premier chargement, le CSV est converti par morceaux en
+un dataset Parquet partitionné par mois (.cache/transactions/mois=AAAA-MM/) ;
+les chargements suivants relisent uniquement les colonnes demandées
+(projection) et les fichiers/row groups qui satisfont les filtres (predicate
+pushdown) :
+
+    from data_access import load_transactions
+    df = load_transactions(columns=['montant_dzd', 'fraude'],
+                           filters=[('mois', '>=', '2023-10'), ('fraude', '==', 1)])
+
+Le cache est reconstruit automatiquement si le CSV source ou le schéma change
+(empreinte du schéma dans le manifeste).
+Benchmark contre pd.read_csv :
+
+    python data_access.py
+"""
+from typing import Optional, List, Dict, Any
+import hashlib
+import json
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DATASET_FILE = 'dataset_transactions_badr_bank.csv'
+CACHE_DIR = os.path.join('.cache', 'transactions')
+PARTITION_COLUMN = 'mois'
+_MANIFEST = '_manifest.json'
+
+# Schéma du dataset (défini une seule fois)
+TRANSACTION_SCHEMA = {
+    'transaction_id': 'string',
+    'client_id': 'category',
+    'marchand_id': 'category',
+    'jour_semaine': 'category',
+    'heure_jour': 'int8',
+    'montant_dzd': 'float64',
+    'devise': 'category',
+    'type_transaction': 'category',
+    'categorie_marchand': 'category',
+    'localisation': 'category',
+    'pays': 'category',
+    'wilaya_client': 'category',
+    'canal_paiement': 'category',
+    'statut': 'category',
+    'fraude': 'int8',
+    'raison_fraude': 'category',
+    'montant_anormal_score': 'float64',
+    'heure_inhabituelle': 'int8',
+    'localisation_etrangere': 'int8',
+    'categorie_risquee': 'int8',
+    'ratio_montant_revenu': 'float64',
+    'revenu_client': 'float64',
+    'anciennete_client_jours': 'int32'
+}
+# Empreinte du schéma : un changement de type invalide le cache Parquet
+SCHEMA_HASH = hashlib.sha256(json.dumps(TRANSACTION_SCHEMA, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+# Les colonnes texte sont lues comme chaînes puis converties
+_STRING_DTYPES = {c: 'string' for c, t in TRANSACTION_SCHEMA.items() if t in ('category', 'string')}
+
+TIMESTAMP_COLUMNS = ['date_heure']
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Ordre des colonnes du CSV source
+COLUMNS = [
+    'transaction_id', 'client_id', 'marchand_id', 'date_heure', 'jour_semaine',
+    'heure_jour', 'montant_dzd', 'devise', 'type_transaction', 'categorie_marchand',
+    'localisation', 'pays', 'wilaya_client', 'canal_paiement', 'statut', 'fraude',
+    'raison_fraude', 'montant_anormal_score', 'heure_inhabituelle',
+    'localisation_etrangere', 'categorie_risquee', 'ratio_montant_revenu',
+    'revenu_client', 'anciennete_client_jours'
+]
+
+
+def _apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Applique le schéma typé à un DataFrame lu depuis le CSV"""
+    for col in TIMESTAMP_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], format=TIMESTAMP_FORMAT)
+    return df.astype({c: t for c, t in TRANSACTION_SCHEMA.items() if c in df.columns})
+
+
+def read_csv_typed(csv_path: str = DATASET_FILE, **kwargs) -> pd.DataFrame:
+    """Lit le CSV directement avec le schéma typé (sans cache)"""
+    return _apply_schema(pd.read_csv(csv_path, dtype=_STRING_DTYPES, **kwargs))
+
+
+def _source_signature(csv_path: str) -> Dict[str, Any]:
+    stat = os.stat(csv_path)
+    return {'source': os.path.abspath(csv_path), 'size': stat.st_size, 'mtime': stat.st_mtime,
+            'schema': SCHEMA_HASH}
+
+
+def _cache_is_fresh(csv_path: str, cache_dir: str) -> bool:
+    manifest_path = os.path.join(cache_dir, _MANIFEST)
+    if not os.path.exists(manifest_path):
+        return False
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    signature = _source_signature(csv_path)
+    return all(manifest.get(k) == v for k, v in signature.items())
+
+
+def build_cache(csv_path: str = DATASET_FILE, cache_dir: str = CACHE_DIR,
+                chunksize: int = 500_000, force: bool = False) -> str:
+    """Convertit le CSV en dataset Parquet partitionné par mois (une seule fois)"""
+    if not force and _cache_is_fresh(csv_path, cache_dir):
+        return cache_dir
+
+    if os.path.exists(cache_dir):
+        shutil.rmtree(cache_dir)
+    os.makedirs(cache_dir)
+
+    n_rows = 0
+    for i, chunk in enumerate(_typed_chunks(csv_path, chunksize)):
+        chunk[PARTITION_COLUMN] = chunk['date_heure'].dt.strftime('%Y-%m')
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        ds.write_dataset(
+            table, cache_dir,
+            format='parquet',
+            partitioning=ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor='hive'),
+            basename_template=f'part-{i:05d}-{{i}}.parquet',
+            existing_data_behavior='overwrite_or_ignore'
+        )
+        n_rows += len(chunk)
+
+    manifest = _source_signature(csv_path)
+    manifest['rows'] = n_rows
+    with open(os.path.join(cache_dir, _MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return cache_dir
+
+
+def _typed_chunks(csv_path: str, chunksize: int):
+    for chunk in pd.read_csv(csv_path, dtype=_STRING_DTYPES, chunksize=chunksize):
+        yield _apply_schema(chunk)
+
+
+def load_transactions(columns: Optional[List[str]] = None,
+                      filters: Optional[List[tuple]] = None,
+                      csv_path: str = DATASET_FILE,
+                      cache_dir: str = CACHE_DIR) -> pd.DataFrame:
+    """
+    Charge les transactions depuis le cache Parquet (construit si besoin)
+
+    - **columns**: colonnes à lire (projection), toutes par défaut
+    - **filters**: filtres pyarrow, ex. [('mois', '==', '2023-08'), ('fraude', '==', 1)]
+    """
+    build_cache(csv_path, cache_dir)
+
+    dataset = ds.dataset(cache_dir, format='parquet', partitioning='hive',
+                         exclude_invalid_files=True)
+    read_columns = columns if columns is not None else COLUMNS
+    table = dataset.to_table(
+        columns=read_columns,
+        filter=pq.filters_to_expression(filters) if filters else None
+    )
+    df = table.to_pandas()
+
+    # Les dictionnaires Parquet diffèrent d'un fichier à l'autre : on rétablit le schéma
+    return df.astype({c: t for c, t in TRANSACTION_SCHEMA.items() if c in df.columns})
+
+
+# === BENCHMARK ===
+if __name__ == "__main__":
+    import time
+
+    def _bench(label: str, fn, repeat: int = 5):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            df = fn()
+            best = min(best, time.perf_counter() - start)
+        memory_mb = df.memory_usage(deep=True).sum() / 1e6
+        print(f"{label:<45} {best * 1000:8.1f} ms {memory_mb:8.2f} Mo  {df.shape}")
+
+    print("=" * 80)
+    print("📊 BENCHMARK - CHARGEMENT DU DATASET")
+    print("=" * 80)
+
+    start = time.perf_counter()
+    build_cache(force=True)
+    print(f"Construction du cache Parquet: {(time.perf_counter() - start) * 1000:.1f} ms")
+    print("-" * 80)
+
+    _bench("pd.read_csv (inférence par défaut)", lambda: pd.read_csv(DATASET_FILE))
+    _bench("read_csv_typed (schéma, sans cache)", read_csv_typed)
+    _bench("load_transactions (toutes colonnes)", load_transactions)
+    _bench("load_transactions (3 colonnes)",
+           lambda: load_transactions(columns=['montant_dzd', 'heure_jour', 'fraude']))
+    _bench("load_transactions (fraudes, T4 2023)",
+           lambda: load_transactions(filters=[('mois', '>=', '2023-10'), ('fraude', '==', 1)]))
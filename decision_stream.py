@@ -0,0 +1,222 @@
+# === FLUX DES DÉCISIONS (SURVEILLANCE EN DIRECT) ===
+"""
+Agrégation côté serveur des décisions de scoring et diffusion en direct.
+
+Côté API, DecisionStreamAggregator range chaque décision dans un anneau de
+seaux d'une seconde (comptages, fraudes, niveaux de risque, wilayas,
+catégories, histogramme des latences) : l'enregistrement est en O(1) et la
+mémoire est bornée par l'horizon. Les clients reçoivent des instantanés déjà
+agrégés (endpoint SSE /monitoring/stream), jamais les événements bruts : le
+débit diffusé ne dépend pas du débit de décisions.
+
+Côté dashboard, DecisionStreamClient s'abonne au flux SSE dans un thread de
+fond et conserve le dernier instantané reçu. DecisionStreamPool partage un
+abonnement par (URL, fenêtre) entre les sessions et arrête ceux qui ne sont
+plus lus (inactifs depuis idle_s, ou les plus anciens au-delà de max_streams).
+"""
+from bisect import bisect_right
+from collections import Counter
+from typing import Dict, Any, Optional, List
+import json
+import threading
+import time
+import urllib.request
+
+RISK_LEVELS = ['VERY_LOW', 'LOW', 'MEDIUM', 'HIGH']
+
+# Bornes de l'histogramme des latences : log-espacées de 0,1 ms à 10 s
+LATENCY_EDGES_MS = [0.1 * 10 ** (i / 10) for i in range(51)]
+
+
+class _SecondBucket:
+    __slots__ = ('second', 'count', 'fraud', 'risk', 'wilayas', 'categories', 'latency')
+
+    def __init__(self):
+        self.reset(-1)
+
+    def reset(self, second: int):
+        self.second = second
+        self.count = 0
+        self.fraud = 0
+        self.risk = [0] * len(RISK_LEVELS)
+        self.wilayas = Counter()
+        self.categories = Counter()
+        self.latency = [0] * (len(LATENCY_EDGES_MS) + 1)
+
+
+def _latency_percentile(histogram: List[int], q: float) -> Optional[float]:
+    total = sum(histogram)
+    if total == 0:
+        return None
+    target = q * total
+    cumulative = 0
+    for i, count in enumerate(histogram):
+        cumulative += count
+        if cumulative >= target:
+            # Borne haute de la case (borne basse pour la dernière case ouverte)
+            return round(LATENCY_EDGES_MS[min(i, len(LATENCY_EDGES_MS) - 1)], 3)
+    return round(LATENCY_EDGES_MS[-1], 3)
+
+
+class DecisionStreamAggregator:
+    """Anneau de seaux d'une seconde ; instantanés agrégés sur une fenêtre glissante"""
+
+    def __init__(self, horizon_s: int = 300):
+        self.horizon_s = horizon_s
+        self._buckets = [_SecondBucket() for _ in range(horizon_s)]
+        self._risk_index = {level: i for i, level in enumerate(RISK_LEVELS)}
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def record(self, is_fraud: bool, risk_level: str, wilaya: str, categorie: str,
+               latency_ms: Optional[float] = None):
+        """Enregistre une décision (O(1))"""
+        second = int(time.time())
+        with self._lock:
+            bucket = self._buckets[second % self.horizon_s]
+            if bucket.second != second:
+                bucket.reset(second)
+            bucket.count += 1
+            bucket.fraud += bool(is_fraud)
+            bucket.risk[self._risk_index.get(risk_level, 0)] += 1
+            bucket.wilayas[wilaya] += 1
+            bucket.categories[categorie] += 1
+            if latency_ms is not None:
+                bucket.latency[bisect_right(LATENCY_EDGES_MS, latency_ms)] += 1
+            self.total += 1
+
+    def snapshot(self, window_s: int = 60, top_n: int = 5) -> Dict[str, Any]:
+        """Instantané agrégé des `window_s` dernières secondes"""
+        window_s = max(1, min(window_s, self.horizon_s))
+        now = int(time.time())
+        seconds = list(range(now - window_s + 1, now + 1))
+
+        throughput, fraud_rate = [], []
+        risk = [0] * len(RISK_LEVELS)
+        wilayas, categories = Counter(), Counter()
+        latency = [0] * (len(LATENCY_EDGES_MS) + 1)
+        count = fraud = 0
+
+        with self._lock:
+            for second in seconds:
+                bucket = self._buckets[second % self.horizon_s]
+                if bucket.second != second:
+                    throughput.append(0)
+                    fraud_rate.append(0.0)
+                    continue
+                throughput.append(bucket.count)
+                fraud_rate.append(bucket.fraud / bucket.count if bucket.count else 0.0)
+                count += bucket.count
+                fraud += bucket.fraud
+                risk = [a + b for a, b in zip(risk, bucket.risk)]
+                wilayas.update(bucket.wilayas)
+                categories.update(bucket.categories)
+                latency = [a + b for a, b in zip(latency, bucket.latency)]
+            total = self.total
+
+        return {
+            'timestamp': now,
+            'window_s': window_s,
+            'total_decisions': total,
+            'decisions': count,
+            'throughput_per_s': round(count / window_s, 2),
+            'fraud_count': fraud,
+            'fraud_rate': fraud / count if count else 0.0,
+            'series': {
+                'second': seconds,
+                'throughput': throughput,
+                'fraud_rate': fraud_rate
+            },
+            'risk_levels': dict(zip(RISK_LEVELS, risk)),
+            'top_wilayas': wilayas.most_common(top_n),
+            'top_categories': categories.most_common(top_n),
+            'latency_ms': {
+                'p50': _latency_percentile(latency, 0.50),
+                'p95': _latency_percentile(latency, 0.95),
+                'p99': _latency_percentile(latency, 0.99)
+            }
+        }
+
+
+class DecisionStreamClient:
+    """Abonnement SSE au flux de l'API dans un thread de fond (dernier instantané conservé)"""
+
+    def __init__(self, api_url: str, interval_s: float = 1.0, window_s: int = 60,
+                 reconnect_s: float = 3.0):
+        self.url = f"{api_url.rstrip('/')}/monitoring/stream?interval={interval_s}&window={window_s}"
+        self.reconnect_s = reconnect_s
+        self.connected = False
+        self.error: Optional[str] = None
+        self.received = 0
+        self.last_read = time.monotonic()
+        self._latest: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='decision-stream', daemon=True)
+        self._thread.start()
+
+    @property
+    def latest(self) -> Optional[Dict[str, Any]]:
+        self.last_read = time.monotonic()
+        return self._latest
+
+    @property
+    def closed(self) -> bool:
+        return self._stop.is_set()
+
+    def close(self):
+        """Arrête l'abonnement (le thread se termine au prochain instantané reçu)"""
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with urllib.request.urlopen(self.url, timeout=30) as response:
+                    self.connected = True
+                    self.error = None
+                    for raw in response:
+                        if self._stop.is_set():
+                            break
+                        line = raw.decode('utf-8').strip()
+                        if line.startswith('data:'):
+                            self._latest = json.loads(line[5:])
+                            self.received += 1
+            except Exception as e:
+                self.error = str(e)
+            self.connected = False
+            self._stop.wait(self.reconnect_s)
+
+
+class DecisionStreamPool:
+    """Un abonnement par (URL, fenêtre), partagé entre les sessions ; les abonnements non lus sont arrêtés"""
+
+    def __init__(self, max_streams: int = 4, idle_s: float = 300.0):
+        self.max_streams = max_streams
+        self.idle_s = idle_s
+        self._streams: Dict[tuple, DecisionStreamClient] = {}
+        self._lock = threading.Lock()
+
+    def get(self, api_url: str, window_s: int, interval_s: float = 1.0) -> DecisionStreamClient:
+        with self._lock:
+            key = (api_url, window_s)
+            stream = self._streams.get(key)
+            if stream is None:
+                stream = self._streams[key] = DecisionStreamClient(api_url, interval_s=interval_s, window_s=window_s)
+            stream.last_read = time.monotonic()
+            self._evict()
+            return stream
+
+    def _evict(self):
+        now = time.monotonic()
+        by_age = sorted(self._streams.items(), key=lambda item: item[1].last_read)
+        for rank, (key, stream) in enumerate(by_age):
+            if now - stream.last_read > self.idle_s or rank < len(by_age) - self.max_streams:
+                stream.close()
+                del self._streams[key]
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+
+def format_sse(snapshot: Dict[str, Any]) -> str:
+    """Sérialise un instantané en événement Server-Sent Events"""
+    return f"data: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
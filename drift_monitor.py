@@ -0,0 +1,290 @@
+# === SURVEILLANCE DE LA DÉRIVE DES DONNÉES (DATA DRIFT) ===
+"""
+Surveillance de la dérive des entrées et des scores de l'API de détection de fraude.
+
+Chaque feature suivie possède un "sketch" à mémoire constante :
+- numériques (et fraud_probability) : histogramme sur des bornes fixes, égales
+  aux quantiles de la distribution d'entraînement ;
+- catégorielles : compteurs par modalité (+ une case pour les modalités inconnues).
+
+Les sketches de référence sont construits une fois à partir des seules lignes
+d'entraînement du modèle (même découpage que train_ml_model.ipynb : 80 %,
+stratifié sur fraude, random_state=42, lignes dans l'ordre du CSV) et
+sauvegardés dans drift_reference.json :
+
+    python drift_monitor.py
+
+La mise à jour par requête se limite à une recherche dichotomique et un
+incrément par feature ; la comparaison (PSI / KS) n'est recalculée qu'au plus
+une fois par intervalle de vérification.
+"""
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, Any, Optional, List
+import threading
+import time
+import json
+
+import numpy as np
+
+# Features suivies
+NUMERIC_FEATURES = [
+    'montant_dzd',
+    'heure_jour',
+    'montant_anormal_score',
+    'ratio_montant_revenu',
+    'anciennete_client_jours',
+    'revenu_client'
+]
+CATEGORICAL_FEATURES = [
+    'type_transaction',
+    'categorie_marchand',
+    'canal_paiement',
+    'wilaya_client'
+]
+SCORE_FEATURE = 'fraud_probability'
+
+REFERENCE_FILE = 'drift_reference.json'
+UNKNOWN_CATEGORY = '__INCONNUE__'
+
+# Seuils usuels du PSI
+PSI_WARNING = 0.1
+PSI_ALERT = 0.25
+
+# Évite log(0) dans le PSI
+_EPSILON = 1e-4
+
+# Découpage entraînement / test du notebook d'entraînement
+TEST_SIZE = 0.2
+SPLIT_SEED = 42
+
+
+def training_rows(df):
+    """Lignes sur lesquelles le modèle a été entraîné (découpage du notebook)"""
+    from sklearn.model_selection import train_test_split
+
+    # Ordre du CSV (transaction_id croissant) : le cache Parquet range les lignes par mois
+    df = df.sort_values('transaction_id', kind='stable').reset_index(drop=True)
+    train, _ = train_test_split(df, test_size=TEST_SIZE, random_state=SPLIT_SEED, stratify=df['fraude'])
+    return train
+
+
+def _psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Population Stability Index entre deux vecteurs de comptages"""
+    expected = np.maximum(expected / max(expected.sum(), 1), _EPSILON)
+    actual = np.maximum(actual / max(actual.sum(), 1), _EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def _ks(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Statistique de Kolmogorov-Smirnov évaluée aux bornes des cases"""
+    cdf_expected = np.cumsum(expected) / max(expected.sum(), 1)
+    cdf_actual = np.cumsum(actual) / max(actual.sum(), 1)
+    return float(np.max(np.abs(cdf_expected - cdf_actual)))
+
+
+def _drift_status(psi: float) -> str:
+    if psi >= PSI_ALERT:
+        return "DERIVE_SIGNIFICATIVE"
+    elif psi >= PSI_WARNING:
+        return "DERIVE_MODEREE"
+    return "STABLE"
+
+
+class QuantileSketch:
+    """Histogramme à bornes fixes (quantiles de référence), mémoire constante"""
+
+    def __init__(self, edges: List[float]):
+        self.edges = [float(e) for e in edges]
+        self.counts = [0] * (len(self.edges) + 1)
+
+    def update(self, value: float):
+        self.counts[bisect_right(self.edges, value)] += 1
+
+    def update_many(self, values: np.ndarray):
+        idx = np.searchsorted(self.edges, np.asarray(values, dtype=float), side='right')
+        for i, c in enumerate(np.bincount(idx, minlength=len(self.counts))):
+            self.counts[i] += int(c)
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts)
+
+
+class CategoryCounter:
+    """Compteurs par modalité ; les modalités hors référence sont regroupées"""
+
+    def __init__(self, categories: List[str]):
+        self.categories = list(categories) + [UNKNOWN_CATEGORY]
+        self._index = {c: i for i, c in enumerate(self.categories)}
+        self._unknown = len(self.categories) - 1
+        self.counts = [0] * len(self.categories)
+
+    def update(self, value: str):
+        self.counts[self._index.get(value, self._unknown)] += 1
+
+    def update_many(self, values):
+        for value in values:
+            self.update(value)
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts)
+
+
+def build_reference(df, scores: Optional[np.ndarray] = None, n_bins: int = 20) -> Dict[str, Any]:
+    """Construit les sketches de référence à partir du dataset d'entraînement"""
+    reference = {
+        'created_at': datetime.now().isoformat(),
+        'n_samples': int(len(df)),
+        'n_bins': n_bins,
+        'numeric': {},
+        'categorical': {}
+    }
+
+    quantiles = np.linspace(0, 1, n_bins + 1)[1:-1]
+    columns = {name: df[name].to_numpy(dtype=float) for name in NUMERIC_FEATURES}
+    if scores is not None:
+        columns[SCORE_FEATURE] = np.asarray(scores, dtype=float)
+
+    for name, values in columns.items():
+        edges = np.unique(np.quantile(values, quantiles)).tolist()
+        sketch = QuantileSketch(edges)
+        sketch.update_many(values)
+        reference['numeric'][name] = {'edges': sketch.edges, 'counts': sketch.counts}
+
+    for name in CATEGORICAL_FEATURES:
+        counts = df[name].astype(str).value_counts().sort_index()
+        reference['categorical'][name] = {
+            'categories': counts.index.tolist(),
+            'counts': [int(c) for c in counts.values] + [0]
+        }
+
+    return reference
+
+
+class DriftMonitor:
+    """Compare en continu les entrées/scores live aux distributions d'entraînement"""
+
+    def __init__(self, reference: Dict[str, Any], check_interval_s: float = 60.0,
+                 min_samples: int = 100):
+        self.reference = reference
+        self.check_interval_s = check_interval_s
+        self.min_samples = min_samples
+
+        self.numeric = {
+            name: QuantileSketch(ref['edges'])
+            for name, ref in reference['numeric'].items()
+        }
+        self.categorical = {
+            name: CategoryCounter(ref['categories'])
+            for name, ref in reference['categorical'].items()
+        }
+
+        self._lock = threading.Lock()
+        self._started_at = datetime.now()
+        self._last_report = None
+        self._last_check = 0.0
+
+    @classmethod
+    def from_file(cls, path: str = REFERENCE_FILE, **kwargs) -> "DriftMonitor":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), **kwargs)
+
+    def update(self, features: Dict[str, Any], fraud_probability: float):
+        """Enregistre une transaction scorée (coût : une bisection par feature)"""
+        with self._lock:
+            for name in NUMERIC_FEATURES:
+                value = features.get(name)
+                if value is not None and name in self.numeric:
+                    self.numeric[name].update(value)
+            for name, counter in self.categorical.items():
+                counter.update(features.get(name))
+            if SCORE_FEATURE in self.numeric:
+                self.numeric[SCORE_FEATURE].update(fraud_probability)
+
+    def reset(self):
+        """Remet à zéro la fenêtre d'observation live"""
+        with self._lock:
+            for sketch in list(self.numeric.values()) + list(self.categorical.values()):
+                sketch.reset()
+            self._started_at = datetime.now()
+            self._last_report = None
+            self._last_check = 0.0
+
+    def report(self, force: bool = False) -> Dict[str, Any]:
+        """Rapport PSI/KS, recalculé au plus une fois par intervalle de vérification"""
+        now = time.monotonic()
+        if (not force and self._last_report is not None
+                and now - self._last_check < self.check_interval_s):
+            return self._last_report
+
+        with self._lock:
+            numeric_counts = {n: list(s.counts) for n, s in self.numeric.items()}
+            categorical_counts = {n: list(c.counts) for n, c in self.categorical.items()}
+
+        features = {}
+        for name, counts in numeric_counts.items():
+            expected = np.asarray(self.reference['numeric'][name]['counts'], dtype=float)
+            actual = np.asarray(counts, dtype=float)
+            features[name] = self._compare(expected, actual, with_ks=True)
+        for name, counts in categorical_counts.items():
+            expected = np.asarray(self.reference['categorical'][name]['counts'], dtype=float)
+            actual = np.asarray(counts, dtype=float)
+            features[name] = self._compare(expected, actual, with_ks=False)
+            if actual.sum() > 0:
+                features[name]['unknown_rate'] = float(actual[-1] / actual.sum())
+
+        n_samples = sum(numeric_counts.get(SCORE_FEATURE, [0]))
+        drifted = [
+            name for name, result in features.items()
+            if result['status'] == "DERIVE_SIGNIFICATIVE"
+        ]
+
+        self._last_report = {
+            'timestamp': datetime.now().isoformat(),
+            'window_start': self._started_at.isoformat(),
+            'n_samples': int(n_samples),
+            'sufficient_samples': n_samples >= self.min_samples,
+            'reference_samples': self.reference.get('n_samples'),
+            'drifted_features': drifted if n_samples >= self.min_samples else [],
+            'features': features
+        }
+        self._last_check = now
+        return self._last_report
+
+    def _compare(self, expected: np.ndarray, actual: np.ndarray, with_ks: bool) -> Dict[str, Any]:
+        if actual.sum() == 0:
+            return {'psi': None, 'ks': None, 'status': "AUCUNE_DONNEE", 'n_samples': 0}
+
+        psi = _psi(expected, actual)
+        result = {
+            'psi': round(psi, 4),
+            'ks': round(_ks(expected, actual), 4) if with_ks else None,
+            'status': _drift_status(psi),
+            'n_samples': int(actual.sum())
+        }
+        return result
+
+
+# === CONSTRUCTION DE LA RÉFÉRENCE ===
+if __name__ == "__main__":
+    from data_access import load_transactions
+    from api_fraud_detection import model, prepare_features_batch
+
+    print("📂 Chargement du dataset d'entraînement...")
+    df = training_rows(load_transactions())
+
+    print("🔢 Scoring du dataset pour la distribution de référence des scores...")
+    scores = model.predict_proba(prepare_features_batch(df))[:, 1]
+
+    reference = build_reference(df, scores)
+    with open(REFERENCE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(reference, f, indent=2, ensure_ascii=False)
+    print(f"✅ Référence de dérive sauvegardée: {REFERENCE_FILE} ({len(df)} transactions)")
@@ -0,0 +1,273 @@
+# === MODÈLE DE REPLI (ARBRE DISTILLÉ, MODE DÉGRADÉ) ===
+"""
+Niveau de scoring de secours : une autorisation reçoit toujours une décision,
+même quand le modèle principal ne peut pas répondre.
+
+    niveau (scoring_tier)   modèle                                  latence
+    modele                  gradient boosting (fraud_detection_model.pkl)  ~15 ms
+    distille                arbre de régression distillé (ce module)       quelques µs
+    regles                  règles métier seules (arbre absent aussi)      quelques µs
+
+L'API bascule sur le niveau distillé quand le modèle principal est absent
+(échec du chargement), en erreur, surchargé (voie pleine) ou quand le budget
+de latence de la requête ne peut pas être tenu ; la réponse porte alors
+`degraded: true`.
+
+Distillation : un arbre de régression peu profond apprend la probabilité du
+modèle principal (le professeur). Le dataset ne contient qu'environ 170
+fraudes ; l'arbre est donc aussi entraîné sur un jeu de transfert synthétique
+(chaque champ brut rééchantillonné indépendamment, features dérivées
+recalculées) étiqueté par le professeur. L'arbre est ensuite compilé en
+listes plates (feature, seuil, fils gauche / droit, valeur) sauvegardées en
+JSON : le chargement ne dépend ni de scikit-learn, ni de joblib, ni de
+l'encodeur (les colonnes one-hot deviennent des tests d'égalité sur la
+catégorie brute). Une transaction est scorée en parcourant au plus
+max_depth noeuds en Python pur.
+
+Le rapport de validation (transactions réservées, jamais vues à
+l'entraînement) mesure l'accord des décisions avec le modèle principal, le
+rappel de ses fraudes, l'AUC sur les vraies étiquettes et la latence.
+
+    python fallback_model.py    # distillation + validation + sauvegarde
+"""
+from typing import Dict, Any, List, Tuple, Optional, Mapping
+import json
+import time
+
+import numpy as np
+
+FALLBACK_MODEL_FILE = 'fallback_model.json'
+
+# Niveaux de scoring, du plus précis au plus dégradé
+TIERS = ('modele', 'distille', 'regles')
+
+
+class DistilledTree:
+    """Arbre de régression compilé : probabilité de fraude approchée en quelques µs"""
+
+    def __init__(self, features: List[Tuple[str, Optional[str]]], feature: List[int], threshold: List[float],
+                 left: List[int], right: List[int], value: List[float],
+                 model_version: Optional[str] = None, validation: Optional[Dict[str, Any]] = None):
+        # features[i] = (colonne, None) pour une feature numérique, (colonne, catégorie) pour une one-hot
+        self.features = [(column, category) for column, category in features]
+        self.feature = list(feature)
+        self.threshold = list(threshold)
+        self.left = list(left)
+        self.right = list(right)
+        self.value = list(value)
+        self.model_version = model_version
+        self.validation = validation
+
+        # Noeuds sous forme de tuples : un seul accès par niveau pendant le parcours
+        self._nodes = [
+            (*self.features[f], t, l, r, v) if l >= 0 else (None, None, 0.0, -1, -1, v)
+            for f, t, l, r, v in zip(self.feature, self.threshold, self.left, self.right, self.value)
+        ]
+
+    @classmethod
+    def from_sklearn(cls, tree, feature_names: List[str], categorical_features: List[str],
+                     model_version: Optional[str] = None) -> 'DistilledTree':
+        """Compile un DecisionTreeRegressor entraîné sur les features de prepare_features_batch"""
+        features = []
+        for name in feature_names:
+            column = next((c for c in categorical_features if name.startswith(c + '_')), None)
+            features.append((column, name[len(column) + 1:]) if column else (name, None))
+        state = tree.tree_
+        return cls(features, state.feature.tolist(), state.threshold.tolist(),
+                   state.children_left.tolist(), state.children_right.tolist(),
+                   np.clip(state.value[:, 0, 0], 0.0, 1.0).tolist(), model_version)
+
+    @property
+    def depth(self) -> int:
+        depths = [0] * len(self.left)
+        for node, (l, r) in enumerate(zip(self.left, self.right)):
+            if l >= 0:
+                depths[l] = depths[r] = depths[node] + 1
+        return max(depths)
+
+    def score(self, record: Mapping[str, Any]) -> float:
+        """Probabilité de fraude d'une transaction (colonnes brutes et features dérivées)"""
+        nodes = self._nodes
+        column, category, threshold, left, right, value = nodes[0]
+        while left >= 0:
+            x = record[column]
+            if category is not None:
+                x = x == category
+            column, category, threshold, left, right, value = nodes[left if x <= threshold else right]
+        return value
+
+    def score_many(self, records: List[Mapping[str, Any]]) -> List[float]:
+        return [self.score(record) for record in records]
+
+    def predict_frame(self, df) -> np.ndarray:
+        """Version vectorisée de score() pour un DataFrame (un niveau de l'arbre par opération)"""
+        used = sorted({f for f, l in zip(self.feature, self.left) if l >= 0})
+        X = np.zeros((len(df), len(self.features)))
+        for f in used:
+            column, category = self.features[f]
+            X[:, f] = (df[column] == category).to_numpy() if category is not None else df[column].to_numpy(float)
+
+        feature, threshold = np.maximum(self.feature, 0), np.array(self.threshold)
+        left, right = np.array(self.left), np.array(self.right)
+        node = np.zeros(len(df), dtype=np.intp)
+        rows = np.arange(len(df))
+        for _ in range(self.depth):
+            x = X[rows, feature[node]]
+            node = np.where(left[node] < 0, node, np.where(x <= threshold[node], left[node], right[node]))
+        return np.array(self.value)[node]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'model_version': self.model_version,
+            'features': self.features,
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'left': self.left,
+            'right': self.right,
+            'value': self.value,
+            'validation': self.validation
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DistilledTree':
+        return cls(data['features'], data['feature'], data['threshold'], data['left'], data['right'],
+                   data['value'], data.get('model_version'), data.get('validation'))
+
+    def save(self, path: str = FALLBACK_MODEL_FILE):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'type': 'arbre distillé',
+            'teacher_model_version': self.model_version,
+            'nodes': len(self.left),
+            'leaves': sum(1 for l in self.left if l < 0),
+            'depth': self.depth,
+            'validation': self.validation
+        }
+
+
+def load_fallback_model(path: str = FALLBACK_MODEL_FILE) -> DistilledTree:
+    """Charge l'arbre compilé (JSON, sans dépendance au modèle principal)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return DistilledTree.from_dict(json.load(f))
+
+
+class TierUsage:
+    """Décisions par niveau de scoring, motifs de dégradation et temps de scoring moyen"""
+
+    def __init__(self):
+        self.decisions = dict.fromkeys(TIERS, 0)
+        self.reasons: Dict[str, int] = {}
+        self.scoring_s = dict.fromkeys(TIERS, 0.0)
+
+    def record(self, tier: str, count: int = 1, elapsed_s: Optional[float] = None, reason: Optional[str] = None):
+        self.decisions[tier] += count
+        if elapsed_s is not None:
+            self.scoring_s[tier] += elapsed_s
+        if reason is not None:
+            self.reasons[reason] = self.reasons.get(reason, 0) + count
+
+    def stats(self) -> Dict[str, Any]:
+        total = sum(self.decisions.values())
+        return {
+            'decisions': dict(self.decisions),
+            'degraded_rate': (total - self.decisions['modele']) / total if total else 0.0,
+            'degraded_reasons': dict(self.reasons),
+            'scoring_us_per_decision': {
+                tier: round(self.scoring_s[tier] * 1e6 / count, 1) if count else None
+                for tier, count in self.decisions.items()
+            }
+        }
+
+
+def transfer_set(transactions, raw_fields: List[str], n: int, rng: np.random.Generator):
+    """Transactions synthétiques : chaque champ brut tiré indépendamment parmi les transactions réelles"""
+    import pandas as pd
+
+    return pd.DataFrame({
+        field: transactions[field].to_numpy()[rng.integers(0, len(transactions), n)] for field in raw_fields
+    })
+
+
+def distill(model, prepare, transactions, raw_fields: List[str], features_info: Dict[str, Any],
+            label: str = 'fraude', model_version: Optional[str] = None, n_transfer: int = 200_000,
+            max_depth: int = 8, min_samples_leaf: int = 5, holdout: float = 0.2,
+            seed: int = 42) -> DistilledTree:
+    """
+    Distille le modèle principal en arbre compilé et le valide sur des transactions réservées
+
+    prepare : prepare_features_batch de l'API (features dérivées + one-hot).
+    """
+    import pandas as pd
+    from sklearn.metrics import roc_auc_score
+    from sklearn.tree import DecisionTreeRegressor
+
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(transactions))
+    n_test = int(len(order) * holdout)
+    test, train = transactions.iloc[order[:n_test]], transactions.iloc[order[n_test:]]
+
+    # Transactions réelles (features fournies comprises) + jeu de transfert, étiquetés par le professeur
+    train = pd.concat([train, transfer_set(train, raw_fields, n_transfer, rng)], ignore_index=True)
+    for field in features_info['categorical_features']:
+        train[field] = train[field].astype(str)
+    X = prepare(train)
+    tree = DecisionTreeRegressor(max_depth=max_depth, min_samples_leaf=min_samples_leaf, random_state=seed)
+    tree.fit(X, model.predict_proba(X)[:, 1])
+    distilled = DistilledTree.from_sklearn(tree, list(X.columns), features_info['categorical_features'],
+                                           model_version)
+
+    # Validation : arbre compilé contre le professeur et contre les vraies étiquettes
+    X_test = prepare(test)
+    teacher = model.predict_proba(X_test)[:, 1]
+    numeric = features_info['numerical_features'] + features_info['binary_features']
+    frame = pd.concat([X_test[numeric].reset_index(drop=True),
+                       test[features_info['categorical_features']].reset_index(drop=True)], axis=1)
+    records = frame.to_dict('records')
+    start = time.perf_counter()
+    proba = np.array(distilled.score_many(records))
+    latency_us = (time.perf_counter() - start) * 1e6 / len(records)
+
+    fraud, teacher_fraud = proba > 0.5, teacher > 0.5
+    labels = test[label].astype(int).to_numpy()
+    distilled.validation = {
+        'transactions': int(len(test)),
+        'decision_agreement': float((fraud == teacher_fraud).mean()),
+        'teacher_frauds': int(teacher_fraud.sum()),
+        'teacher_frauds_caught': int((fraud & teacher_fraud).sum()),
+        'extra_frauds': int((fraud & ~teacher_fraud).sum()),
+        'mean_abs_proba_diff': float(np.abs(proba - teacher).mean()),
+        'auc': float(roc_auc_score(labels, proba)),
+        'teacher_auc': float(roc_auc_score(labels, teacher)),
+        'compiled_mismatches': int((np.abs(proba - np.clip(tree.predict(X_test), 0, 1)) > 1e-12).sum()),
+        'latency_us': round(latency_us, 2)
+    }
+    return distilled
+
+
+# === DISTILLATION, VALIDATION ET SAUVEGARDE ===
+if __name__ == "__main__":
+    import argparse
+
+    from data_access import load_transactions
+    from api_fraud_detection import model, features_info, model_version, prepare_features_batch, RAW_FIELDS
+
+    parser = argparse.ArgumentParser(description="Distille le modèle principal en arbre de repli")
+    parser.add_argument('--depth', type=int, default=8, help="Profondeur maximale de l'arbre")
+    parser.add_argument('--transfer', type=int, default=200_000, help="Transactions synthétiques de transfert")
+    args = parser.parse_args()
+
+    if model is None:
+        raise SystemExit("❌ Modèle principal indisponible : rien à distiller")
+
+    print("🏗️ Distillation du modèle principal...")
+    distilled = distill(model, prepare_features_batch, load_transactions(), RAW_FIELDS, features_info,
+                        model_version=model_version, n_transfer=args.transfer, max_depth=args.depth)
+    print(f"   {distilled.info()}")
+    if distilled.validation['compiled_mismatches']:
+        raise SystemExit("❌ Arbre compilé différent de l'arbre scikit-learn : non sauvegardé")
+
+    distilled.save(FALLBACK_MODEL_FILE)
+    print(f"\n✅ Modèle de repli sauvegardé: {FALLBACK_MODEL_FILE}")
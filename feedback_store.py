@@ -0,0 +1,413 @@
+# === RETOURS DES ANALYSTES (FEEDBACK) ET BASE D'ENTRAÎNEMENT ===
+"""
+Ingestion des verdicts des analystes (fraude confirmée / faux positif) et
+constitution d'une base d'entraînement à partir des décisions réelles.
+
+Les verdicts arrivent par lots (POST /feedback) et sont simplement mis en file ;
+un thread de fond les traite par lots :
+
+1. jointure avec le journal d'audit par identifiant de décision : les features
+   journalisées au moment du scoring sont reprises telles quelles (pas de
+   recalcul). L'identifiant encode l'instant de décision, seuls les fichiers
+   d'audit de la plage de temps du lot sont relus ;
+2. ajout à la base d'entraînement colonnaire (un fichier Parquet par lot) :
+   colonnes brutes du dataset + vecteur de features du modèle + étiquette ;
+3. mise à jour des compteurs en ligne (VP / FP / FN / VN) par version du
+   modèle, d'où précision et rappel sur les décisions réelles.
+
+Une décision pas encore écrite dans le journal d'audit est retentée pendant
+environ une minute avant d'être comptée comme non retrouvée. Un nouveau verdict
+sur la même décision remplace le précédent (compteurs et chargement de la base).
+
+Une décision du mode dégradé (scoring_tier autre que "modele" : arbre
+distillé ou règles seules) n'a pas de vecteur de features du modèle : son
+verdict alimente les agrégats de risque, mais ni les compteurs du modèle ni
+la base d'entraînement.
+
+    python feedback_store.py    # résumé de la base et métriques par version
+"""
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Iterable
+import atexit
+import gzip
+import itertools
+import json
+import os
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from audit_log import list_audit_files, AUDIT_DIR
+
+FEEDBACK_DIR = 'feedback_store'
+
+# Colonnes brutes non présentes dans le vecteur de features (one-hot)
+INPUT_COLUMNS = [
+    'type_transaction',
+    'categorie_marchand',
+    'canal_paiement',
+    'wilaya_client',
+    'marchand_id'
+]
+
+
+def store_schema(feature_names: List[str]) -> pa.Schema:
+    """Schéma fixe des fichiers de la base (identique d'un lot à l'autre)"""
+    fields = [
+        ('decision_id', pa.string()),
+        ('decision_ts', pa.timestamp('ms')),
+        ('model_version', pa.string()),
+        ('endpoint', pa.string()),
+        ('fraud_probability', pa.float64()),
+        ('predicted_fraud', pa.bool_()),
+        ('anomaly_score', pa.float64()),
+        ('fraude', pa.int8()),
+        ('raison_fraude', pa.string()),
+        ('analyste', pa.string()),
+        ('feedback_ts', pa.timestamp('ms')),
+    ]
+    fields += [(column, pa.string()) for column in INPUT_COLUMNS]
+    fields += [(name, pa.float64()) for name in feature_names]
+    return pa.schema(fields)
+
+
+def _decision_ms(decision_id: str) -> Optional[int]:
+    try:
+        return int(decision_id.split('_')[1])
+    except (IndexError, ValueError):
+        return None
+
+
+_ID_PREFIX = '{"decision_id": "'
+
+
+def lookup_decisions(decision_ids, start: datetime, end: datetime,
+                     audit_dir: str = AUDIT_DIR) -> Dict[str, Dict[str, Any]]:
+    """Enregistrements d'audit des décisions demandées (seules les lignes retenues sont décodées)"""
+    wanted = set(decision_ids)
+    found = {}
+    for path in list_audit_files(audit_dir, start, end):
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    # decision_id est la première clé de chaque enregistrement
+                    if line.startswith(_ID_PREFIX):
+                        decision_id = line[len(_ID_PREFIX):line.index('"', len(_ID_PREFIX))]
+                        if decision_id not in wanted:
+                            continue
+                    record = json.loads(line)
+                    if record.get('decision_id') in wanted:
+                        found[record['decision_id']] = record
+        except (EOFError, gzip.BadGzipFile):
+            # Fichier en cours d'écriture : dernier membre gzip incomplet
+            continue
+    return found
+
+
+class FeedbackIngestor:
+    """File de verdicts + thread de jointure / écriture / comptage"""
+
+    def __init__(self, feature_names: List[str], directory: str = FEEDBACK_DIR,
+                 audit_dir: str = AUDIT_DIR, batch_size: int = 250_000,
+                 flush_interval_s: float = 2.0, max_queue: int = 2_000_000,
+                 retry_interval_s: float = 5.0, max_attempts: int = 12,
+                 risk_aggregates=None):
+        self.feature_names = list(feature_names)
+        self.schema = store_schema(self.feature_names)
+        self.directory = directory
+        self.audit_dir = audit_dir
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.max_queue = max_queue
+        self.retry_interval_s = retry_interval_s
+        self.max_attempts = max_attempts
+        self.risk_aggregates = risk_aggregates
+
+        self._queue = deque()
+        self._retry: List[Dict[str, Any]] = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closing = False
+        self._pid = None
+        self._file_seq = itertools.count(1)
+
+        # decision_id -> (version, prédiction, étiquette) ; version -> [VP, FP, FN, VN]
+        self._labels: Dict[str, tuple] = {}
+        self._counts: Dict[str, List[int]] = {}
+        self._counts_lock = threading.Lock()
+
+        self.received = 0
+        self.joined = 0
+        self.unmatched = 0
+        self.degraded = 0
+        self.invalid = 0
+        self.written = 0
+        self.write_errors = 0
+
+        self._load_counts()
+        atexit.register(self.close)
+
+    # --- chemin de requête ---
+
+    def submit(self, verdicts: Iterable[Dict[str, Any]]) -> int:
+        """Met des verdicts en file ; ValueError si la file est pleine"""
+        if self._pid != os.getpid():
+            self.start()
+        verdicts = list(verdicts)
+        received_ms = int(time.time() * 1000)
+        with self._condition:
+            if len(self._queue) + len(verdicts) > self.max_queue:
+                raise ValueError(f"File de verdicts pleine ({len(self._queue)} en attente)")
+            for verdict in verdicts:
+                verdict['feedback_ms'] = received_ms
+                verdict['attempts'] = 0
+                self._queue.append(verdict)
+            self.received += len(verdicts)
+            if len(self._queue) >= self.batch_size:
+                self._condition.notify_all()
+        return len(verdicts)
+
+    # --- cycle de vie ---
+
+    def start(self):
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        if self._pid is not None and self._pid != os.getpid():
+            self._queue = deque()
+            self._retry = []
+            self._condition = threading.Condition()
+        self._pid = os.getpid()
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name='feedback-ingestor', daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 30.0):
+        """Traite les verdicts en file puis arrête le thread"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'received': self.received,
+            'queued': len(self._queue),
+            'retrying': len(self._retry),
+            'joined': self.joined,
+            'unmatched': self.unmatched,
+            'degraded_decisions': self.degraded,
+            'invalid': self.invalid,
+            'written_rows': self.written,
+            'write_errors': self.write_errors,
+            'labelled_decisions': len(self._labels)
+        }
+
+    # --- métriques en ligne ---
+
+    def _apply_label(self, decision_id: str, version: str, predicted: bool, label: bool) -> Optional[bool]:
+        """
+        Met à jour les compteurs ; renvoie l'étiquette précédente de la décision (ou None)
+
+        version None : étiquette conservée (corrections des agrégats) mais non comptée.
+        """
+        with self._counts_lock:
+            previous = self._labels.get(decision_id)
+            if previous is not None and previous[0] is not None:
+                self._counts[previous[0]][_cell(previous[1], previous[2])] -= 1
+            if version is not None:
+                self._counts.setdefault(version, [0, 0, 0, 0])[_cell(predicted, label)] += 1
+            self._labels[decision_id] = (version, predicted, label)
+        return previous[2] if previous is not None else None
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Précision / rappel par version du modèle sur les décisions étiquetées"""
+        with self._counts_lock:
+            counts = {version: list(c) for version, c in self._counts.items()}
+        result = {}
+        for version, (tp, fp, fn, tn) in counts.items():
+            precision = tp / (tp + fp) if tp + fp else None
+            recall = tp / (tp + fn) if tp + fn else None
+            f1 = (2 * precision * recall / (precision + recall)
+                  if precision and recall else None)
+            result[version] = {
+                'labelled': tp + fp + fn + tn,
+                'true_positives': tp,
+                'false_positives': fp,
+                'false_negatives': fn,
+                'true_negatives': tn,
+                'precision': precision,
+                'recall': recall,
+                'f1_score': f1
+            }
+        return result
+
+    def _load_counts(self):
+        """Reconstitue les compteurs depuis la base (lecture de 4 colonnes seulement)"""
+        if not os.path.isdir(self.directory):
+            return
+        try:
+            df = load_feedback(self.directory,
+                               columns=['decision_id', 'model_version', 'predicted_fraud', 'fraude'])
+        except Exception as e:
+            print(f"⚠️ Base de retours illisible, compteurs remis à zéro: {e}")
+            return
+        for decision_id, version, predicted, label in df.itertuples(index=False):
+            self._apply_label(decision_id, version, bool(predicted), bool(label))
+
+    # --- thread de traitement ---
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if len(self._queue) < self.batch_size and not self._closing:
+                    self._condition.wait(self.flush_interval_s)
+                batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.batch_size))]
+                closing = self._closing and not self._queue
+
+            # Verdicts non retrouvés dans l'audit : nouvel essai toutes les retry_interval_s
+            now_ms = time.time() * 1000
+            waiting = []
+            for verdict in self._retry:
+                if closing or now_ms - verdict['feedback_ms'] >= verdict['attempts'] * self.retry_interval_s * 1000:
+                    batch.append(verdict)
+                else:
+                    waiting.append(verdict)
+            self._retry = waiting
+
+            if batch:
+                try:
+                    self._process(batch, final=closing)
+                except Exception as e:
+                    self.write_errors += 1
+                    print(f"⚠️ Retours analystes: échec du traitement de {len(batch)} verdicts: {e}")
+            if closing:
+                return
+
+    def _process(self, batch: List[Dict[str, Any]], final: bool = False):
+        by_id: Dict[str, List[Dict[str, Any]]] = {}
+        for verdict in batch:
+            if _decision_ms(verdict['transaction_id']) is None:
+                self.invalid += 1
+                continue
+            by_id.setdefault(verdict['transaction_id'], []).append(verdict)
+        if not by_id:
+            return
+
+        # Relecture du journal d'audit limitée à la plage de temps des décisions du lot
+        stamps = [_decision_ms(decision_id) for decision_id in by_id]
+        start = datetime.fromtimestamp((min(stamps) - 1_000) / 1000)
+        end = datetime.fromtimestamp((max(stamps) + 60_000) / 1000)
+        decisions = lookup_decisions(by_id, start, end, self.audit_dir)
+
+        rows = []
+        for decision_id, verdicts in by_id.items():
+            record = decisions.get(decision_id)
+            if record is None:
+                for verdict in verdicts:
+                    verdict['attempts'] += 1
+                    if verdict['attempts'] >= self.max_attempts or final:
+                        self.unmatched += 1
+                    else:
+                        self._retry.append(verdict)
+                continue
+            degraded = record.get('scoring_tier', 'modele') != 'modele'
+            for verdict in sorted(verdicts, key=lambda v: v['feedback_ms']):
+                if degraded:
+                    self.degraded += 1
+                else:
+                    rows.append(self._row(record, verdict))
+                self._on_label(record, bool(verdict['fraude']), counted=not degraded)
+        self.joined += len(rows)
+
+        if rows:
+            self._write(rows)
+
+    def _row(self, record: Dict[str, Any], verdict: Dict[str, Any]) -> Dict[str, Any]:
+        features = record.get('features') or {}
+        inputs = record.get('input') or {}
+        row = {
+            'decision_id': record['decision_id'],
+            'decision_ts': datetime.fromtimestamp(record['ts_ms'] / 1000),
+            'model_version': record.get('model_version'),
+            'endpoint': record.get('endpoint'),
+            'fraud_probability': record.get('fraud_probability'),
+            'predicted_fraud': record.get('is_fraud'),
+            'anomaly_score': record.get('anomaly_score'),
+            'fraude': int(bool(verdict['fraude'])),
+            'raison_fraude': verdict.get('raison_fraude') or ('INCONNUE' if verdict['fraude'] else 'NON'),
+            'analyste': verdict.get('analyste'),
+            'feedback_ts': datetime.fromtimestamp(verdict['feedback_ms'] / 1000),
+        }
+        for column in INPUT_COLUMNS:
+            value = inputs.get(column)
+            row[column] = str(value) if value is not None else None
+        for name in self.feature_names:
+            row[name] = features.get(name)
+        return row
+
+    def _on_label(self, record: Dict[str, Any], label: bool, counted: bool = True):
+        previous = self._apply_label(record['decision_id'], record.get('model_version') if counted else None,
+                                     bool(record.get('is_fraud')), label)
+        # Agrégats de risque : nouvelle étiquette ajoutée, étiquette corrigée retirée
+        if self.risk_aggregates is not None and previous != label:
+            inputs = record.get('input') or {}
+            if previous is not None:
+                self.risk_aggregates.update(inputs, previous, weight=-1)
+            self.risk_aggregates.update(inputs, label)
+
+    def _write(self, rows: List[Dict[str, Any]]):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+            path = os.path.join(self.directory,
+                                f"feedback-{stamp}-{os.getpid()}-{next(self._file_seq)}.parquet")
+            pq.write_table(pa.Table.from_pylist(rows, schema=self.schema), path)
+            self.written += len(rows)
+        except OSError as e:
+            self.write_errors += 1
+            print(f"⚠️ Retours analystes: échec d'écriture de {len(rows)} lignes: {e}")
+
+
+def _cell(predicted: bool, label: bool) -> int:
+    # Index dans [VP, FP, FN, VN]
+    if predicted:
+        return 0 if label else 1
+    return 2 if label else 3
+
+
+def load_feedback(directory: str = FEEDBACK_DIR, columns: Optional[List[str]] = None,
+                  latest_only: bool = True):
+    """Charge la base d'entraînement (dernier verdict par décision par défaut)"""
+    dataset = ds.dataset(directory, format='parquet', exclude_invalid_files=True)
+    read_columns = None
+    if columns is not None:
+        read_columns = list(dict.fromkeys(columns + ['decision_id', 'feedback_ts'])) if latest_only else columns
+    df = dataset.to_table(columns=read_columns).to_pandas()
+    if latest_only and len(df):
+        df = df.sort_values('feedback_ts', kind='stable').drop_duplicates('decision_id', keep='last')
+    return df[columns].reset_index(drop=True) if columns is not None else df.reset_index(drop=True)
+
+
+# === OUTIL DE CONSULTATION ===
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Base d'entraînement issue des retours analystes")
+    parser.add_argument('--dir', default=FEEDBACK_DIR)
+    args = parser.parse_args()
+
+    df = load_feedback(args.dir)
+    print(f"📚 {len(df)} décisions étiquetées | {int(df['fraude'].sum())} fraudes confirmées")
+    for version, group in df.groupby('model_version'):
+        tp = int((group['predicted_fraud'] & (group['fraude'] == 1)).sum())
+        fp = int((group['predicted_fraud'] & (group['fraude'] == 0)).sum())
+        fn = int((~group['predicted_fraud'] & (group['fraude'] == 1)).sum())
+        precision = tp / (tp + fp) if tp + fp else float('nan')
+        recall = tp / (tp + fn) if tp + fn else float('nan')
+        print(f"   modèle {version}: {len(group)} étiquetées | précision {precision:.2%} | rappel {recall:.2%}")
@@ -0,0 +1,253 @@
+# === SCORING EN PRÉCISION RÉDUITE (FEATURES BINNÉES UINT8) ===
+"""
+Mode de scoring optionnel pour les traitements de masse (score_frame : scoring
+par lot du dashboard, rejeu de gros fichiers).
+
+Le chemin standard construit une matrice de 33 features en float64 (one-hot
+compris, 224 Mo par million de transactions) que scikit-learn recopie en
+float32 avant de parcourir les arbres. Ici, comme dans les GBM à histogrammes :
+
+- chaque feature est discrétisée en un index de bin uint8 (33 octets par
+  transaction au lieu de 264) ;
+- les bornes des bins sont les seuils de coupure du modèle lui-même (valeurs
+  triées et uniques, au plus 255 par feature), calculées une fois à
+  l'entraînement et sauvegardées dans quantized_model.pkl ;
+- les arbres sont réécrits dans l'espace des bins : le seuil t_k devient
+  k + 0,5, et « x <= t_k » équivaut exactement à « bin(x) <= k » ;
+- les features sont construites directement en float32 depuis les colonnes
+  brutes (comparaison de catégories pour les colonnes one-hot), sans passer
+  par l'encodeur ni par la matrice float64 ; le détecteur d'anomalies
+  réutilise cette matrice.
+
+Les features sont comparées en float32, comme le fait scikit-learn : les
+décisions et les probabilités sont donc identiques au chemin float64, ce que
+le rapport de validation vérifie sur tout le dataset. Le modèle quantifié
+n'est utilisé que s'il a été construit pour la version du modèle chargée et
+que sa validation n'a relevé aucune décision divergente.
+
+    python quantized_model.py                   # construction + validation + benchmark
+    python quantized_model.py --rows 1000000    # taille du benchmark
+"""
+from typing import Dict, Any, List, Tuple, Optional
+import copy
+import json
+import time
+
+import numpy as np
+
+QUANTIZED_MODEL_FILE = 'quantized_model.pkl'
+QUANTIZATION_REPORT_FILE = 'quantization_report.json'
+
+MAX_BINS = 256
+
+# Lignes converties en float32 à la fois pour le parcours des arbres (~8 Mo)
+CHUNK_ROWS = 65_536
+
+
+class QuantizedGBM:
+    """Modèle de gradient boosting évalué sur des index de bins uint8"""
+
+    def __init__(self, model, feature_names: List[str], onehot: Dict[str, Tuple[str, str]],
+                 model_version: Optional[str] = None):
+        self.feature_names = list(feature_names)
+        self.onehot = dict(onehot)
+        self.model_version = model_version
+        self.validation: Optional[Dict[str, Any]] = None
+
+        # Bornes des bins : seuils de coupure utilisés par le modèle, par feature
+        thresholds = [set() for _ in self.feature_names]
+        for estimator in model.estimators_.ravel():
+            tree = estimator.tree_
+            for feature, threshold in zip(tree.feature, tree.threshold):
+                if feature >= 0:
+                    thresholds[feature].add(threshold)
+        self.edges = [np.array(sorted(values), dtype=np.float64) for values in thresholds]
+        too_many = [name for name, edges in zip(self.feature_names, self.edges) if len(edges) >= MAX_BINS]
+        if too_many:
+            raise ValueError(f"Plus de {MAX_BINS - 1} seuils pour {too_many}: quantification uint8 impossible")
+
+        # Copie du modèle dont les seuils sont exprimés en index de bins
+        self.binned_model = copy.deepcopy(model)
+        for estimator in self.binned_model.estimators_.ravel():
+            state = estimator.tree_.__getstate__()
+            nodes = state['nodes'].copy()
+            for node in np.flatnonzero(nodes['left_child'] != -1):
+                edges = self.edges[nodes['feature'][node]]
+                nodes['threshold'][node] = np.searchsorted(edges, nodes['threshold'][node]) + 0.5
+            state['nodes'] = nodes
+            estimator.tree_.__setstate__(state)
+        # Le modèle binné reçoit un tableau NumPy, sans noms de colonnes
+        if hasattr(self.binned_model, 'feature_names_in_'):
+            del self.binned_model.feature_names_in_
+
+    @property
+    def used_features(self) -> List[int]:
+        return [i for i, edges in enumerate(self.edges) if len(edges)]
+
+    def bin_features(self, X) -> np.ndarray:
+        """Index de bins d'une matrice de features (colonnes dans l'ordre de feature_names)"""
+        if hasattr(X, 'to_numpy'):
+            X = X[self.feature_names].to_numpy()
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+        binned = np.zeros((len(X), len(self.feature_names)), dtype=np.uint8)
+        for i in self.used_features:
+            edges = self.edges[i]
+            if len(edges) == 1:
+                # Feature binaire ou one-hot : une seule comparaison
+                binned[:, i] = X[:, i] > edges[0]
+            else:
+                binned[:, i] = np.searchsorted(edges, X[:, i].astype(np.float64), side='left')
+        return binned
+
+    def float_features(self, df) -> np.ndarray:
+        """
+        Matrice de features float32 directement depuis un DataFrame de transactions
+
+        Le DataFrame contient les features numériques (dérivées comprises) et
+        les colonnes catégorielles brutes ; les colonnes one-hot sont obtenues
+        par comparaison avec la catégorie, sans encodeur ni matrice float64.
+        Mêmes valeurs que prepare_features_batch converti en float32 (entrée
+        du détecteur d'anomalies).
+        """
+        # Ordre Fortran : chaque colonne est écrite puis binnée de façon contiguë
+        X = np.empty((len(df), len(self.feature_names)), dtype=np.float32, order='F')
+        for i, name in enumerate(self.feature_names):
+            if name in self.onehot:
+                column, category = self.onehot[name]
+                X[:, i] = (df[column] == category).to_numpy()
+            else:
+                X[:, i] = df[name].to_numpy()
+        return X
+
+    def bin_frame(self, df) -> np.ndarray:
+        """Index de bins directement depuis un DataFrame de transactions (voir float_features)"""
+        return self.bin_features(self.float_features(df))
+
+    def predict_proba(self, binned: np.ndarray) -> np.ndarray:
+        """Probabilité de fraude (classe 1) pour des index de bins, par morceaux de CHUNK_ROWS lignes"""
+        proba = np.empty(len(binned))
+        for start in range(0, len(binned), CHUNK_ROWS):
+            chunk = binned[start:start + CHUNK_ROWS].astype(np.float32)
+            proba[start:start + CHUNK_ROWS] = self.binned_model.predict_proba(chunk)[:, 1]
+        return proba
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'precision': 'uint8',
+            'model_version': self.model_version,
+            'features_binned': len(self.used_features),
+            'max_bins': int(max(len(edges) for edges in self.edges) + 1),
+            'validation': self.validation
+        }
+
+
+def build_quantized_model(model, encoder, features_info: Dict[str, Any],
+                          model_version: Optional[str] = None) -> QuantizedGBM:
+    """Bins et arbres réécrits à partir du modèle entraîné et de son encodeur one-hot"""
+    categorical_features = features_info['categorical_features']
+    names = encoder.get_feature_names_out(categorical_features)
+    pairs = [
+        (column, category)
+        for i, column in enumerate(categorical_features)
+        for j, category in enumerate(encoder.categories_[i])
+        if encoder.drop_idx_ is None or encoder.drop_idx_[i] != j
+    ]
+    return QuantizedGBM(model, features_info['all_features'], dict(zip(names, pairs)), model_version)
+
+
+def validate(quantized: QuantizedGBM, reference_proba: np.ndarray, binned: np.ndarray,
+             threshold: float = 0.5) -> Dict[str, Any]:
+    """Compare les décisions du modèle quantifié au chemin float64 (seuil de fraude et niveaux de risque)"""
+    proba = quantized.predict_proba(binned)
+    bands = [0.2, 0.4, 0.7]
+    report = {
+        'transactions': int(len(proba)),
+        'threshold': threshold,
+        'decision_mismatches': int(((proba > threshold) != (reference_proba > threshold)).sum()),
+        'risk_level_mismatches': int((np.digitize(proba, bands) != np.digitize(reference_proba, bands)).sum()),
+        'max_abs_proba_diff': float(np.abs(proba - reference_proba).max()),
+        'frauds_flagged': int((proba > threshold).sum())
+    }
+    quantized.validation = report
+    return report
+
+
+def load_quantized_model(path: str = QUANTIZED_MODEL_FILE, model_version: Optional[str] = None) -> QuantizedGBM:
+    """Charge le modèle quantifié ; refusé s'il vise une autre version du modèle ou n'a pas été validé"""
+    import joblib
+
+    quantized = joblib.load(path)
+    if model_version is not None and quantized.model_version != model_version:
+        raise ValueError(f"construit pour le modèle {quantized.model_version}, modèle chargé {model_version}")
+    if not quantized.validation or quantized.validation['decision_mismatches']:
+        raise ValueError(f"validation absente ou en échec: {quantized.validation}")
+    return quantized
+
+
+# === CONSTRUCTION, VALIDATION ET BENCHMARK ===
+if __name__ == "__main__":
+    import argparse
+    import joblib
+    import pandas as pd
+
+    from data_access import load_transactions
+    from api_fraud_detection import (model, encoder, features_info, model_version,
+                                     prepare_features_batch, add_derived_features)
+    # Classe importée depuis le module (et non __main__) pour que le pickle soit rechargeable par l'API
+    from quantized_model import build_quantized_model, validate
+
+    parser = argparse.ArgumentParser(description="Construit et valide le modèle quantifié")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Taille du benchmark de débit")
+    args = parser.parse_args()
+
+    print("🏗️ Construction des bins et des arbres quantifiés...")
+    quantized = build_quantized_model(model, encoder, features_info, model_version)
+    print(f"   {quantized.info()}")
+
+    # Validation sur tout le dataset : mêmes décisions que le chemin float64
+    print("\n🔍 Validation sur le dataset complet...")
+    df = load_transactions()
+    reference = model.predict_proba(prepare_features_batch(df))[:, 1]
+    binned = quantized.bin_frame(add_derived_features(df))
+    report = validate(quantized, reference, binned)
+    print(f"   {report}")
+    if report['decision_mismatches']:
+        raise SystemExit("❌ Décisions divergentes : modèle quantifié non sauvegardé")
+
+    # Benchmark : débit et mémoire sur un lot de --rows transactions
+    bulk = pd.concat([df] * -(-args.rows // len(df)), ignore_index=True).head(args.rows)
+    print(f"\n⏱️ Benchmark sur {len(bulk):,} transactions")
+
+    def bench(fn):
+        start = time.perf_counter()
+        result = fn()
+        return result, time.perf_counter() - start
+
+    features, t_prepare = bench(lambda: prepare_features_batch(bulk))
+    proba, t_predict = bench(lambda: model.predict_proba(features)[:, 1])
+    bulk_binned, t_bin = bench(lambda: quantized.bin_frame(add_derived_features(bulk)))
+    proba_q, t_predict_q = bench(lambda: quantized.predict_proba(bulk_binned))
+
+    benchmark = {
+        'rows': len(bulk),
+        'float64': {
+            'features_mb': round(features.memory_usage(index=False).sum() / 1e6, 1),
+            'prepare_s': round(t_prepare, 3),
+            'predict_s': round(t_predict, 3),
+            'rows_per_s': round(len(bulk) / (t_prepare + t_predict))
+        },
+        'quantized': {
+            'features_mb': round(bulk_binned.nbytes / 1e6, 1),
+            'prepare_s': round(t_bin, 3),
+            'predict_s': round(t_predict_q, 3),
+            'rows_per_s': round(len(bulk) / (t_bin + t_predict_q))
+        },
+        'decision_mismatches': int(((proba > 0.5) != (proba_q > 0.5)).sum())
+    }
+    for mode in ('float64', 'quantized'):
+        print(f"   {mode:>9}: {benchmark[mode]}")
+
+    joblib.dump(quantized, QUANTIZED_MODEL_FILE)
+    with open(QUANTIZATION_REPORT_FILE, 'w', encoding='utf-8') as f:
+        json.dump({'model_version': model_version, 'validation': report, 'benchmark': benchmark}, f, indent=2)
+    print(f"\n✅ Modèle quantifié sauvegardé: {QUANTIZED_MODEL_FILE} (rapport: {QUANTIZATION_REPORT_FILE})")
@@ -0,0 +1,263 @@
+# === SIMULATEUR DE REJEU ET GÉNÉRATEUR DE CHARGE ===
+"""
+Rejoue les transactions historiques (triées par date_heure) contre l'API.
+
+Deux cibles :
+- en processus (ASGI, par défaut) : l'application FastAPI est importée ;
+- HTTP : --url http://localhost:8000
+
+Trois cadences :
+- realtime : respecte les écarts réels entre transactions, accélérés par --speedup ;
+- fixed    : débit constant (--qps, plusieurs valeurs = une courbe) ;
+- max      : envoie aussi vite que la concurrence le permet.
+
+Exemples :
+
+    python replay_simulator.py --mode fixed --qps 25 50 100 200 --duration 10
+    python replay_simulator.py --mode realtime --speedup 86400 --limit 2000
+    python replay_simulator.py --url http://localhost:8000 --mode max --concurrency 64 --batch-ratio 0.2
+
+En realtime et fixed, les latences sont mesurées depuis l'instant d'envoi
+prévu (et non l'instant d'envoi effectif) pour ne pas masquer la mise en file
+d'attente côté client (coordinated omission). En max, il n'y a pas d'instant
+prévu (tous les appels sont prêts dès le départ) : la latence est mesurée à
+partir de l'obtention d'une place de concurrence, soit la latence d'une
+requête et non le temps écoulé depuis le début du rejeu. La qualité de détection est calculée contre le label
+`fraude` du dataset.
+"""
+from typing import List, Dict, Any, Optional
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import numpy as np
+import httpx
+
+from data_access import load_transactions
+
+# Champs envoyés à l'API (les features calculées du dataset sont incluses)
+PAYLOAD_FIELDS = [
+    'montant_dzd', 'heure_jour', 'type_transaction', 'categorie_marchand',
+    'canal_paiement', 'wilaya_client', 'revenu_client', 'anciennete_client_jours',
+    'montant_anormal_score', 'heure_inhabituelle', 'localisation_etrangere',
+    'categorie_risquee', 'ratio_montant_revenu', 'marchand_id'
+]
+RAW_FIELDS = PAYLOAD_FIELDS[:8]
+
+
+def load_replay_data(limit: Optional[int] = None, raw_only: bool = False):
+    """Charge les transactions triées par date : (payloads, labels, offsets en secondes)"""
+    fields = RAW_FIELDS if raw_only else PAYLOAD_FIELDS
+    df = load_transactions(columns=['date_heure', 'fraude'] + fields)
+    df = df.sort_values('date_heure', kind='stable').reset_index(drop=True)
+    if limit:
+        df = df.head(limit)
+
+    payloads = df[fields].astype({c: str for c in fields if df[c].dtype == 'category'}).to_dict('records')
+    labels = df['fraude'].to_numpy(dtype=np.int8)
+    offsets = (df['date_heure'] - df['date_heure'].iloc[0]).dt.total_seconds().to_numpy()
+    return payloads, labels, offsets
+
+
+def build_schedule(n_rows: int, offsets: np.ndarray, mode: str, qps: float, speedup: float,
+                   duration: Optional[float], batch_ratio: float, batch_size: int,
+                   seed: int = 42) -> List[Dict[str, Any]]:
+    """Planifie les appels : instant d'envoi, lignes concernées, type (single/batch)"""
+    rng = random.Random(seed)
+    schedule = []
+    row = 0
+    n_calls = int(qps * duration) if mode == 'fixed' and duration else None
+
+    while (len(schedule) < n_calls) if n_calls is not None else (row < n_rows):
+        is_batch = rng.random() < batch_ratio
+        size = batch_size if is_batch else 1
+        rows = [(row + j) % n_rows for j in range(size)]
+
+        if mode == 'realtime':
+            at = offsets[rows[0]] / speedup
+        elif mode == 'fixed':
+            at = len(schedule) / qps
+        else:
+            at = None
+
+        schedule.append({'at': at, 'rows': rows, 'kind': 'batch' if is_batch else 'single'})
+        row += size
+    return schedule
+
+
+async def _run_schedule(client: httpx.AsyncClient, schedule: List[Dict[str, Any]],
+                        payloads: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = {'single': [], 'batch': []}
+    predictions = {}
+    errors = 0
+    start = time.perf_counter()
+
+    async def call(event):
+        nonlocal errors
+        scheduled = start + event['at'] if event['at'] is not None else None
+        async with semaphore:
+            if scheduled is None:
+                scheduled = time.perf_counter()
+            try:
+                if event['kind'] == 'single':
+                    response = await client.post('/predict', json=payloads[event['rows'][0]])
+                    response.raise_for_status()
+                    results = [response.json()]
+                else:
+                    batch = {'transactions': [payloads[r] for r in event['rows']]}
+                    response = await client.post('/predict/batch', json=batch)
+                    response.raise_for_status()
+                    results = response.json()['results']
+            except (httpx.HTTPError, KeyError, ValueError):
+                errors += 1
+                return
+        latencies[event['kind']].append(time.perf_counter() - scheduled)
+        for r, result in zip(event['rows'], results):
+            predictions[r] = result['is_fraud']
+
+    tasks = []
+    for event in schedule:
+        delay = start + event['at'] - time.perf_counter() if event['at'] is not None else 0
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(call(event)))
+    await asyncio.gather(*tasks)
+
+    return {
+        'elapsed_s': time.perf_counter() - start,
+        'latencies': latencies,
+        'predictions': predictions,
+        'errors': errors
+    }
+
+
+def _percentiles_ms(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None}
+    p50, p95, p99 = np.percentile(np.asarray(values) * 1000, [50, 95, 99])
+    return {'p50': round(float(p50), 2), 'p95': round(float(p95), 2), 'p99': round(float(p99), 2)}
+
+
+def detection_quality(predictions: Dict[int, bool], labels: np.ndarray) -> Dict[str, Any]:
+    """Précision / rappel des décisions de l'API contre le label `fraude`"""
+    if not predictions:
+        return {}
+    rows = np.fromiter(predictions.keys(), dtype=np.int64)
+    y_pred = np.fromiter(predictions.values(), dtype=bool)
+    y_true = labels[rows].astype(bool)
+
+    tp = int(np.sum(y_pred & y_true))
+    fp = int(np.sum(y_pred & ~y_true))
+    fn = int(np.sum(~y_pred & y_true))
+    tn = int(np.sum(~y_pred & ~y_true))
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        'transactions': int(len(rows)),
+        'precision': round(precision, 4),
+        'recall': round(recall, 4),
+        'f1_score': round(f1, 4),
+        'confusion_matrix': [[tn, fp], [fn, tp]]
+    }
+
+
+def summarize_step(label: str, run: Dict[str, Any], schedule: List[Dict[str, Any]]) -> Dict[str, Any]:
+    n_transactions = sum(len(e['rows']) for e in schedule)
+    elapsed = max(run['elapsed_s'], 1e-9)
+    all_latencies = run['latencies']['single'] + run['latencies']['batch']
+    return {
+        'step': label,
+        'calls': len(schedule),
+        'transactions': n_transactions,
+        'errors': run['errors'],
+        'elapsed_s': round(elapsed, 3),
+        'throughput_calls_s': round(len(schedule) / elapsed, 1),
+        'throughput_tx_s': round(n_transactions / elapsed, 1),
+        'latency_ms': _percentiles_ms(all_latencies),
+        'latency_single_ms': _percentiles_ms(run['latencies']['single']),
+        'latency_batch_ms': _percentiles_ms(run['latencies']['batch'])
+    }
+
+
+def _make_client(url: Optional[str], timeout: float) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits)
+
+    from api_fraud_detection import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                             base_url='http://replay', timeout=timeout)
+
+
+async def replay(args) -> Dict[str, Any]:
+    payloads, labels, offsets = load_replay_data(args.limit, args.raw_only)
+    print(f"📂 {len(payloads)} transactions chargées "
+          f"({int(labels.sum())} fraudes, {offsets[-1] / 86400:.0f} jours d'historique)")
+
+    steps = args.qps if args.mode == 'fixed' else [None]
+    report = {'mode': args.mode, 'target': args.url or 'asgi', 'steps': []}
+    all_predictions = {}
+
+    async with _make_client(args.url, args.timeout) as client:
+        for qps in steps:
+            schedule = build_schedule(
+                len(payloads), offsets, args.mode, qps or 0, args.speedup,
+                args.duration, args.batch_ratio, args.batch_size, args.seed
+            )
+            label = f"{qps:g} qps" if qps else args.mode
+            run = await _run_schedule(client, schedule, payloads, args.concurrency)
+            step = summarize_step(label, run, schedule)
+            report['steps'].append(step)
+            all_predictions.update(run['predictions'])
+
+            lat = step['latency_ms']
+            print(f"   {label:>12} | {step['throughput_tx_s']:9.1f} tx/s | "
+                  f"p50 {lat['p50']} ms | p95 {lat['p95']} ms | p99 {lat['p99']} ms | "
+                  f"erreurs {step['errors']}")
+
+    report['detection_quality'] = detection_quality(all_predictions, labels)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rejeu du dataset historique contre l'API de détection de fraude")
+    parser.add_argument('--url', default=None, help="URL de l'API (par défaut : application en processus)")
+    parser.add_argument('--mode', choices=['realtime', 'fixed', 'max'], default='fixed')
+    parser.add_argument('--qps', type=float, nargs='+', default=[25, 50, 100, 200],
+                        help="Débits cibles en appels/s (mode fixed)")
+    parser.add_argument('--duration', type=float, default=10.0, help="Durée de chaque palier (mode fixed)")
+    parser.add_argument('--speedup', type=float, default=86400.0, help="Facteur d'accélération (mode realtime)")
+    parser.add_argument('--concurrency', type=int, default=32, help="Appels simultanés maximum")
+    parser.add_argument('--batch-ratio', type=float, default=0.1, help="Proportion d'appels /predict/batch")
+    parser.add_argument('--batch-size', type=int, default=20, help="Transactions par appel batch")
+    parser.add_argument('--limit', type=int, default=None, help="Nombre de transactions à rejouer")
+    parser.add_argument('--raw-only', action='store_true',
+                        help="N'envoyer que les champs bruts (features calculées par l'API)")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help="Fichier JSON du rapport")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    print("=" * 60)
+    print("🔁 REJEU DES TRANSACTIONS HISTORIQUES")
+    print("=" * 60)
+    report = asyncio.run(replay(args))
+
+    quality = report['detection_quality']
+    if quality:
+        print(f"🎯 Qualité ({quality['transactions']} transactions): "
+              f"précision {quality['precision']:.2%} | rappel {quality['recall']:.2%} | "
+              f"F1 {quality['f1_score']:.2%}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"💾 Rapport sauvegardé: {args.output}")
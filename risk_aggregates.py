@@ -0,0 +1,334 @@
+# === AGRÉGATS DE RISQUE PAR MARCHAND, CATÉGORIE ET WILAYA ===
+"""
+Taux de fraude observés par marchand (marchand_id), catégorie de marchand et
+wilaya du client, servis comme features de contexte au moment du scoring.
+
+Pour chaque dimension, les identifiants sont encodés en entiers (0 = inconnu)
+et les volumes / fraudes sont rangés dans deux tableaux NumPy indexés par ce
+code : la lecture est en O(1) (un dictionnaire + deux accès tableau) et la
+mémoire reste compacte quel que soit le nombre de marchands.
+
+Les taux sont lissés vers le taux global (estimateur "m-estimate") pour qu'un
+marchand peu actif ne ressorte pas à 0 % ou 100 % :
+
+    taux = (fraudes + m * taux_global) / (volume + m)
+
+- initialisation / reconstruction : group-by vectorisé (np.bincount) sur le
+  dataset historique ;
+- mise à jour incrémentale : une transaction étiquetée à la fois (update) ;
+- persistance : risk_aggregates.json (volumes et fraudes, pas les taux).
+  Avec plusieurs workers (serve.py), chacun applique ses propres étiquettes :
+  save() ajoute au fichier, sous verrou, les écarts du worker depuis son
+  dernier chargement ou sa dernière sauvegarde, au lieu d'écraser ceux des
+  autres ; save(overwrite=True) remplace le fichier (reconstruction).
+
+    python risk_aggregates.py    # reconstruit risk_aggregates.json depuis le dataset
+"""
+from typing import Dict, Any, Optional, List
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows : un seul processus, pas de verrou de fichier
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+AGGREGATES_FILE = 'risk_aggregates.json'
+
+# Dimension -> colonne de la transaction
+DIMENSIONS = {
+    'marchand': 'marchand_id',
+    'categorie': 'categorie_marchand',
+    'wilaya': 'wilaya_client'
+}
+
+
+class _DimensionAggregates:
+    """
+    Volumes et fraudes d'une dimension, indexés par code entier (0 = inconnu)
+
+    Les écritures se font sous le verrou du store, les lectures du scoring sans
+    verrou : les deux tableaux sont publiés ensemble (un seul attribut, arrays)
+    et un nouveau code n'est publié dans index qu'une fois les tableaux agrandis.
+    Un lecteur lit donc le code avant les tableaux.
+    """
+
+    def __init__(self, column: str):
+        self.column = column
+        self.index: Dict[str, int] = {}
+        self.keys: List[Optional[str]] = [None]
+        self.arrays = (np.zeros(16, dtype=np.int64), np.zeros(16, dtype=np.int64))
+
+    @property
+    def count(self) -> np.ndarray:
+        return self.arrays[0]
+
+    @property
+    def fraud(self) -> np.ndarray:
+        return self.arrays[1]
+
+    def __len__(self) -> int:
+        return len(self.keys) - 1
+
+    def code(self, value) -> int:
+        return self.index.get(value, 0) if value is not None else 0
+
+    def add(self, value) -> int:
+        """Code de la valeur, créé (et tableaux agrandis) si elle est nouvelle"""
+        code = self.index.get(value)
+        if code is None:
+            code = len(self.keys)
+            if code >= len(self.count):
+                count, fraud = self.arrays
+                self.arrays = (np.concatenate([count, np.zeros_like(count)]),
+                               np.concatenate([fraud, np.zeros_like(fraud)]))
+            self.keys.append(value)
+            self.index[value] = code
+        return code
+
+    def codes(self, values: pd.Series) -> np.ndarray:
+        """Codes vectorisés (0 pour les valeurs inconnues ou manquantes)"""
+        # Copie (atomique) : le thread des retours peut ajouter des clés pendant la lecture
+        return values.astype(object).map(self.index.copy()).fillna(0).to_numpy(dtype=np.int64)
+
+
+class RiskAggregateStore:
+    """Taux de fraude lissés et volumes par marchand, catégorie et wilaya"""
+
+    def __init__(self, prior_weight: float = 50.0):
+        self.prior_weight = prior_weight
+        self.dimensions = {name: _DimensionAggregates(column) for name, column in DIMENSIONS.items()}
+        self.total = 0
+        self.total_fraud = 0
+        self.updates_since_save = 0
+        self._lock = threading.Lock()
+        # État de ce processus au dernier chargement / à la dernière sauvegarde (base des écarts)
+        self._baseline: Optional[Dict[str, Any]] = None
+
+    @property
+    def global_rate(self) -> float:
+        return self.total_fraud / self.total if self.total else 0.0
+
+    def _smoothed(self, fraud, count):
+        m = self.prior_weight
+        return (fraud + m * self.global_rate) / (count + m)
+
+    # --- construction en masse ---
+
+    def rebuild(self, df: pd.DataFrame, fraud_column: str = 'fraude') -> 'RiskAggregateStore':
+        """Recalcule tous les agrégats à partir d'un DataFrame étiqueté (group-by vectorisé)"""
+        fraud = df[fraud_column].to_numpy(dtype=np.int64)
+        with self._lock:
+            for dim in self.dimensions.values():
+                # Les codes existants sont conservés, les nouvelles valeurs ajoutées à la suite
+                for value in pd.unique(df[dim.column].dropna().astype(object)):
+                    dim.add(value)
+                codes = dim.codes(df[dim.column])
+                size = len(dim.count)
+                count = np.bincount(codes, minlength=size).astype(np.int64)
+                fraud_count = np.bincount(codes, weights=fraud, minlength=size).astype(np.int64)
+                # Code 0 : lignes sans valeur, non comptées
+                count[0] = fraud_count[0] = 0
+                dim.arrays = (count, fraud_count)
+            self.total = len(df)
+            self.total_fraud = int(fraud.sum())
+            self.updates_since_save = 0
+            self._baseline = self._to_dict()
+        return self
+
+    # --- mise à jour incrémentale ---
+
+    def update(self, transaction: Dict[str, Any], is_fraud: bool, weight: int = 1):
+        """Ajoute une transaction étiquetée (O(1)) ; weight=-1 retire une étiquette corrigée"""
+        with self._lock:
+            for dim in self.dimensions.values():
+                value = transaction.get(dim.column)
+                if value is None:
+                    continue
+                code = dim.add(value)
+                dim.count[code] += weight
+                dim.fraud[code] += weight * bool(is_fraud)
+            self.total += weight
+            self.total_fraud += weight * bool(is_fraud)
+            self.updates_since_save += 1
+
+    # --- lecture au moment du scoring ---
+
+    def features(self, transaction: Dict[str, Any]) -> Dict[str, float]:
+        """Taux de fraude lissés et volumes d'une transaction (O(1))"""
+        features = {}
+        for name, dim in self.dimensions.items():
+            code = dim.code(transaction.get(dim.column))
+            counts, frauds = dim.arrays
+            count, fraud = int(counts[code]), int(frauds[code])
+            features[f'taux_fraude_{name}'] = float(self._smoothed(fraud, count))
+            features[f'volume_{name}'] = count
+        return features
+
+    def features_batch(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Même chose pour un DataFrame (colonnes absentes = valeurs inconnues)"""
+        result = {}
+        for name, dim in self.dimensions.items():
+            if dim.column in df.columns:
+                codes = dim.codes(df[dim.column])
+            else:
+                codes = np.zeros(len(df), dtype=np.int64)
+            counts, frauds = dim.arrays
+            count = counts[codes]
+            result[f'taux_fraude_{name}'] = self._smoothed(frauds[codes], count)
+            result[f'volume_{name}'] = count
+        return pd.DataFrame(result, index=df.index)
+
+    def top(self, dimension: str, n: int = 20, min_volume: int = 0) -> List[Dict[str, Any]]:
+        """Valeurs les plus risquées d'une dimension (taux lissé décroissant)"""
+        dim = self.dimensions[dimension]
+        size = len(dim.keys)
+        counts, frauds = dim.arrays
+        count, fraud = counts[1:size], frauds[1:size]
+        rates = self._smoothed(fraud, count)
+        order = [i for i in np.argsort(-rates) if count[i] >= min_volume][:n]
+        return [
+            {
+                dim.column: dim.keys[i + 1],
+                'taux_fraude': round(float(rates[i]), 5),
+                'taux_brut': round(float(fraud[i] / count[i]), 5) if count[i] else None,
+                'fraudes': int(fraud[i]),
+                'volume': int(count[i])
+            }
+            for i in order
+        ]
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'transactions': self.total,
+            'fraudes': self.total_fraud,
+            'taux_global': round(self.global_rate, 5),
+            'prior_weight': self.prior_weight,
+            'cardinalites': {name: len(dim) for name, dim in self.dimensions.items()},
+            'mises_a_jour_non_sauvegardees': self.updates_since_save
+        }
+
+    # --- persistance ---
+
+    def _to_dict(self) -> Dict[str, Any]:
+        return {
+            'prior_weight': self.prior_weight,
+            'total': self.total,
+            'total_fraud': self.total_fraud,
+            'dimensions': {
+                name: {
+                    'keys': dim.keys[1:],
+                    'count': dim.count[1:len(dim.keys)].tolist(),
+                    'fraud': dim.fraud[1:len(dim.keys)].tolist()
+                }
+                for name, dim in self.dimensions.items()
+            }
+        }
+
+    def save(self, path: str = AGGREGATES_FILE, overwrite: bool = False):
+        """Sauvegarde les agrégats ; sauf overwrite, seuls les écarts de ce processus sont ajoutés au fichier"""
+        with _file_lock(path):
+            with self._lock:
+                data = self._to_dict()
+                baseline, self._baseline = self._baseline, data
+                self.updates_since_save = 0
+            if not overwrite and baseline is not None and os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = _merge_deltas(json.load(f), baseline, data)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def from_file(cls, path: str = AGGREGATES_FILE) -> 'RiskAggregateStore':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        store = cls(prior_weight=data['prior_weight'])
+        store._baseline = data
+        store.total, store.total_fraud = data['total'], data['total_fraud']
+        for name, saved in data['dimensions'].items():
+            dim = store.dimensions[name]
+            for key in saved['keys']:
+                dim.add(key)
+            dim.count[1:len(dim.keys)] = saved['count']
+            dim.fraud[1:len(dim.keys)] = saved['fraud']
+        return store
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Verrou exclusif entre processus (workers) le temps d'une sauvegarde"""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _merge_deltas(on_disk: Dict[str, Any], baseline: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Fichier actuel + (état courant - état de base) : les étiquettes des autres workers sont conservées"""
+    merged = {
+        'prior_weight': current['prior_weight'],
+        'total': on_disk['total'] + current['total'] - baseline['total'],
+        'total_fraud': on_disk['total_fraud'] + current['total_fraud'] - baseline['total_fraud'],
+        'dimensions': {}
+    }
+    for name, dim in current['dimensions'].items():
+        base = baseline['dimensions'][name]
+        before = {key: (count, fraud) for key, count, fraud in zip(base['keys'], base['count'], base['fraud'])}
+        saved = on_disk['dimensions'].get(name, {'keys': [], 'count': [], 'fraud': []})
+        totals = {key: [count, fraud] for key, count, fraud in zip(saved['keys'], saved['count'], saved['fraud'])}
+        for key, count, fraud in zip(dim['keys'], dim['count'], dim['fraud']):
+            count_0, fraud_0 = before.get(key, (0, 0))
+            if count != count_0 or fraud != fraud_0:
+                total = totals.setdefault(key, [0, 0])
+                total[0] += count - count_0
+                total[1] += fraud - fraud_0
+        merged['dimensions'][name] = {
+            'keys': list(totals),
+            'count': [count for count, _ in totals.values()],
+            'fraud': [fraud for _, fraud in totals.values()]
+        }
+    return merged
+
+
+def load_or_bootstrap(path: str = AGGREGATES_FILE) -> RiskAggregateStore:
+    """Agrégats sauvegardés s'ils existent, sinon reconstruits depuis le dataset historique"""
+    if os.path.exists(path):
+        return RiskAggregateStore.from_file(path)
+    from data_access import load_transactions
+    return RiskAggregateStore().rebuild(load_transactions(columns=list(DIMENSIONS.values()) + ['fraude']))
+
+
+# === RECONSTRUCTION DEPUIS LE DATASET ===
+if __name__ == "__main__":
+    import time
+    from data_access import load_transactions
+
+    df = load_transactions(columns=list(DIMENSIONS.values()) + ['fraude'])
+    start = time.perf_counter()
+    store = RiskAggregateStore().rebuild(df)
+    print(f"🏗️ Agrégats reconstruits en {(time.perf_counter() - start) * 1000:.1f} ms: {store.info()}")
+    store.save(overwrite=True)
+    print(f"✅ Agrégats sauvegardés: {AGGREGATES_FILE}")
+
+    for dimension in DIMENSIONS:
+        print(f"\n🔝 {dimension} les plus risqués:")
+        for row in store.top(dimension, n=5, min_volume=20):
+            print(f"   {row}")
+
+    sample = df.iloc[0].to_dict()
+    start = time.perf_counter()
+    for _ in range(10_000):
+        store.features(sample)
+    print(f"\n⏱️ Lecture: {(time.perf_counter() - start) / 10_000 * 1e6:.1f} µs par transaction")
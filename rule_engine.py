@@ -0,0 +1,368 @@
+# === MOTEUR DE RÈGLES MÉTIER ===
+"""
+Règles métier déclaratives, évaluées à côté du modèle (API et dashboard).
+
+Les règles sont décrites dans fraud_rules.json ; chaque condition est une
+expression dans un sous-ensemble de la syntaxe Python :
+
+    {
+      "id": "MONTANT_ELEVE_NUIT",
+      "description": "Montant supérieur à 100 000 DZD entre 0h et 5h",
+      "condition": "montant_dzd > 100000 and heure_jour <= 5",
+      "action": "BLOQUER"
+    }
+
+- opérateurs : and / or / not, comparaisons (chaînées : 1 <= heure_jour <= 5),
+  in / not in [liste], + - * /, abs(...) ;
+- noms : colonnes de la transaction (brutes et dérivées), agrégats de risque
+  (taux_fraude_marchand, ...) et sorties des modèles (fraud_probability,
+  anomaly_score) ;
+- actions : SIGNALER (motif seulement), REVISER (vérification manuelle),
+  BLOQUER (fraude imposée) ; la plus forte l'emporte ;
+- poids (optionnel) : contribution au score de règles, plafonné à 1.
+
+Chaque condition est compilée une fois (arbre syntaxique -> fonctions NumPy)
+puis évaluée sur tout un lot en un seul passage : une opération vectorisée par
+noeud de l'expression, quel que soit le nombre de transactions. Le fichier est
+relu automatiquement lorsqu'il change (vérification au plus toutes les
+check_interval_s secondes) ; une configuration invalide est refusée et les
+règles précédentes restent actives. Au chargement, chaque règle est essayée sur
+un petit échantillon typé (SAMPLE_COLUMNS) : une erreur de type
+(« type_transaction > 5 ») refuse le fichier au lieu de faire échouer chaque
+scoring. Si une règle échoue malgré tout à l'évaluation, elle est ignorée pour
+ce lot et l'erreur est conservée (rule_errors), sans interrompre le scoring.
+"""
+from typing import Dict, Any, Optional, List, NamedTuple, Callable
+import ast
+import json
+import operator
+import os
+import threading
+import time
+
+import numpy as np
+
+RULES_FILE = 'fraud_rules.json'
+
+ACTIONS = ['SIGNALER', 'REVISER', 'BLOQUER']   # ordre de priorité croissante
+
+# Noms utilisables dans les conditions
+ALLOWED_COLUMNS = {
+    # transaction
+    'montant_dzd', 'heure_jour', 'type_transaction', 'categorie_marchand', 'canal_paiement',
+    'wilaya_client', 'revenu_client', 'anciennete_client_jours', 'marchand_id',
+    # features dérivées
+    'montant_anormal_score', 'heure_inhabituelle', 'localisation_etrangere',
+    'categorie_risquee', 'ratio_montant_revenu',
+    # agrégats de risque
+    'taux_fraude_marchand', 'volume_marchand', 'taux_fraude_categorie', 'volume_categorie',
+    'taux_fraude_wilaya', 'volume_wilaya',
+    # sorties des modèles
+    'fraud_probability', 'anomaly_score'
+}
+
+# Échantillon typé pour l'essai des règles au chargement (mêmes types que l'API)
+_STRING_COLUMNS = {'type_transaction', 'categorie_marchand', 'canal_paiement', 'wilaya_client', 'marchand_id'}
+SAMPLE_COLUMNS = {
+    name: np.array(['A', 'B'], dtype=object) if name in _STRING_COLUMNS else np.array([0.0, 1.0])
+    for name in ALLOWED_COLUMNS
+}
+
+
+def _isin(values, candidates) -> np.ndarray:
+    if hasattr(values, 'isin'):
+        return values.isin(candidates).to_numpy()
+    return np.isin(values, candidates)
+
+
+_COMPARE = {
+    ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+    ast.Eq: operator.eq, ast.NotEq: operator.ne,
+    ast.In: _isin, ast.NotIn: lambda a, b: ~_isin(a, b)
+}
+_ARITHMETIC = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+_FUNCTIONS = {'abs': np.abs}
+
+
+class RuleError(ValueError):
+    """Règle ou fichier de règles invalide"""
+
+
+class _MissingColumn(Exception):
+    pass
+
+
+def _column(data, name: str):
+    try:
+        values = data[name]
+    except KeyError:
+        raise _MissingColumn(name)
+    # Colonne catégorielle pandas conservée telle quelle : comparaisons sur les codes, sans
+    # matérialiser les chaînes
+    if hasattr(values, 'cat'):
+        return values
+    return np.atleast_1d(np.asarray(values))
+
+
+class _Columns(dict):
+    """Colonnes converties en tableaux NumPy une seule fois par évaluation, partagées entre règles"""
+
+    def __init__(self, data):
+        super().__init__()
+        self.data = data
+
+    def __missing__(self, name):
+        self[name] = values = _column(self.data, name)
+        return values
+
+
+def compile_condition(expression: str) -> Callable:
+    """Compile une condition en fonction vectorisée : données (DataFrame ou dict) -> masque booléen"""
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError as e:
+        raise RuleError(f"Syntaxe invalide: {expression!r} ({e.msg})")
+    return _compile(tree.body, expression)
+
+
+def _compile(node, expression: str) -> Callable:
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile(value, expression) for value in node.values]
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        return lambda data: combine.reduce([part(data) for part in parts])
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.USub)):
+        operand = _compile(node.operand, expression)
+        if isinstance(node.op, ast.Not):
+            return lambda data: np.logical_not(operand(data))
+        return lambda data: -operand(data)
+
+    if isinstance(node, ast.Compare):
+        # a < b <= c  ->  (a < b) & (b <= c)
+        operands = [_compile(node.left, expression)] + [_compile(c, expression) for c in node.comparators]
+        ops = []
+        for op in node.ops:
+            if type(op) not in _COMPARE:
+                raise RuleError(f"Comparaison non supportée dans {expression!r}")
+            ops.append(_COMPARE[type(op)])
+
+        def compare(data):
+            values = [operand(data) for operand in operands]
+            return np.logical_and.reduce([np.asarray(op(values[i], values[i + 1]), dtype=bool)
+                                          for i, op in enumerate(ops)])
+        return compare
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARITHMETIC:
+        left, right = _compile(node.left, expression), _compile(node.right, expression)
+        op = _ARITHMETIC[type(node.op)]
+        return lambda data: op(left(data), right(data))
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _FUNCTIONS:
+        if len(node.args) != 1 or node.keywords:
+            raise RuleError(f"{node.func.id}() attend un argument dans {expression!r}")
+        function, argument = _FUNCTIONS[node.func.id], _compile(node.args[0], expression)
+        return lambda data: function(argument(data))
+
+    if isinstance(node, ast.Name):
+        if node.id not in ALLOWED_COLUMNS:
+            raise RuleError(f"Colonne inconnue {node.id!r} dans {expression!r}")
+        name = node.id
+        return lambda data: _column(data, name)
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str, bool)):
+        value = node.value
+        return lambda data: value
+
+    if isinstance(node, (ast.List, ast.Tuple)):
+        if not all(isinstance(e, ast.Constant) for e in node.elts):
+            raise RuleError(f"Les listes ne peuvent contenir que des constantes dans {expression!r}")
+        values = [e.value for e in node.elts]
+        return lambda data: values
+
+    raise RuleError(f"Élément non autorisé ({type(node).__name__}) dans {expression!r}")
+
+
+class Rule(NamedTuple):
+    id: str
+    description: str
+    condition: str
+    action: str
+    poids: float
+    predicate: Callable
+
+
+class RuleResult(NamedTuple):
+    """Résultat d'évaluation d'un lot : une ligne par transaction, une colonne par règle"""
+    rules: List[Rule]
+    fired: np.ndarray        # (n, k) booléen
+    action: np.ndarray       # (n,) action la plus forte ou None
+    deciding: np.ndarray     # (n,) index de la première règle portant cette action (-1 si aucune)
+    score: np.ndarray        # (n,) somme des poids des règles déclenchées, plafonnée à 1
+
+    def fired_rules(self, i: int) -> List[Rule]:
+        return [rule for rule, fired in zip(self.rules, self.fired[i]) if fired]
+
+    def fired_ids(self) -> List[str]:
+        """Identifiants des règles déclenchées, séparés par des virgules, pour chaque ligne"""
+        ids = np.array([rule.id for rule in self.rules], dtype=object)
+        labels = np.full(len(self.fired), '', dtype=object)
+        for i in np.flatnonzero(self.fired.any(axis=1)):
+            labels[i] = ','.join(ids[self.fired[i]])
+        return labels.tolist()
+
+
+def dry_run(rule: Rule):
+    """Essaie la règle sur SAMPLE_COLUMNS (RuleError si l'évaluation échoue ou n'est pas booléenne)"""
+    try:
+        with np.errstate(all='ignore'):
+            result = np.asarray(rule.predicate(SAMPLE_COLUMNS))
+        np.broadcast_to(result, (2,))
+    except Exception as e:
+        raise RuleError(f"Règle {rule.id} inévaluable ({rule.condition!r}): {e}")
+    if result.dtype != bool:
+        raise RuleError(f"Règle {rule.id}: la condition {rule.condition!r} ne produit pas un booléen")
+
+
+def load_rules(path: str) -> List[Rule]:
+    """Lit, compile et essaie le fichier de règles (RuleError si une règle est invalide)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    rules, seen = [], set()
+    for spec in config.get('regles', []):
+        if not spec.get('actif', True):
+            continue
+        rule_id = spec.get('id')
+        if not rule_id or rule_id in seen:
+            raise RuleError(f"Identifiant de règle manquant ou dupliqué: {rule_id!r}")
+        action = spec.get('action', 'SIGNALER')
+        if action not in ACTIONS:
+            raise RuleError(f"Action inconnue pour {rule_id}: {action} (attendu: {ACTIONS})")
+        rule = Rule(
+            id=rule_id,
+            description=spec.get('description', rule_id),
+            condition=spec['condition'],
+            action=action,
+            poids=float(spec.get('poids', 0.0)),
+            predicate=compile_condition(spec['condition'])
+        )
+        dry_run(rule)
+        rules.append(rule)
+        seen.add(rule_id)
+    return rules
+
+
+class RuleEngine:
+    """Règles compilées, rechargées à chaud lorsque le fichier change"""
+
+    def __init__(self, path: str = RULES_FILE, check_interval_s: float = 2.0):
+        self.path = path
+        self.check_interval_s = check_interval_s
+        self._lock = threading.Lock()
+        self._rules: List[Rule] = []
+        self._mtime = None
+        self._last_check = 0.0
+        self.loaded_at = None
+        self.last_error: Optional[str] = None
+        self.fired_counts: Dict[str, int] = {}
+        self.rule_errors: Dict[str, str] = {}     # dernière erreur d'évaluation par règle
+        self.evaluated = 0
+        self.reload(force=True, strict=True)
+
+    def reload(self, force: bool = False, strict: bool = False) -> bool:
+        """Recharge le fichier s'il a changé ; renvoie True si de nouvelles règles sont actives"""
+        with self._lock:
+            self._last_check = time.monotonic()
+            mtime = os.path.getmtime(self.path)
+            if not force and mtime == self._mtime:
+                return False
+            try:
+                rules = load_rules(self.path)
+            except (RuleError, ValueError, KeyError, OSError) as e:
+                self.last_error = str(e)
+                if strict:
+                    raise
+                print(f"⚠️ Règles métier: rechargement refusé, règles précédentes conservées: {e}")
+                self._mtime = mtime
+                return False
+            self._rules = rules
+            self._mtime = mtime
+            self.loaded_at = time.time()
+            self.last_error = None
+            self.fired_counts = {rule.id: self.fired_counts.get(rule.id, 0) for rule in rules}
+            self.rule_errors = {}
+            return True
+
+    @property
+    def rules(self) -> List[Rule]:
+        if time.monotonic() - self._last_check >= self.check_interval_s:
+            try:
+                self.reload()
+            except OSError as e:
+                self.last_error = str(e)
+        return self._rules
+
+    def evaluate(self, data, n_rows: Optional[int] = None) -> RuleResult:
+        """
+        Évalue toutes les règles sur un lot (DataFrame ou dict de colonnes)
+
+        Une règle qui porte sur une colonne absente n'est pas déclenchée ; une
+        règle dont l'évaluation échoue est ignorée et son erreur conservée.
+        """
+        rules = self.rules
+        n_rows = n_rows if n_rows is not None else len(data)
+        # Une ligne contiguë par règle : chaque passe ci-dessous est une opération vectorisée
+        by_rule = np.zeros((len(rules), n_rows), dtype=bool)
+        columns = _Columns(data)
+        for j, rule in enumerate(rules):
+            try:
+                by_rule[j] = np.broadcast_to(rule.predicate(columns), (n_rows,))
+            except _MissingColumn:
+                continue
+            except Exception as e:
+                if self.rule_errors.get(rule.id) != str(e):
+                    print(f"⚠️ Règle {rule.id} ignorée (erreur d'évaluation): {e}")
+                self.rule_errors[rule.id] = str(e)
+
+        strongest = np.full(n_rows, -1, dtype=np.int8)
+        score = np.zeros(n_rows)
+        for j, rule in enumerate(rules):
+            np.maximum(strongest, np.where(by_rule[j], ACTIONS.index(rule.action), -1), out=strongest)
+            if rule.poids:
+                score += rule.poids * by_rule[j]
+        deciding = np.full(n_rows, -1)
+        for j, rule in enumerate(rules):
+            first = by_rule[j] & (strongest == ACTIONS.index(rule.action)) & (deciding < 0)
+            deciding[first] = j
+        action = np.array([None] + ACTIONS, dtype=object)[strongest + 1]
+        fired = by_rule.T
+        np.minimum(score, 1.0, out=score)
+
+        counts = by_rule.sum(axis=1)
+        with self._lock:
+            self.evaluated += n_rows
+            for rule, count in zip(rules, counts):
+                if count:
+                    self.fired_counts[rule.id] = self.fired_counts.get(rule.id, 0) + int(count)
+        return RuleResult(rules, fired, action, deciding, score)
+
+    def info(self) -> Dict[str, Any]:
+        rules = self.rules
+        return {
+            'file': self.path,
+            'loaded_at': self.loaded_at,
+            'last_error': self.last_error,
+            'rule_errors': dict(self.rule_errors),
+            'evaluated': self.evaluated,
+            'rules': [
+                {
+                    'id': rule.id,
+                    'description': rule.description,
+                    'condition': rule.condition,
+                    'action': rule.action,
+                    'poids': rule.poids,
+                    'fired': self.fired_counts.get(rule.id, 0)
+                }
+                for rule in rules
+            ]
+        }
@@ -0,0 +1,292 @@
+# === LANCEUR DE PRODUCTION MULTI-WORKERS ===
+"""
+Lanceur de production de l'API : préchargement + préfork.
+
+Le processus parent charge une seule fois le modèle et les encodeurs
+(import de api_fraud_detection), gèle le tas Python (gc.freeze) puis forke N
+workers uvicorn qui partagent la même socket d'écoute. Les pages du modèle sont
+partagées en copy-on-write : la mémoire du modèle n'est pas dupliquée par worker.
+
+    python serve.py                       # un worker par CPU disponible
+    python serve.py --workers 4 --port 8000 --pin-cpus
+
+- Nombre de workers : CPU réellement disponibles (affinité + quota cgroup).
+- Threads BLAS/OpenMP : CPU disponibles / workers (1 le plus souvent), fixés
+  avant l'import de numpy pour éviter la sur-souscription.
+- SIGHUP : redémarrage progressif (rolling restart) ; le parent recharge le
+  modèle puis remplace les workers un par un, chaque ancien worker n'étant
+  arrêté qu'une fois son remplaçant prêt. Si le nouveau modèle ne se charge
+  pas, les workers en place sont conservés (jamais remplacés par des workers
+  en mode dégradé).
+- SIGTERM / SIGINT : arrêt gracieux de tous les workers.
+- État par worker : les métriques en mémoire ne sont pas partagées ;
+  /monitoring/drift, /monitoring/live, /monitoring/stream, /monitoring/lanes
+  et /monitoring/tiers ne reflètent que le worker qui répond. À l'arrêt,
+  chaque worker ajoute à risk_aggregates.json ses propres écarts (fusion sous
+  verrou) : les étiquettes reçues par les autres workers ne sont pas écrasées.
+
+Mesure de montée en charge (replay_simulator.py --mode max --concurrency 64
+--url http://127.0.0.1:8000 --limit 3000) sur l'hôte de développement, qui ne
+dispose que d'1 CPU :
+
+    workers   débit (tx/s)   p50 (ms)   p95 (ms)
+    1         220            537        2 383
+    2         211            551        2 440
+
+(latence par requête, mesurée depuis l'obtention d'une place de concurrence
+côté client ; 4 appels batch refusés par la voie bulk saturée avec 1 worker)
+
+Sans cœur supplémentaire, ajouter des workers n'apporte rien (perte due aux
+changements de contexte, d'où le plafonnement par défaut au nombre de CPU) ;
+le scoring étant lié au CPU et les workers indépendants, le débit attendu
+croît linéairement avec le nombre de cœurs.
+"""
+from typing import Optional, Dict
+import argparse
+import gc
+import importlib
+import os
+import select
+import signal
+import socket
+import sys
+import time
+
+THREAD_ENV_VARS = [
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS'
+]
+
+
+def available_cpus() -> int:
+    """CPU utilisables par ce processus (affinité et quota cgroup v2 inclus)"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    try:
+        with open('/sys/fs/cgroup/cpu.max', 'r') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, int(int(quota) // int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def configure_thread_pools(workers: int, cpus: int):
+    """Fixe les pools BLAS/OpenMP (doit être appelé avant l'import de numpy)"""
+    threads = str(max(1, cpus // workers))
+    for var in THREAD_ENV_VARS:
+        os.environ.setdefault(var, threads)
+
+
+class Supervisor:
+    """Processus parent : fork, surveillance et redémarrage des workers"""
+
+    def __init__(self, args, sock: socket.socket, cpus: int):
+        self.args = args
+        self.sock = sock
+        self.cpus = cpus
+        self.app = None
+        self.workers: Dict[int, int] = {}   # pid -> slot
+        self.retiring = set()
+        self.stopping = False
+        self.restart_requested = False
+
+    # --- chargement du modèle ---
+
+    def load_app(self, reload: bool = False):
+        """
+        Charge (ou recharge) le module de l'API dans le parent
+
+        L'API démarre en mode dégradé si le modèle ne se charge pas ; lors d'un
+        rechargement, ce cas est une erreur : l'état précédent du module est
+        restauré pour que les workers relancés gardent le modèle actuel.
+        """
+        if reload:
+            module = sys.modules['api_fraud_detection']
+            previous = dict(vars(module))
+            importlib.reload(module)
+            if module.model is None:
+                vars(module).clear()
+                vars(module).update(previous)
+                raise RuntimeError("modèle principal non chargé (le module démarrerait en mode dégradé)")
+        else:
+            module = importlib.import_module('api_fraud_detection')
+        self.app = module.app
+
+        # Les objets chargés ne seront plus parcourus par le GC : pas de copie des pages
+        gc.collect()
+        gc.freeze()
+
+    # --- workers ---
+
+    def spawn(self, slot: int) -> Optional[int]:
+        """Forke un worker et attend qu'il soit prêt à accepter des connexions"""
+        ready_r, ready_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            self._run_worker(slot, ready_w)
+            os._exit(0)
+
+        os.close(ready_w)
+        self.workers[pid] = slot
+        ready, _, _ = select.select([ready_r], [], [], self.args.startup_timeout)
+        ok = bool(ready) and os.read(ready_r, 1) == b'1'
+        os.close(ready_r)
+        if not ok:
+            print(f"⚠️ Worker {pid} (slot {slot}) non prêt après {self.args.startup_timeout}s")
+        return pid if ok else None
+
+    def _run_worker(self, slot: int, ready_fd: int):
+        for sig in (signal.SIGHUP, signal.SIGCHLD, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, signal.SIG_DFL)
+
+        if self.args.pin_cpus and hasattr(os, 'sched_setaffinity'):
+            cpu_ids = sorted(os.sched_getaffinity(0))
+            os.sched_setaffinity(0, {cpu_ids[slot % len(cpu_ids)]})
+
+        import uvicorn
+
+        class _Server(uvicorn.Server):
+            async def startup(self, sockets=None):
+                await super().startup(sockets=sockets)
+                os.write(ready_fd, b'1')
+                os.close(ready_fd)
+
+        config = uvicorn.Config(
+            self.app,
+            lifespan='on',
+            log_level=self.args.log_level,
+            access_log=self.args.access_log,
+            timeout_graceful_shutdown=self.args.graceful_timeout
+        )
+        _Server(config).run(sockets=[self.sock])
+
+    def stop_worker(self, pid: int, timeout: float):
+        """Arrêt gracieux d'un worker (SIGTERM, puis SIGKILL après le délai)"""
+        self.retiring.add(pid)
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if done:
+                break
+            time.sleep(0.05)
+        else:
+            print(f"⚠️ Worker {pid} tué après {timeout}s")
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.workers.pop(pid, None)
+        self.retiring.discard(pid)
+
+    def rolling_restart(self):
+        """Recharge le modèle puis remplace les workers un par un"""
+        print("🔄 Redémarrage progressif des workers...")
+        try:
+            self.load_app(reload=True)
+        except Exception as e:
+            print(f"❌ Rechargement du modèle impossible, conservation de la version actuelle: {e}")
+            return
+
+        for pid, slot in list(self.workers.items()):
+            if self.stopping:
+                return
+            if self.spawn(slot) is None:
+                print(f"❌ Remplaçant du slot {slot} en échec, redémarrage interrompu")
+                return
+            self.stop_worker(pid, self.args.graceful_timeout)
+        print("✅ Redémarrage progressif terminé")
+
+    def reap(self):
+        """Récupère les workers terminés et remplace ceux qui ont planté"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            slot = self.workers.pop(pid, None)
+            if slot is None or pid in self.retiring or self.stopping:
+                continue
+            print(f"⚠️ Worker {pid} (slot {slot}) terminé (statut {status}), relance...")
+            self.spawn(slot)
+
+    # --- boucle principale ---
+
+    def run(self):
+        signal.signal(signal.SIGHUP, lambda *_: setattr(self, 'restart_requested', True))
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, 'stopping', True))
+        signal.signal(signal.SIGINT, lambda *_: setattr(self, 'stopping', True))
+
+        for slot in range(self.args.workers):
+            self.spawn(slot)
+        print(f"✅ {len(self.workers)} workers prêts sur http://{self.args.host}:{self.args.port}")
+
+        while not self.stopping:
+            time.sleep(0.2)
+            self.reap()
+            if self.restart_requested:
+                self.restart_requested = False
+                self.rolling_restart()
+
+        print("🛑 Arrêt des workers...")
+        for pid in list(self.workers):
+            self.stop_worker(pid, self.args.graceful_timeout)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Lanceur multi-workers de l'API de détection de fraude")
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 8000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', 0)),
+                        help="Nombre de workers (0 = un par CPU disponible)")
+    parser.add_argument('--pin-cpus', action='store_true', help="Épingler chaque worker sur un CPU")
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--graceful-timeout', type=float, default=30.0)
+    parser.add_argument('--startup-timeout', type=float, default=60.0)
+    parser.add_argument('--log-level', default='warning')
+    parser.add_argument('--access-log', action='store_true')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cpus = available_cpus()
+    if args.workers <= 0:
+        args.workers = cpus
+    elif args.workers > cpus:
+        print(f"⚠️ {args.workers} workers pour {cpus} CPU disponibles : risque de sur-souscription")
+    configure_thread_pools(args.workers, cpus)
+
+    print("=" * 60)
+    print(f"🚀 DÉMARRAGE DE L'API - {args.workers} workers / {cpus} CPU "
+          f"(threads BLAS par worker: {os.environ['OMP_NUM_THREADS']})")
+    print("=" * 60)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(args.backlog)
+    sock.set_inheritable(True)
+
+    supervisor = Supervisor(args, sock, cpus)
+    supervisor.load_app()
+    supervisor.run()
+
+
+if __name__ == "__main__":
+    main()
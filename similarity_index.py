@@ -0,0 +1,277 @@
+# === INDEX DE SIMILARITÉ DES TRANSACTIONS (CAS SIMILAIRES) ===
+"""
+Recherche des transactions historiques les plus proches d'une transaction
+donnée, pour l'investigation des alertes (cas similaires, étiquetés `fraude`
+avec leur `raison_fraude`).
+
+Espace de recherche : le vecteur de features du modèle (features_info.json),
+numériques normalisées (log1p pour les montants puis centrage-réduction) et
+indicatrices binaires / one-hot telles quelles. Distance euclidienne.
+
+Deux modes, choisis selon la taille du jeu indexé :
+- exact (force brute vectorisée) jusqu'à BRUTE_FORCE_MAX lignes : un seul
+  produit matriciel par requête ;
+- IVF (inverted file) au-delà : k-means en NumPy sur un échantillon, vecteurs
+  rangés par liste de façon contiguë, recherche limitée aux `n_probe` listes
+  dont le centroïde est le plus proche.
+
+    python similarity_index.py                      # statistiques sur le dataset
+    python similarity_index.py --benchmark 1000000  # latence sur 1M lignes synthétiques
+"""
+from typing import Dict, Any, Optional, List
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+BRUTE_FORCE_MAX = 50_000
+
+# Numériques à forte asymétrie : log1p avant normalisation
+LOG_FEATURES = [
+    'montant_dzd',
+    'montant_anormal_score',
+    'ratio_montant_revenu',
+    'anciennete_client_jours',
+    'revenu_client'
+]
+
+# Colonnes du dataset renvoyées avec chaque voisin
+METADATA_COLUMNS = [
+    'transaction_id',
+    'date_heure',
+    'montant_dzd',
+    'type_transaction',
+    'categorie_marchand',
+    'wilaya_client',
+    'fraude',
+    'raison_fraude'
+]
+
+
+def _kmeans(data: np.ndarray, n_clusters: int, n_iter: int = 10, seed: int = 42) -> np.ndarray:
+    """k-means de Lloyd en NumPy (centroïdes initiaux tirés dans les données)"""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = _nearest_centroid(data, centroids)
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, data)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Listes vides : réensemencées sur des points tirés au hasard
+        if not filled.all():
+            centroids[~filled] = data[rng.choice(len(data), int((~filled).sum()), replace=False)]
+    return centroids
+
+
+def _nearest_centroid(data: np.ndarray, centroids: np.ndarray, chunk: int = 65_536) -> np.ndarray:
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    labels = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), chunk):
+        block = data[start:start + chunk]
+        labels[start:start + chunk] = np.argmin(centroid_norms - 2 * block @ centroids.T, axis=1)
+    return labels
+
+
+class SimilarityIndex:
+    """Index k plus proches voisins : exact (force brute) ou IVF selon la taille"""
+
+    def __init__(self, feature_names: List[str], numerical_features: List[str],
+                 n_lists: Optional[int] = None, n_probe: int = 8,
+                 brute_force_max: int = BRUTE_FORCE_MAX):
+        self.feature_names = list(feature_names)
+        self.numerical_features = list(numerical_features)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.brute_force_max = brute_force_max
+
+        self._numeric_idx = [self.feature_names.index(f) for f in self.numerical_features]
+        self._log_mask = np.array([f in LOG_FEATURES for f in self.numerical_features])
+        self._mean = None
+        self._std = None
+
+        self.mode = None
+        self.size = 0
+        self._vectors = None        # float32, rangés par liste en mode IVF
+        self._norms = None
+        self._row_ids = None        # position dans les métadonnées d'origine
+        self._centroids = None
+        self._offsets = None        # début de chaque liste dans _vectors
+        self.metadata: Dict[str, np.ndarray] = {}   # colonne -> valeurs (accès par position)
+
+    # --- construction ---
+
+    def _normalize(self, features: np.ndarray) -> np.ndarray:
+        out = np.asarray(features, dtype=np.float32).copy()
+        numeric = out[:, self._numeric_idx]
+        numeric[:, self._log_mask] = np.log1p(np.clip(numeric[:, self._log_mask], 0, None))
+        out[:, self._numeric_idx] = (numeric - self._mean) / self._std
+        return out
+
+    def build(self, features, metadata: Optional[pd.DataFrame] = None, seed: int = 42) -> 'SimilarityIndex':
+        """Indexe une matrice de features (colonnes dans l'ordre de feature_names)"""
+        if isinstance(features, pd.DataFrame):
+            features = features[self.feature_names].to_numpy()
+        features = np.asarray(features, dtype=np.float32)
+
+        numeric = features[:, self._numeric_idx].copy()
+        numeric[:, self._log_mask] = np.log1p(np.clip(numeric[:, self._log_mask], 0, None))
+        self._mean = numeric.mean(axis=0)
+        self._std = numeric.std(axis=0)
+        self._std[self._std == 0] = 1.0
+
+        vectors = self._normalize(features)
+        self.size = len(vectors)
+        if metadata is not None:
+            self.metadata = {column: metadata[column].to_numpy() for column in metadata.columns}
+
+        if self.size <= self.brute_force_max:
+            self.mode = 'exact'
+            self._row_ids = np.arange(self.size)
+        else:
+            self.mode = 'ivf'
+            n_lists = self.n_lists or int(np.sqrt(self.size))
+            rng = np.random.default_rng(seed)
+            sample = vectors[rng.choice(self.size, min(self.size, 64 * n_lists), replace=False)]
+            self._centroids = _kmeans(sample, n_lists, seed=seed)
+            labels = _nearest_centroid(vectors, self._centroids)
+            self._row_ids = np.argsort(labels, kind='stable')
+            vectors = vectors[self._row_ids]
+            self._offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=n_lists))])
+            self.n_lists = n_lists
+
+        self._vectors = np.ascontiguousarray(vectors)
+        self._norms = (self._vectors ** 2).sum(axis=1)
+        return self
+
+    # --- recherche ---
+
+    def search(self, features, k: int = 10, n_probe: Optional[int] = None):
+        """k plus proches voisins d'une ou plusieurs requêtes : (positions, distances)"""
+        if isinstance(features, pd.DataFrame):
+            features = features[self.feature_names].to_numpy()
+        queries = self._normalize(np.atleast_2d(features))
+        k = min(k, self.size)
+
+        positions = np.empty((len(queries), k), dtype=np.int64)
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        for i, query in enumerate(queries):
+            if self.mode == 'exact':
+                candidates = slice(None)
+                candidate_ids = self._row_ids
+            else:
+                lists = np.argsort(((self._centroids - query) ** 2).sum(axis=1))[:n_probe or self.n_probe]
+                ranges = [np.arange(self._offsets[l], self._offsets[l + 1]) for l in lists]
+                candidates = np.concatenate(ranges)
+                candidate_ids = self._row_ids[candidates]
+
+            d2 = self._norms[candidates] - 2 * self._vectors[candidates] @ query + query @ query
+            n = min(k, len(d2))
+            top = np.argpartition(d2, n - 1)[:n]
+            top = top[np.argsort(d2[top])]
+            positions[i, :n], distances[i, :n] = candidate_ids[top], np.sqrt(np.maximum(d2[top], 0))
+            positions[i, n:], distances[i, n:] = -1, np.inf
+        return positions, distances
+
+    def neighbours(self, features, k: int = 10, n_probe: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Voisins d'une transaction, avec leurs métadonnées (fraude, raison, ...)"""
+        positions, distances = self.search(features, k, n_probe)
+        found = positions[0] >= 0
+        positions, distances = positions[0][found], distances[0][found]
+        columns = {column: values[positions].tolist() for column, values in self.metadata.items()}
+        return [
+            {**{column: values[i] for column, values in columns.items()},
+             'position': int(position), 'distance': round(float(distance), 4)}
+            for i, (position, distance) in enumerate(zip(positions, distances))
+        ]
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'size': self.size,
+            'dimensions': len(self.feature_names),
+            'n_lists': self.n_lists if self.mode == 'ivf' else None,
+            'n_probe': self.n_probe if self.mode == 'ivf' else None,
+            'memory_mb': round((self._vectors.nbytes + self._norms.nbytes) / 1024 ** 2, 1)
+        }
+
+
+def summarize_neighbours(neighbours: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Part de fraudes et raisons de fraude parmi les voisins"""
+    frauds = [n for n in neighbours if n.get('fraude')]
+    reasons: Dict[str, int] = {}
+    for n in frauds:
+        reason = n.get('raison_fraude') or 'INCONNUE'
+        reasons[reason] = reasons.get(reason, 0) + 1
+    return {
+        'neighbours': len(neighbours),
+        'fraud_count': len(frauds),
+        'fraud_share': len(frauds) / len(neighbours) if neighbours else 0.0,
+        'fraud_reasons': dict(sorted(reasons.items(), key=lambda item: -item[1]))
+    }
+
+
+def build_from_dataset(prepare_features_batch, features_info: Dict[str, Any], **kwargs) -> SimilarityIndex:
+    """Index sur le dataset historique (même préparation des features que l'API)"""
+    from data_access import load_transactions
+
+    df = load_transactions()
+    features = prepare_features_batch(df)
+    metadata = df[METADATA_COLUMNS].copy()
+    metadata['date_heure'] = metadata['date_heure'].astype(str)
+    return SimilarityIndex(features_info['all_features'], features_info['numerical_features'],
+                           **kwargs).build(features, metadata)
+
+
+# === BENCHMARK ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index de similarité des transactions")
+    parser.add_argument('--benchmark', type=int, default=0,
+                        help="Nombre de lignes synthétiques (dataset rééchantillonné et bruité)")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--n-probe', type=int, default=8)
+    args = parser.parse_args()
+
+    from api_fraud_detection import prepare_features_batch, features_info
+    from data_access import load_transactions
+
+    index = build_from_dataset(prepare_features_batch, features_info, n_probe=args.n_probe)
+    print(f"📇 Index du dataset: {index.info()}")
+    raw = prepare_features_batch(load_transactions()).to_numpy(dtype=np.float32)
+    summary = summarize_neighbours(index.neighbours(raw[0], k=args.k))
+    print(f"   Voisins de la première transaction: {summary}")
+
+    if args.benchmark:
+        # Dataset rééchantillonné avec un bruit multiplicatif sur les numériques
+        rng = np.random.default_rng(0)
+        rows = raw[rng.integers(0, len(raw), args.benchmark)]
+        numeric_idx = [index.feature_names.index(f) for f in index.numerical_features]
+        rows[:, numeric_idx] *= rng.lognormal(0, 0.1, (len(rows), len(numeric_idx))).astype(np.float32)
+        queries = raw[rng.integers(0, len(raw), args.queries)]
+
+        start = time.perf_counter()
+        large = SimilarityIndex(index.feature_names, index.numerical_features,
+                                n_probe=args.n_probe).build(rows)
+        print(f"\n🏗️ Index de {args.benchmark:,} lignes construit en {time.perf_counter() - start:.1f}s: "
+              f"{large.info()}")
+
+        exact = SimilarityIndex(index.feature_names, index.numerical_features,
+                                brute_force_max=args.benchmark).build(rows)
+        for name, idx in (('ivf', large), ('exact', exact)):
+            latencies = []
+            found = []
+            for query in queries:
+                start = time.perf_counter()
+                positions, _ = idx.search(query, args.k)
+                latencies.append((time.perf_counter() - start) * 1000)
+                found.append(set(positions[0]))
+            if name == 'ivf':
+                approximate = found
+            else:
+                recall = np.mean([len(a & e) / args.k for a, e in zip(approximate, found)])
+            p50, p99 = np.percentile(latencies, [50, 99])
+            print(f"   {name:<5} p50 {p50:.2f} ms | p99 {p99:.2f} ms")
+        print(f"   Rappel@{args.k} de l'IVF (n_probe={args.n_probe}) vs exact: {recall:.3f}")
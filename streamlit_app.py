@@ -1,8 +1,11 @@
 # streamlit_simple.py - Version garantie sans pandas/numpy
 import streamlit as st
 from datetime import datetime
+import os
 import time
 
+from transaction_history import TransactionHistory
+
 # Configuration
 st.set_page_config(
     page_title="Banque Badr - Détection de Fraude",
@@ -33,8 +36,10 @@ st.title("🏦 Banque Badr - Détection de Fraude")
 st.markdown("### Projet Machine Learning pour le Salon de Recrutement")
 
 # Initialisation
-if 'transactions' not in st.session_state:
-    st.session_state.transactions = []
+HISTORY_WINDOW = int(os.environ.get("HISTORY_WINDOW", 500))
+
+if 'history' not in st.session_state:
+    st.session_state.history = TransactionHistory(window=HISTORY_WINDOW, fraud_key='is_fraud')
 
 # Fonction de simulation
 def simulate_fraud(montant, heure, categorie, anciennete, revenu):
@@ -102,14 +107,12 @@ with st.sidebar:
     st.image("https://img.icons8.com/color/96/000000/bank.png", width=100)
     st.markdown("**📊 Statistiques**")
     
-    if st.session_state.transactions:
-        total = len(st.session_state.transactions)
-        fraudes = sum(1 for t in st.session_state.transactions if t['is_fraud'])
-        taux = (fraudes / total * 100) if total > 0 else 0
+    if st.session_state.history:
+        view = st.session_state.history.view(5)
         
-        st.metric("Transactions", total)
-        st.metric("Fraudes", fraudes)
-        st.metric("Taux", f"{taux:.1f}%")
+        st.metric("Transactions", view.total_seen)
+        st.metric("Fraudes", view.total_fraud)
+        st.metric("Taux", f"{view.fraud_rate * 100:.1f}%")
 
 # Interface principale
 st.markdown("---")
@@ -154,7 +157,7 @@ with col2:
     
     if st.button("🔍 Analyser la transaction", type="primary", use_container_width=True):
         resultat = simulate_fraud(montant, heure, categorie, anciennete, revenu)
-        st.session_state.transactions.append(resultat)
+        st.session_state.history.append(resultat)
         
         st.markdown("### 📊 Résultat")
         
@@ -193,8 +196,8 @@ st.markdown("---")
 # Historique
 st.markdown("### 📋 Historique des transactions")
 
-if st.session_state.transactions:
-    for i, t in enumerate(reversed(st.session_state.transactions[-5:])):
+if st.session_state.history:
+    for t in reversed(st.session_state.history.view(5).recent):
         with st.container(border=True):
             cols = st.columns(4)
             with cols[0]:
@@ -0,0 +1,105 @@
+# === HISTORIQUE BORNÉ DES TRANSACTIONS (DASHBOARDS STREAMLIT) ===
+"""
+Historique des transactions analysées pour les dashboards Streamlit.
+
+Tampon circulaire de taille fixe (fenêtre) avec agrégats maintenus à chaque
+ajout : l'ajout est en O(1) (l'entrée évincée est retirée des agrégats) et les
+vues renvoyées à l'UI sont mises en cache jusqu'au prochain ajout, si bien
+qu'un rerun Streamlit fait un travail constant quelle que soit la durée de la
+session. Pur Python (utilisable par streamlit_app.py, sans pandas/numpy).
+"""
+from collections import deque
+from itertools import islice
+from typing import Dict, Any, List, Optional, NamedTuple
+
+
+class HistoryView(NamedTuple):
+    """Instantané immuable de l'historique, servi tel quel à l'UI"""
+    recent: List[Dict[str, Any]]      # dernières transactions, la plus récente en dernier
+    window_size: int                  # transactions dans la fenêtre
+    window_fraud_count: int
+    window_fraud_rate: float
+    score_histogram: List[int]        # sur la fenêtre
+    total_seen: int                   # depuis le début de la session
+    total_fraud: int
+    fraud_rate: float
+
+
+class TransactionHistory:
+    """Tampon circulaire + agrégats glissants (total, fraudes, taux, histogramme des scores)"""
+
+    def __init__(self, window: int = 500, score_key: str = 'score', fraud_key: str = 'fraud',
+                 n_bins: int = 10):
+        self.window = window
+        self.score_key = score_key
+        self.fraud_key = fraud_key
+        self.n_bins = n_bins
+
+        self._items = deque()
+        self._window_fraud = 0
+        self._histogram = [0] * n_bins
+        self._total_seen = 0
+        self._total_fraud = 0
+
+        self._version = 0
+        self._view_cache = {}
+
+    def _bin(self, score: float) -> int:
+        return min(max(int(score * self.n_bins), 0), self.n_bins - 1)
+
+    def append(self, record: Dict[str, Any]):
+        """Ajoute une transaction ; évince la plus ancienne si la fenêtre est pleine"""
+        is_fraud = bool(record.get(self.fraud_key))
+        score = float(record.get(self.score_key, 0.0))
+
+        if len(self._items) >= self.window:
+            old = self._items.popleft()
+            self._window_fraud -= bool(old.get(self.fraud_key))
+            self._histogram[self._bin(float(old.get(self.score_key, 0.0)))] -= 1
+
+        self._items.append(record)
+        self._window_fraud += is_fraud
+        self._histogram[self._bin(score)] += 1
+        self._total_seen += 1
+        self._total_fraud += is_fraud
+
+        self._version += 1
+        self._view_cache.clear()
+
+    def clear(self):
+        self.__init__(self.window, self.score_key, self.fraud_key, self.n_bins)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __bool__(self) -> bool:
+        return bool(self._items)
+
+    @property
+    def last(self) -> Optional[Dict[str, Any]]:
+        return self._items[-1] if self._items else None
+
+    @property
+    def version(self) -> int:
+        """Change à chaque ajout : clé de cache pour les vues dérivées côté UI"""
+        return self._version
+
+    def view(self, n_recent: int = 5) -> HistoryView:
+        """Vue agrégée mise en cache jusqu'au prochain ajout"""
+        cached = self._view_cache.get(n_recent)
+        if cached is not None:
+            return cached
+
+        size = len(self._items)
+        view = HistoryView(
+            recent=list(islice(reversed(self._items), n_recent))[::-1],
+            window_size=size,
+            window_fraud_count=self._window_fraud,
+            window_fraud_rate=self._window_fraud / size if size else 0.0,
+            score_histogram=list(self._histogram),
+            total_seen=self._total_seen,
+            total_fraud=self._total_fraud,
+            fraud_rate=self._total_fraud / self._total_seen if self._total_seen else 0.0
+        )
+        self._view_cache[n_recent] = view
+        return view